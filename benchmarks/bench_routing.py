@@ -0,0 +1,55 @@
+# Routing benchmark: measures how long it takes to dispatch a request as the number
+# of registered routes grows. With the compiled routing tree, dispatch time should
+# stay flat regardless of route count.
+#
+# Usage: poetry run python benchmarks/bench_routing.py
+import timeit
+
+from kegstand import ApiResource, RestApi
+
+ROUTE_COUNTS = [10, 50, 150, 500, 1000]
+ROUTES_PER_RESOURCE = 5
+ITERATIONS = 20_000
+
+
+def build_api(route_count: int) -> RestApi:
+    api = RestApi(request_logging=False)
+    for resource_index in range(route_count // ROUTES_PER_RESOURCE):
+        resource = ApiResource(f"/resource{resource_index}")
+        for route_index in range(ROUTES_PER_RESOURCE):
+
+            @resource.get(f"/items{route_index}/:id")
+            def get_item(params):
+                return {"id": params["id"]}
+
+        api.add_resource(resource, is_public=True)
+    return api
+
+
+def time_per_call_us(func) -> float:
+    return timeit.timeit(func, number=ITERATIONS) / ITERATIONS * 1_000_000
+
+
+def main():
+    header = ["routes", "first (us)", "last (us)", "miss (us)", "handler (us)"]
+    print(f"{header[0]:>8} {header[1]:>12} {header[2]:>12} {header[3]:>12} {header[4]:>14}")
+    for route_count in ROUTE_COUNTS:
+        api = build_api(route_count)
+        router = api.build_router()
+        handler = api.export()
+
+        last_resource = route_count // ROUTES_PER_RESOURCE - 1
+        first_path = "/resource0/items0/123"
+        last_path = f"/resource{last_resource}/items{ROUTES_PER_RESOURCE - 1}/123"
+        miss_path = f"/resource{last_resource}/unknown/123"
+        event = {"httpMethod": "GET", "path": last_path, "body": None, "requestContext": {}}
+
+        first = time_per_call_us(lambda path=first_path, r=router: r.match("GET", path))
+        last = time_per_call_us(lambda path=last_path, r=router: r.match("GET", path))
+        miss = time_per_call_us(lambda path=miss_path, r=router: r.match("GET", path))
+        full = time_per_call_us(lambda e=event, h=handler: h(e, None))
+        print(f"{route_count:>8} {first:>12.2f} {last:>12.2f} {miss:>12.2f} {full:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
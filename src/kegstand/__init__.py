@@ -1,17 +1,42 @@
-# According to PEP 484, "from foo import x as x" is the recommended way to
-# explicitly export these so linters won't complain about unused imports.
-from aws_lambda_powertools import Logger as Logger
-
-from .api import RestApi as RestApi
-from .decorators import (
-    ApiError as ApiError,
-)
-from .decorators import (
-    ApiResource as ApiResource,
-)
-from .decorators import (
-    Auth as Auth,
-)
-from .decorators import (
-    claim as claim,
-)
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+# The public names are imported lazily (PEP 562), so that `import kegstand` stays cheap
+# during Lambda init and each submodule, and Powertools, is only loaded when used.
+if TYPE_CHECKING:
+    # According to PEP 484, "from foo import x as x" is the recommended way to
+    # explicitly export these so linters won't complain about unused imports.
+    from aws_lambda_powertools import Logger as Logger
+
+    from .api import RestApi as RestApi
+    from .decorators import ApiResource as ApiResource
+    from .decorators import Auth as Auth
+    from .decorators import claim as claim
+    from .errors import ApiError as ApiError
+    from .errors import ValidationError as ValidationError
+
+_LAZY_ATTRIBUTES = {
+    "Logger": "aws_lambda_powertools",
+    "RestApi": "kegstand.api",
+    "ApiResource": "kegstand.decorators",
+    "Auth": "kegstand.decorators",
+    "claim": "kegstand.decorators",
+    "ApiError": "kegstand.errors",
+    "ValidationError": "kegstand.errors",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name: str):
+    module_name = _LAZY_ATTRIBUTES.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module_name), name)
+    # Cache the attribute so that __getattr__ is only called once per name
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted([*globals(), *_LAZY_ATTRIBUTES])
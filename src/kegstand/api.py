@@ -1,27 +1,121 @@
 import os
+import threading
+from time import perf_counter
 from typing import Any
 
-from . import Logger
+from .batch import BatchDispatcher
+from .dependencies import CONTAINER, Dependencies, close_request_dependencies
+from .errors import ApiError
+from .event_loop import get_event_loop
+from .json_codec import DEFAULT_CODEC
+from .log import get_logger
+from .manifest import MANIFEST_FILENAME, load_manifest
+from .metrics import UNMATCHED_ROUTE, HotPathMetrics
+from .middleware import Middleware, compile_before_route, compile_route
+from .profiling import Profiler, make_profiler
+from .request import Request, as_request
+from .request_logging import RequestLogger
+from .response_compression import ResponseCompression, make_response_compression
+from .router import Router
+from .streaming import (
+    DEFAULT_CHUNK_SIZE,
+    STREAM_CONTENT_TYPES,
+    stream_result,
+    write_api_response,
+)
 from .utils import (
     api_response,
     find_resource_modules,
 )
+from .warmup import (
+    SNAP_START,
+    WARMER_RESPONSE,
+    initialization_type,
+    is_pre_warmed_init,
+    is_warmer_event,
+    register_snapshot_hooks,
+    run_hooks,
+)
 
-logger = Logger()
+logger = get_logger()
 
 
 # Class RestApi provides a container for API resources and a method to add
 # resources to the API.
+#
+# In lazy mode, routes are registered from a route manifest (see kegstand.manifest)
+# and each resource module is only imported the first time one of its routes is
+# requested. Modules listed in `preload` are imported up front.
 class RestApi:
-    def __init__(self, root: str | None = None):
+    def __init__(  # noqa: PLR0913
+        self,
+        root: str | None = None,
+        lazy: bool = False,
+        manifest: str | None = None,
+        preload: list[str] | None = None,
+        recursive: bool = False,
+        codec=None,
+        metrics: HotPathMetrics | None = None,
+        request_logging: RequestLogger | bool = True,
+        token_verifier=None,
+        compression: ResponseCompression | bool | int | None = None,
+        dependencies: Dependencies | None = None,
+        middleware: list[Middleware] | None = None,
+        profiling: Profiler | bool | None = None,
+    ):
+        self._init_started = perf_counter()
         self.resources: list[dict[str, Any]] = []
-        if root is not None:
+        # JSON codec for request and response bodies (orjson if installed, else stdlib)
+        self.codec = codec or DEFAULT_CODEC
+        # Per-phase hot-path timings, emitted as embedded metrics (disabled by default)
+        self.metrics = metrics
+        # Access log and sampled, redacted event logging (pass False to disable)
+        self.request_logger = (
+            RequestLogger() if request_logging is True else request_logging or None
+        )
+        # Compression of response bodies above a size threshold (disabled by default)
+        self.compression = make_response_compression(compression)
+        # In-Lambda bearer token (JWT) verification, e.g. a kegstand.token_auth.TokenVerifier
+        self.token_verifier = token_verifier
+        # Dependencies shared by the handlers of all resources (see kegstand.dependencies)
+        self.dependencies = dependencies or Dependencies()
+        # Middleware hooks, compiled into each route's call chain on export
+        self.middleware: list[Middleware] = list(middleware or [])
+        # On-demand per-request profiling (configured from the environment by default)
+        self.profiling = profiling
+        # Route manifest entries, grouped by resource module, for lazy loading
+        self.lazy_modules: dict[str, dict[str, Any]] = {}
+        self._loaded_modules: dict[str, Any] = {}
+        self._load_lock = threading.Lock()
+        # Warm-up and SnapStart snapshot/restore hooks (see warm())
+        self._warm_hooks: list = []
+        self._before_snapshot_hooks: list = []
+        self._after_restore_hooks: list = []
+        self._warmed = False
+
+        if lazy or manifest is not None:
+            if manifest is None or not os.path.isabs(manifest):
+                if root is None:
+                    raise ValueError("Lazy mode requires a root or an absolute manifest path")
+                source_path = os.path.dirname(os.path.dirname(os.path.abspath(root)))
+                manifest = os.path.join(source_path, manifest or MANIFEST_FILENAME)
+            logger.info(f"Adding lazy routes from manifest {manifest}")
+            self.add_lazy_routes(load_manifest(manifest)["routes"])
+            for module_path in preload or []:
+                self.load_resource_module(module_path)
+        elif root is not None:
             source_path = os.path.dirname(os.path.dirname(os.path.abspath(root)))
             logger.info(f"Adding resources from {root} : source_path={source_path}")
-            self.find_and_add_resources(source_path)
+            self.find_and_add_resources(source_path, recursive=recursive)
 
     def add_resource(self, resource, is_public: bool = False):
         # Resource is a ApiResource object
+        if resource.codec is None:
+            resource.codec = self.codec
+        if resource.compression is None:
+            resource.compression = self.compression
+        if resource.dependencies.parent is None and resource.dependencies is not self.dependencies:
+            resource.dependencies.parent = self.dependencies
         self.resources.append(
             {
                 "resource": resource,
@@ -29,52 +123,429 @@ class RestApi:
             }
         )
 
-    def find_and_add_resources(self, api_source_root: str):
+    def dependency(self, name: str | None = None, scope: str = CONTAINER, **options):
+        # Decorator that registers a dependency factory shared by all resources
+        return self.dependencies.provide(name, scope, **options)
+
+    def use(self, middleware: Middleware):
+        # Add middleware for all routes. Middleware added to the RestApi runs outside
+        # (before and after) the middleware of the route's resource.
+        self.middleware.append(middleware)
+        return middleware
+
+    def on_warm(self, hook):
+        # Decorator for a function that runs during warm(), e.g. to prime a cache
+        self._warm_hooks.append(hook)
+        return hook
+
+    def before_snapshot(self, hook):
+        # Decorator for a function that runs before a SnapStart snapshot is taken
+        self._before_snapshot_hooks.append(hook)
+        return hook
+
+    def after_restore(self, hook):
+        # Decorator for a function that runs after the function is restored from a
+        # SnapStart snapshot, e.g. to reconnect anything not managed as a dependency
+        self._after_restore_hooks.append(hook)
+        return hook
+
+    def _dependency_registries(self) -> list:
+        registries = [self.dependencies]
+        for resource_tuple in self.resources:
+            registry = resource_tuple["resource"].dependencies
+            if registry not in registries:
+                registries.append(registry)
+        return registries
+
+    def warm(self):
+        # Does the expensive setup explicitly, instead of on the first requests: imports
+        # every resource module (including lazy ones), creates the event loop for async
+        # handlers, creates the container-scoped dependencies, fetches the token
+        # verifier's signing keys and runs the on_warm hooks. Runs once per container;
+        # export() calls it under provisioned concurrency and SnapStart, and the first
+        # warmer event does otherwise.
+        if self._warmed:
+            return
+        self._warmed = True
+        start = perf_counter()
+        for module_path in list(self.lazy_modules):
+            self.load_resource_module(module_path)
+        if any(
+            method["plan"].is_async
+            for resource_tuple in self.resources
+            for method in resource_tuple["resource"].methods
+        ):
+            get_event_loop()
+        for registry in self._dependency_registries():
+            registry.warm()
+        if self.token_verifier is not None:
+            try:
+                self.token_verifier.jwks.refresh()
+            except Exception:
+                logger.exception("Error fetching the token verifier's signing keys")
+        run_hooks(self._warm_hooks, "warm")
+        logger.info(f"Warmed up in {(perf_counter() - start) * 1000:.1f} ms")
+
+    def _before_snapshot(self):
+        self.warm()
+        run_hooks(self._before_snapshot_hooks, "before_snapshot")
+
+    def _after_restore(self):
+        # Every container restored from a snapshot starts with the same state, so the
+        # random generator is re-seeded. Connections made before the snapshot are stale,
+        # and cached responses may be as old as the snapshot.
+        import random
+
+        random.seed()
+        for registry in self._dependency_registries():
+            registry.refresh()
+        for resource_tuple in self.resources:
+            for method in resource_tuple["resource"].methods:
+                if method["cache"] is not None:
+                    method["cache"].clear()
+        run_hooks(self._after_restore_hooks, "after_restore")
+
+    def register_snapshot_hooks(self) -> bool:
+        # Registers warm() and the before_snapshot hooks to run before the snapshot is
+        # taken, and the restore handling to run after. export() does this when
+        # initialized for SnapStart. Returns False if the runtime hooks are not available.
+        return register_snapshot_hooks(self._before_snapshot, self._after_restore)
+
+    def find_and_add_resources(self, api_source_root: str, recursive: bool = False):
         # Look through folder structure, importing and adding resources to the API.
         # Expects a folder structure like this:
         # api/
         #   [resource_name].py which exposes a resource object named `api`
         # api/public/
         #   [resource_name].py which exposes a resource object named `api`
-        resource_module_folders = find_resource_modules(api_source_root)
+        resource_module_folders = find_resource_modules(api_source_root, recursive=recursive)
 
         for resource_module_folder in resource_module_folders:
-            # Import the resource module
-            resource_module = __import__(
-                resource_module_folder["module_path"], fromlist=resource_module_folder["fromlist"]
+            self.load_resource_module(
+                resource_module_folder["module_path"], resource_module_folder["is_public"]
             )
-            # Get the resource object from the module and add it to the API
-            self.add_resource(resource_module.api, resource_module_folder["is_public"])
 
         return self.resources
 
-    def export(self):
-        # Export the API as a single Lambda-compatible handler function
-        def handler(event, context):
-            logger.debug(f"event={event}")
-            logger.debug(f"context={context}")
-            resource_is_public = False
-            method = None
-            for resource_tuple in self.resources:
-                resource = resource_tuple["resource"]
-                if event["path"].startswith(resource.prefix):
-                    method, params = resource.get_matching_route(event["httpMethod"], event["path"])
-                    if method is not None:
-                        resource_is_public = resource_tuple["is_public"]
-                        break
-
-            if method is None:
-                logger.error(f"No matching route found for {event['httpMethod']} {event['path']}")
-                return api_response(
-                    {"error": f"Not found: {event['httpMethod']} {event['path']}"}, 404
+    def add_lazy_routes(self, routes: list[dict[str, Any]]):
+        # Routes are manifest entries: {"method", "route", "module", "is_public"}
+        for route in routes:
+            lazy_module = self.lazy_modules.setdefault(
+                route["module"], {"is_public": route["is_public"], "routes": []}
+            )
+            lazy_module["routes"].append(route)
+
+    def load_resource_module(self, module_path: str, is_public: bool | None = None):
+        # Import a resource module (once) and add its `api` resource object to the API
+        if module_path in self._loaded_modules:
+            return self._loaded_modules[module_path]
+
+        with self._load_lock:
+            if module_path not in self._loaded_modules:
+                if is_public is None:
+                    is_public = self.lazy_modules.get(module_path, {}).get("is_public", False)
+                resource_module = __import__(module_path, fromlist=[module_path.split(".")[-1]])
+                # Get the resource object from the module and add it to the API
+                self.add_resource(resource_module.api, bool(is_public))
+                self._loaded_modules[module_path] = resource_module.api
+
+        return self._loaded_modules[module_path]
+
+    def build_router(self) -> Router:
+        # Compile the methods of all registered resources into a single routing tree.
+        # Resources added earlier take precedence when two resources register the
+        # same method and route.
+        router = Router()
+        for resource_tuple in self.resources:
+            resource = resource_tuple["resource"]
+            for method in resource.methods:
+                router.add(
+                    method["method"],
+                    method["full_route"],
+                    (self._compile_method(method, resource), resource_tuple["is_public"]),
+                )
+
+        # Lazy routes get a placeholder method which loads the module on first use
+        for module_path, lazy_module in self.lazy_modules.items():
+            if module_path in self._loaded_modules:
+                continue
+            for route in lazy_module["routes"]:
+                router.add(
+                    route["method"],
+                    route["route"],
+                    (self._lazy_method(router, module_path, route), lazy_module["is_public"]),
                 )
+        return router
 
-            # Check if the resource is public and if not, check that the user is authenticated
-            if not resource_is_public and "authorizer" not in event["requestContext"]:
-                logger.error("User is not authenticated")
-                return api_response({"error": "User is not authenticated"}, 401)
+    def _compile_method(self, method: dict[str, Any], resource) -> dict[str, Any]:
+        # The route's handlers with the middleware hooks compiled in. Routes without
+        # middleware keep their handlers as they are. Paginated routes need the cursor
+        # secret, and handler arguments need a registered dependency, which are checked
+        # here rather than on the first request that needs them.
+        if method.get("paginator") is not None:
+            method["paginator"].check()
+        try:
+            method["plan"].check()
+        except TypeError as e:
+            raise TypeError(f"{method['route_key']}: {e}") from e
+        middleware = [*self.middleware, *resource.middleware]
+        if not middleware:
+            return method
+        return {
+            **method,
+            "handler": compile_route(method["handler"], middleware, resource.codec),
+        }
+
+    def cache_stats(self) -> dict[str, dict[str, int]]:
+        # Hit/miss/eviction counters of the response caches, per route template
+        return {
+            f"{method['method']} {method['full_route']}": method["cache"].stats()
+            for resource_tuple in self.resources
+            for method in resource_tuple["resource"].methods
+            if method["cache"] is not None
+        }
+
+    def limit_stats(self) -> dict[str, dict[str, int]]:
+        # Allowed/limited counters of the rate and concurrency limits, per route template
+        return {
+            f"{method['method']} {method['full_route']}": method["limit"].stats()
+            for resource_tuple in self.resources
+            for method in resource_tuple["resource"].methods
+            if method["limit"] is not None
+        }
+
+    def _lazy_method(self, router: Router, module_path: str, lazy_route: dict[str, Any]):
+        def resolve(event):
+            resource = self.load_resource_module(module_path)
+            is_public = self.lazy_modules[module_path]["is_public"]
+
+            # Swap the placeholders for this module's routes with the real methods, so
+            # later requests are routed straight to them
+            claimed_routes = {
+                (route["method"], route["route"])
+                for route in self.lazy_modules[module_path]["routes"]
+            }
+            target_method = None
+            for method in resource.methods:
+                route_key = (method["method"], method["full_route"])
+                if route_key not in claimed_routes:
+                    continue
+                method = self._compile_method(method, resource)  # noqa: PLW2901
+                router.add(
+                    method["method"], method["full_route"], (method, is_public), replace=True
+                )
+                if route_key == (lazy_route["method"], lazy_route["route"]):
+                    target_method = method
+
+            if target_method is None:
+                logger.error(
+                    f"Route manifest is out of date: {module_path} does not define "
+                    f"{lazy_route['method']} {lazy_route['route']}"
+                )
+                request = as_request(event)
+                raise ApiError(f"Not found: {request.method} {request.path}", 404)
+            return target_method
+
+        def handler(params, event, context, timings=None):
+            try:
+                target_method = resolve(event)
+            except ApiError as e:
+                return e.to_api_response(self.codec)
+            return target_method["handler"](params, event, context, timings)
+
+        def call(params, event, context):
+            return resolve(event)["call"](params, event, context)
+
+        return {
+            "route": lazy_route["route"],
+            "full_route": lazy_route["route"],
+            "method": lazy_route["method"],
+            "route_key": f"{lazy_route['method']} {lazy_route['route']}",
+            "handler": handler,
+            "call": call,
+            "module": module_path,
+        }
+
+    def _match_route(self, router: Router, request: Request):
+        # Returns the matching method and route params, or an error response
+        route, params = router.match(request.method, request.path)
+
+        if route is None:
+            return (
+                None,
+                None,
+                api_response(
+                    {"error": f"Not found: {request.method} {request.path}"},
+                    404,
+                    self.codec,
+                ),
+            )
+
+        method, resource_is_public = route
+
+        # Check if the resource is public and if not, check that the user is authenticated
+        if not resource_is_public and not request.is_authenticated:
+            return None, None, api_response({"error": "User is not authenticated"}, 401, self.codec)
+
+        return method, params, None
+
+    def export(
+        self,
+        stream: bool = False,
+        stream_format: str = "json",
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        warm: bool | None = None,
+    ):
+        # Export the API as a single Lambda-compatible handler function. By default, the
+        # API is warmed up during export when the init phase runs ahead of requests
+        # (provisioned concurrency and SnapStart).
+        if warm is None:
+            warm = is_pre_warmed_init()
+        if initialization_type() == SNAP_START:
+            self.register_snapshot_hooks()
+        if warm:
+            self.warm()
+        router = self.build_router()
+
+        # Create the event loop for async handlers once, during init
+        if any(
+            method["plan"].is_async
+            for resource_tuple in self.resources
+            for method in resource_tuple["resource"].methods
+        ):
+            get_event_loop()
+        if stream:
+            return self._export_streaming(router, stream_format, chunk_size)
+
+        def handler(request, context):
+            method, params, error_response = self._match_route(router, request)
+            if error_response is not None:
+                return error_response
 
             # Call the method's handler function
-            return method["handler"](params, event, context)
+            return method["handler"](params, request, context)
+
+        if self.metrics is not None:
+            handler = self._instrument(handler, router, self.metrics)
+        handler = compile_before_route(handler, self.middleware, self.codec)
+        if self.token_verifier is not None:
+            handler = self.token_verifier.wrap(handler)
+        if self.request_logger is not None:
+            handler = self.request_logger.wrap(handler)
+        # The profiler wraps the whole pipeline, so profiles include Kegstand's own
+        # dispatch path. Without profiling configured, the handler is not wrapped.
+        profiler = make_profiler(self.profiling)
+        if profiler is not None:
+            handler = profiler.wrap(handler)
+        return self._adapt(handler)
+
+    def _adapt(self, handler):
+        # The exported handler accepts REST API, HTTP API (payload v2) and ALB events.
+        # The event format is detected once, the rest of the pipeline works on the
+        # Request view, and the response is returned in the event's format.
+        # Warmer events are answered right away, without routing or request logging.
+        # API events never have these keys, so they pass with two key lookups.
+        def adapted_handler(event, context):
+            if ("source" in event or "warmer" in event) and is_warmer_event(event):
+                self.warm()
+                return dict(WARMER_RESPONSE)
+            request = as_request(event)
+            return request.format_response(handler(request, context))
+
+        return adapted_handler
+
+    def _instrument(self, handler, router: Router, metrics: HotPathMetrics):
+        # Wrap the exported handler so that sampled requests are timed phase by phase
+        # and the timings are emitted as metrics per route template
+        metrics.init_duration = perf_counter() - self._init_started
+
+        def instrumented_handler(request, context):
+            cold_start = metrics.cold_start
+            if cold_start:
+                metrics.cold_start = False
+                metrics.record_init()
+            if not metrics.should_sample():
+                return handler(request, context)
+
+            timings: dict[str, float] = {}
+            start = perf_counter()
+            method, params, error_response = self._match_route(router, request)
+            timings["routing"] = perf_counter() - start
+            if error_response is not None:
+                metrics.record(UNMATCHED_ROUTE, timings, cold_start)
+                return error_response
+
+            response = method["handler"](params, request, context, timings)
+            metrics.record(method["route_key"], timings, cold_start)
+            return response
+
+        return instrumented_handler
+
+    def export_batch(self, max_workers: int = 1):
+        # Export a handler for batches of API-shaped events, e.g. from an SQS queue or
+        # Kinesis stream. Each record runs through the same routing, auth and injection
+        # pipeline as a regular request. Returns the per-item responses and the server
+        # errors as partial batch failures (for ReportBatchItemFailures).
+        return BatchDispatcher(self.export(), max_workers=max_workers, codec=self.codec)
+
+    def _export_streaming(self, router: Router, stream_format: str, chunk_size: int):
+        # In streaming mode, the exported handler writes the response to a Lambda
+        # response stream: handlers that return lists, iterators or generators (sync or
+        # async) have their items encoded incrementally as a JSON array or NDJSON, so
+        # that peak memory is bounded by the chunk size rather than by the size of the
+        # response. Middleware hooks work on response dicts, so they do not apply to
+        # streams.
+        #
+        # The exported handler takes (event, response_stream, context), the contract of
+        # Node.js's streamifyResponse. The managed Python runtimes do not pass a
+        # response stream, so streaming exports need a runtime that does: a custom
+        # runtime (provided.al2023) with a streaming-capable runtime interface client,
+        # or a web adapter that bridges to one, e.g. for function URLs with
+        # InvokeMode RESPONSE_STREAM. Locally, LocalResponseStream stands in for it.
+        if stream_format not in STREAM_CONTENT_TYPES:
+            raise ValueError(f"Unsupported stream format: {stream_format}")
+
+        token_verifier = self.token_verifier
+
+        def stream_response(event, response_stream, context) -> int:
+            # Returns the status code that was written
+            request = as_request(event)
+            if token_verifier is not None:
+                request = token_verifier.authenticate(request)
+            method, params, error_response = self._match_route(router, request)
+            if error_response is not None:
+                write_api_response(response_stream, error_response)
+                return error_response["statusCode"]
+            try:
+                try:
+                    result = method["call"](params, request, context)
+                except ApiError as e:
+                    error_response = e.to_api_response(self.codec)
+                    write_api_response(response_stream, error_response)
+                    return error_response["statusCode"]
+                return stream_result(response_stream, result, self.codec, stream_format, chunk_size)
+            finally:
+                # Generators may use request-scoped dependencies until the stream ends
+                close_request_dependencies(request)
+
+        request_logger = self.request_logger
+        if request_logger is None:
+            respond = stream_response
+        else:
+
+            def respond(event, response_stream, context) -> int:
+                start = perf_counter()
+                request_logger.log_event(event)
+                status_code = stream_response(event, response_stream, context)
+                request_logger.log_access(event, status_code, start)
+                return status_code
+
+        # Warmer events are answered right away, as in the buffered export
+        def handler(event, response_stream, context):
+            if ("source" in event or "warmer" in event) and is_warmer_event(event):
+                self.warm()
+                write_api_response(response_stream, api_response(WARMER_RESPONSE, 200, self.codec))
+                return
+            respond(event, response_stream, context)
 
         return handler
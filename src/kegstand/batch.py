@@ -0,0 +1,85 @@
+import base64
+import json
+from itertools import repeat
+from typing import Any
+
+from .log import get_logger
+from .utils import api_response
+
+logger = get_logger()
+
+
+def record_identifier(record: dict[str, Any], index: int) -> str:
+    # The item identifier used to report partial batch failures
+    event_source = record.get("eventSource")
+    if event_source == "aws:sqs":
+        return record["messageId"]
+    if event_source == "aws:kinesis":
+        return record["kinesis"]["sequenceNumber"]
+    return str(index)
+
+
+def decode_record(record: dict[str, Any]) -> dict[str, Any]:
+    # SQS messages carry the API event as a JSON body, Kinesis records as base64-encoded
+    # JSON data, and anything else is taken to be an API event already
+    event_source = record.get("eventSource")
+    if event_source == "aws:sqs":
+        return json.loads(record["body"])
+    if event_source == "aws:kinesis":
+        return json.loads(base64.b64decode(record["kinesis"]["data"]))
+    return record
+
+
+def is_failed_response(response: dict[str, Any]) -> bool:
+    # Client errors (4xx) would fail again on retry, so only server errors are reported
+    # as batch item failures
+    return response["statusCode"] >= 500  # noqa: PLR2004
+
+
+# BatchDispatcher routes a batch of API-shaped records (from SQS, Kinesis or a plain
+# list of API events) through an exported RestApi handler, optionally on a bounded
+# thread pool which is created once and reused across warm invocations.
+class BatchDispatcher:
+    def __init__(self, handler, max_workers: int = 1, codec=None):
+        self.handler = handler
+        self.codec = codec
+        self.executor = None
+        if max_workers > 1:
+            from concurrent.futures import ThreadPoolExecutor
+
+            self.executor = ThreadPoolExecutor(max_workers)
+
+    def dispatch(self, record: dict[str, Any], index: int, context) -> dict[str, Any]:
+        item_identifier = record_identifier(record, index)
+        try:
+            api_event = decode_record(record)
+            api_event.setdefault("body", None)
+            api_event.setdefault("requestContext", {})
+            response = self.handler(api_event, context)
+        except Exception:
+            logger.exception(f"Unhandled error processing batch item {item_identifier}")
+            response = api_response({"error": "Internal server error"}, 500, self.codec)
+
+        return {"itemIdentifier": item_identifier, **response}
+
+    def __call__(self, event, context):
+        records = event["Records"] if isinstance(event, dict) else event
+        if self.executor is None:
+            results = [
+                self.dispatch(record, index, context) for index, record in enumerate(records)
+            ]
+        else:
+            results = list(
+                self.executor.map(
+                    self.dispatch, records, range(len(records)), repeat(context, len(records))
+                )
+            )
+
+        return {
+            "batchItemFailures": [
+                {"itemIdentifier": result["itemIdentifier"]}
+                for result in results
+                if is_failed_response(result)
+            ],
+            "results": results,
+        }
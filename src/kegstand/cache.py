@@ -0,0 +1,136 @@
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any
+
+from .request import as_request
+
+
+def _hashable(value):
+    if isinstance(value, list):
+        return tuple(_hashable(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _hashable(item)) for key, item in value.items()))
+    return value
+
+
+# Keys on the whole query string or on all claims, rather than on a declared subset
+ALL = "*"
+
+
+# ResponseCache is a size-bounded (LRU), TTL-evicted cache of serialized responses for
+# GET routes. It is kept in memory for the life of the warm container. The cache key
+# is built from the route, its path params, the declared subset of query params and,
+# optionally, the declared subset of claims; routes serving per-user data should
+# declare the claims that identify the user (e.g. claims=["sub"]) so that cached
+# responses are never shared across users. Routes whose handlers take `claims` or
+# `query` but declare no such keys are keyed on all of them (see route_key). One cache
+# can be shared by several routes, e.g. through method_defaults. Authorization is
+# always checked before the cache is consulted.
+class ResponseCache:
+    def __init__(
+        self,
+        ttl: float = 60,
+        max_size: int = 128,
+        query: list[str] | None = None,
+        claims: list[str] | None = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.query_keys: tuple[str, ...] | str = ALL if query == ALL else tuple(query or ())
+        self.claim_keys: tuple[str, ...] | str = ALL if claims == ALL else tuple(claims or ())
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[Any, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def route_key(
+        self,
+        route_key: str,
+        query: tuple[str, ...] | str | None = None,
+        claims: tuple[str, ...] | str | None = None,
+    ) -> Callable[[dict[str, str], Any], Any]:
+        # Returns key(params, event) for one route, with the route's own query and claim
+        # keys (the cache's by default), so that routes sharing the cache can key
+        # differently without changing it
+        query_keys = self.query_keys if query is None else query
+        claim_keys = self.claim_keys if claims is None else claims
+
+        def key(params, event):
+            request = as_request(event)
+            if query_keys == ALL:
+                query_key = _hashable(request.query)
+            else:
+                query = request.query
+                query_key = tuple(query.get(name) for name in query_keys)
+            if not claim_keys:
+                claims_key: Any = ()
+            elif claim_keys == ALL:
+                claims_key = _hashable(request.claims or {})
+            else:
+                claims = request.claims or {}
+                claims_key = tuple(_hashable(claims.get(name)) for name in claim_keys)
+            return (route_key, tuple(sorted(params.items())), query_key, claims_key)
+
+        return key
+
+    def key(self, route_key, params, event):
+        return self.route_key(route_key)(params, event)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, response = entry
+                if expires_at > self.clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return response
+                del self._entries[key]
+                self.evictions += 1
+            self.misses += 1
+            return None
+
+    def set(self, key, response: dict[str, Any]):
+        with self._lock:
+            self._entries[key] = (self.clock() + self.ttl, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute: Callable[[], dict[str, Any]]) -> dict[str, Any]:
+        response = self.get(key)
+        if response is None:
+            response = compute()
+            self.set(key, response)
+        # Callers may add headers to the response, so never hand out the cached dict
+        return {**response, "headers": dict(response["headers"])}
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+        }
+
+
+def make_response_cache(cache) -> ResponseCache | None:
+    # The `cache=` route option is either a ResponseCache, True for the defaults, or a
+    # TTL in seconds
+    if cache is None or cache is False:
+        return None
+    if isinstance(cache, ResponseCache):
+        return cache
+    if cache is True:
+        return ResponseCache()
+    return ResponseCache(ttl=cache)
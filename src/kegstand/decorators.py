@@ -1,23 +1,58 @@
-import inspect
-import json
 from functools import wraps
+from time import perf_counter
 from typing import Any
-from urllib.parse import unquote_plus
 
-from . import Logger
-from .utils import api_response
+from .cache import ALL, ResponseCache, make_response_cache
+from .dependencies import CONTAINER, Dependencies, close_request_dependencies
+from .errors import ApiError as ApiError
+from .etags import ConditionalGet, conditional_response, make_conditional_get, version_etag
+from .invocation import InvocationPlan
+from .limits import RouteLimit, make_route_limit
+from .log import get_logger
+from .middleware import Middleware
+from .pagination import Paginator, make_paginator
+from .request import as_request
+from .response_compression import ResponseCompression, make_response_compression
+from .router import Router
+from .utils import api_response, get_event_claims
 
-logger = Logger()
+logger = get_logger()
 
 
 # ApiResource provides a resource object that provides decorators for get, post, put, and delete
 # methods. The resource object also provides a prefix property that can be used to get the
 # resource's base prefix.
 class ApiResource:
-    def __init__(self, prefix: str, method_defaults: dict | None = None):
+    def __init__(
+        self,
+        prefix: str,
+        method_defaults: dict | None = None,
+        codec=None,
+        dependencies: Dependencies | None = None,
+    ):
         self.prefix = prefix
+        # JSON codec for request and response bodies; inherited from the RestApi if unset
+        self.codec = codec
+        # Response compression, inherited from the RestApi; routes can override it
+        self.compression: ResponseCompression | None = None
+        # Dependencies injected into handlers by argument name; falls back to the RestApi's
+        self.dependencies = dependencies or Dependencies()
+        # Middleware for this resource's routes, inside the RestApi's (see kegstand.middleware)
+        self.middleware: list[Middleware] = []
         self.methods: list[dict[str, Any]] = []
         self.method_defaults = method_defaults or {}
+        self._router: Router | None = None
+
+    def dependency(self, name: str | None = None, scope: str = CONTAINER, **options):
+        # Decorator that registers a dependency factory for this resource's handlers
+        return self.dependencies.provide(name, scope, **options)
+
+    def use(self, middleware: Middleware):
+        # Requests are routed before resource middleware runs
+        if getattr(middleware, "before_route", None) is not None:
+            raise ValueError("before_route hooks only apply to RestApi middleware")
+        self.middleware.append(middleware)
+        return middleware
 
     def get(self, route: str = "/", **kwargs):
         return self._method_decorator("GET", route, **{**self.method_defaults, **kwargs})
@@ -34,245 +69,394 @@ class ApiResource:
     # Route contains the path to the resource method, relative to the resource's prefix
     # and may include dynamic segments (e.g. `/:id`).
     def _method_decorator(self, method: str, route: str, **kwargs):
-        def decorator(func):
-            @wraps(func)
-            def wrapper(params, event, _context):
-                if event["httpMethod"] != method:
-                    return api_response(
-                        {"error": f"Method not allowed for prefix {self.prefix}"}, 405
-                    )
+        # Request body schemas only apply to POST and PUT, even if the option comes
+        # from method_defaults
+        if method not in ("POST", "PUT"):
+            kwargs.pop("schema", None)
 
-                try:
-                    data = json.loads(event["body"]) if event["body"] else {}
-                except json.JSONDecodeError:
-                    return api_response({"error": "Invalid JSON data provided"}, 400)
+        def decorator(func):
+            # Read auth configuration and compile the invocation plan once, up front
+            # Auth defaults to checking for a valid requestContext
+            auth_conditions = kwargs.get("auth", Auth())
+            if not isinstance(auth_conditions, list):
+                auth_conditions = [auth_conditions]
+            authorize = _make_authorizer(self, method, compile_auth_conditions(auth_conditions))
+            # Only GET responses are cached or paginated, even if the options come from
+            # method_defaults
+            cache = make_response_cache(kwargs.get("cache")) if method == "GET" else None
+            paginator = _make_paginator(kwargs) if method == "GET" else None
+            plan = InvocationPlan(func, self, kwargs)
+            route_key = f"{method} {self.prefix + route}"
+            cache_key = _make_cache_key(cache, plan, paginator, route_key)
+            compress = _make_compressor(self, kwargs)
+
+            limit = make_route_limit(kwargs.get("limit"))
+            invoke = _make_invoke(plan, limit, paginator, route_key)
+
+            # ETags and conditional GETs (304 Not Modified) only apply to GET routes
+            conditional_respond = _make_conditional_responder(
+                self,
+                make_conditional_get(kwargs.get("etag")) if method == "GET" else None,
+                authorize,
+                kwargs,
+            )
 
+            # The handlers below accept a Request or a raw event, and pass a Request on
+            def call(params, event, context):
+                # Runs the handler function and returns its raw result. May raise ApiError
+                event = as_request(event)
+                authorize(event)
+                # Call the function with the injected arguments it asks for
+                return invoke(params, event, context)
+
+            def serialize(result, timings):
+                if timings is None:
+                    return api_response(result, 200, self.codec)
+                start = perf_counter()
+                response = api_response(result, 200, self.codec)
+                timings["serialize"] = perf_counter() - start
+                return response
+
+            def respond(params, event, context, timings=None):
                 try:
-                    # Authorization
-                    # Defaults to checking for a valid requestContext
-                    auth_conditions = kwargs.get("auth", Auth())
-                    if not isinstance(auth_conditions, list):
-                        auth_conditions = [auth_conditions]
-
-                    # Validate each auth condition
-                    for auth_condition in auth_conditions:
-                        if not auth_condition.evaluate(event):
-                            return api_response({"error": "Unauthorized"}, 401)
-
-                    # If the func has a "claims" argument, then we have to pass
-                    # in the authorized user properties (claims) from the authorizer
-                    claims = None
-                    if "claims" in inspect.signature(func).parameters:
-                        if (
-                            "authorizer" not in event["requestContext"]
-                            or "claims" not in event["requestContext"]["authorizer"]
-                        ):
-                            return api_response(
-                                {"error": "Unauthorized (missing authorizer context)"}, 401
-                            )
-                        claims = event["requestContext"]["authorizer"]["claims"]
-
-                    # Other injected arguments
-                    # If the func has a "query" argument, then we have to pass
-                    # in the query string parameters from the event
-                    query = None
-                    if "query" in inspect.signature(func).parameters:
-                        query = event["queryStringParameters"] or {}
-
-                    # Call the function with the authorized user properties
-                    response = self._call_func_with_arguments(
-                        method,
-                        func,
-                        params,
-                        query=query,
-                        data=data,
-                        claims=claims,
-                    )
-
+                    start = perf_counter() if timings is not None else 0.0
+                    authorize(event)
+                    if timings is not None:
+                        timings["auth"] = perf_counter() - start
+                    if cache is not None:
+                        return cache.get_or_compute(
+                            cache_key(params, event),
+                            lambda: serialize(invoke(params, event, context, timings), timings),
+                        )
+                    return serialize(invoke(params, event, context, timings), timings)
                 except ApiError as e:
-                    return e.to_api_response()
+                    return e.to_api_response(self.codec)
 
-                return api_response(response, 200)
-
-            # Read auth configuration and add it to the method config object
-            auth_conditions = kwargs.get("auth", Auth())
-            if not isinstance(auth_conditions, list):
-                auth_conditions = [auth_conditions]
+            # The route handler. RestApi passes a timings dict when hot-path metrics are
+            # enabled and the request is sampled, and the duration of each phase is
+            # recorded in it; otherwise nothing is timed.
+            @wraps(func)
+            def wrapper(params, event, context, timings=None):
+                request = as_request(event)
+                try:
+                    response = conditional_respond(respond, params, request, context, timings)
+                finally:
+                    close_request_dependencies(request)
+                return compress(response, request, timings)
 
             self.methods.append(
                 {
                     "route": route,
                     "full_route": self.prefix + route,
                     "method": method,
+                    "route_key": route_key,
                     "handler": wrapper,
+                    "call": call,
                     "auth": auth_conditions,
+                    "plan": plan,
+                    "cache": cache,
+                    "cache_key": cache_key,
+                    "paginator": paginator,
+                    "limit": limit,
                 }
             )
+            self._router = None
 
             return wrapper
 
         return decorator
 
-    def _call_func_with_arguments(self, method, func, params, **kwargs):
-        # Calls different function signatures depending on different method types
-        # and whether or not claims are present:
-        #   - func()
-        #   - func(params=params)
-        #   - func(query=query)
-        #   - func(params=params, query=query)
-        #   - func(params=params, data=data)
-        #   - func(params=params, claims=claims)
-        #   - func(params=params, query=query, data=data, claims=claims)
-        #   - etc.
-        #
-        # May raise ApiError
-        func_kwargs = {}
-        if len(params) > 0:
-            func_kwargs["params"] = params
-        if method in ["POST", "PUT"]:  # TODO: add support for PATCH
-            func_kwargs["data"] = kwargs.get("data", {})
+    def get_matching_route(self, httpmethod: str, request_uri: str):
+        # Compile the resource's routes on first use (and again after new routes are added)
+        if self._router is None:
+            self._router = Router()
+            for method in self.methods:
+                self._router.add(method["method"], method["full_route"], method)
 
-        # Add querystring parameters if a "query" parameter was passed in
-        query = kwargs.get("query")
-        if query is not None:
-            func_kwargs["query"] = query
+        return self._router.match(httpmethod, request_uri)
 
-        # Add authorized user properties (claims) if a "claims" parameter was passed in
-        claims = kwargs.get("claims")
-        if claims is not None:
-            func_kwargs["claims"] = claims
 
-        return func(**func_kwargs)
+def _make_authorizer(resource: ApiResource, method: str, auth_predicate):
+    def authorize(request):
+        # May raise ApiError
+        if request.method != method:
+            raise ApiError(f"Method not allowed for prefix {resource.prefix}", 405)
+
+        # Validate the auth conditions against the claims, extracted once
+        if auth_predicate is not None:
+            claims = request.claims
+            if claims is None or not auth_predicate(claims):
+                raise ApiError("Unauthorized", 401)
+
+    return authorize
+
+
+def _make_paginator(options: dict[str, Any]) -> Paginator | None:
+    paginator = make_paginator(options.get("paginate"))
+    if paginator is None:
+        return None
+    # The page argument is injected from the same paginator
+    options["paginate"] = paginator
+    return paginator
+
+
+def _make_cache_key(
+    cache: ResponseCache | None, plan: InvocationPlan, paginator: Paginator | None, route_key: str
+):
+    # Returns the route's cache key function. Handlers that take the claims or the
+    # query string, or request-scoped dependencies created from them, may respond
+    # differently for each of them, so unless the cache declares which ones matter, the
+    # route is keyed on all of them. Each page of a paginated route is a different
+    # response. The shared cache is never changed. Dependencies are only known once the
+    # resource has been added to a RestApi, so the key is built on first use.
+    if cache is None:
+        return None
+    route_cache_key = None
+
+    def cache_key(params, event):
+        nonlocal route_cache_key
+        if route_cache_key is None:
+            route_cache_key = _route_cache_key(cache, plan.injected_names(), paginator, route_key)
+        return route_cache_key(params, event)
+
+    return cache_key
+
+
+def _route_cache_key(
+    cache: ResponseCache, injected: set[str], paginator: Paginator | None, route_key: str
+):
+    query_keys = cache.query_keys
+    if "query" in injected and not query_keys:
+        query_keys = ALL
+    if paginator is not None and query_keys != ALL:
+        query_keys = (*query_keys, *(key for key in ("limit", "cursor") if key not in query_keys))
+    claim_keys = cache.claim_keys
+    if "claims" in injected and not claim_keys:
+        claim_keys = ALL
+    return cache.route_key(route_key, query_keys, claim_keys)
+
+
+def _make_invoke(
+    plan: InvocationPlan, limit: RouteLimit | None, paginator: Paginator | None, route_key: str
+):
+    # Returns invoke(params, event, context, timings=None), which runs the handler within
+    # the route's limits and wraps its result in the pagination envelope. Rate and
+    # concurrency limits apply to running the handler, so responses served from the
+    # cache do not count.
+    invoke = plan.invoke
+    if paginator is not None:
+        skip_offset = not any(name == "page" for name, _ in plan.injectors)
+
+        def paginated_invoke(params, event, context, timings=None):
+            result = plan.invoke(params, event, context, timings)
+            if timings is None:
+                return paginator.envelope(result, event, skip_offset)
+            # Lazy results are only produced here, so this counts as handler time
+            start = perf_counter()
+            result = paginator.envelope(result, event, skip_offset)
+            timings["handler"] += perf_counter() - start
+            return result
+
+        invoke = paginated_invoke
+    if limit is None:
+        return invoke
+
+    def limited_invoke(params, event, context, timings=None):
+        return limit.run(route_key, event, invoke, params, event, context, timings)
+
+    return limited_invoke
+
+
+def _make_conditional_responder(
+    resource: ApiResource, conditional: ConditionalGet | None, authorize, options: dict[str, Any]
+):
+    # Returns a function that runs respond(params, request, context, *args) and applies
+    # the route's ETag, answering with a 304 if the client already has the response
+    version_plan = (
+        InvocationPlan(conditional.version_key, resource, options)
+        if conditional is not None and conditional.version_key is not None
+        else None
+    )
+
+    def conditional_respond(respond, params, request, context, *args):
+        if conditional is None:
+            return respond(params, request, context, *args)
+
+        etag = None
+        if version_plan is not None:
+            # The version key is looked up before the handler runs, but never before
+            # the request is authorized
+            try:
+                authorize(request)
+                etag = version_etag(version_plan.invoke(params, request, context))
+            except ApiError as e:
+                return e.to_api_response(resource.codec)
+            not_modified = conditional_response(request, etag)
+            if not_modified is not None:
+                return not_modified
+        return conditional.apply(respond(params, request, context, *args), request, etag)
+
+    return conditional_respond
+
+
+def _make_compressor(resource: ApiResource, options: dict[str, Any]):
+    # The `compress=` route option overrides the resource's compression setting (which
+    # is inherited from the RestApi). Responses are compressed per request, after the
+    # response cache, since the encoding depends on the request's Accept-Encoding.
+    inherit = "compress" not in options
+    route_compression = make_response_compression(options.get("compress"))
+
+    def compress(response, request, timings=None):
+        compression = resource.compression if inherit else route_compression
+        if compression is None:
+            return response
+        start = perf_counter()
+        response = compression.compress(response, request)
+        if timings is not None:
+            timings["compress"] = perf_counter() - start
+        return response
+
+    return compress
+
+
+def _casefold(value):
+    return value.casefold() if isinstance(value, str) else value
+
+
+def _membership(collection):
+    # Pre-normalize the collection into a frozenset for O(1) membership tests,
+    # falling back to a tuple if it contains unhashable items
+    try:
+        members = frozenset(collection)
+    except TypeError:
+        members = tuple(collection)
+
+    def is_member(value):
+        try:
+            return value in members
+        except TypeError:  # Unhashable claim value
+            return False
 
-    def get_matching_route(self, httpmethod: str, request_uri: str):
-        for method in self.methods:
-            params = self._route_matcher(httpmethod, request_uri, method)
-            if params is not None:
-                return method, params
-
-        return None, None
-
-    def _route_matcher(self, httpmethod, request_uri, method):
-        # If the method doesn't match, the routes don't match
-        if httpmethod != method["method"]:
-            return None
-
-        # Split the request_uri into segments
-        # Remove trailing slash if present (/hello/world/ -> /hello/world)
-        if request_uri.endswith("/"):
-            request_uri = request_uri[:-1]
-        segments = request_uri.split("/")
-
-        # And same for the method's full route
-        method_route = method["full_route"]
-        if method_route.endswith("/"):
-            method_route = method_route[:-1]
-        method_segments = method_route.split("/")
-
-        # If the number of segments doesn't match, the routes don't match
-        if len(segments) != len(method_segments):
-            return None
-
-        # Loop through the segments and compare them
-        route_params = {}
-        for i in range(len(segments)):
-            # If the segment is a dynamic segment, it matches
-            if method_segments[i].startswith(":"):
-                route_params[method_segments[i][1:]] = unquote_plus(segments[i])
-                continue
-
-            # If the segment doesn't match, the routes don't match
-            if segments[i] != method_segments[i]:
-                return None
-
-        # If we've made it this far, the routes match
-        return route_params
+    return is_member
 
 
+# Auth collects conditions on the authorizer claims, e.g.
+#   claim("role").eq("admin").claim("groups").contains("beer")
+# Each condition binds its claim key and normalizes its operands when it is added,
+# and the conditions are compiled into a single predicate over the claims dict.
 class Auth:
     def __init__(self):
         self.conditions = []
+        self.current_claim = None
+        self._predicate = None
+
+    def claim(self, claim_key):
+        self.current_claim = claim_key
+        return self
 
     def _claim(self, claim):
-        self.current_claim = claim
+        return self.claim(claim)
+
+    def _add_condition(self, condition):
+        self.conditions.append(condition)
+        self._predicate = None
         return self
 
     def eq(self, value, case_sensitive=True):
+        claim_key = self.current_claim
         if not case_sensitive:
-            self.conditions.append(
-                lambda claims: claims.get(self.current_claim).lower() == value.lower()
+            folded_value = _casefold(value)
+            return self._add_condition(
+                lambda claims: _casefold(claims.get(claim_key)) == folded_value
             )
-        else:
-            self.conditions.append(lambda claims: claims.get(self.current_claim) == value)
-
-        return self
+        return self._add_condition(lambda claims: claims.get(claim_key) == value)
 
     def contains(self, value, case_sensitive=True):
+        claim_key = self.current_claim
         if not case_sensitive:
-            self.conditions.append(
-                lambda claims: value.lower()
-                in [
-                    claim_list_item.lower()
-                    for claim_list_item in claims.get(self.current_claim, [])
-                ]
+            folded_value = _casefold(value)
+            return self._add_condition(
+                lambda claims: any(
+                    _casefold(claim_list_item) == folded_value
+                    for claim_list_item in claims.get(claim_key) or ()
+                )
             )
-        else:
-            self.conditions.append(lambda claims: value in claims.get(self.current_claim, []))
-        return self
+        return self._add_condition(lambda claims: value in (claims.get(claim_key) or ()))
+
+    def _compare(self, compare):
+        # Missing or incomparable claims never satisfy a comparison
+        claim_key = self.current_claim
+
+        def condition(claims):
+            claim_value = claims.get(claim_key)
+            if claim_value is None:
+                return False
+            try:
+                return compare(claim_value)
+            except TypeError:
+                return False
+
+        return self._add_condition(condition)
 
     def gt(self, value):
-        self.conditions.append(lambda claims: claims.get(self.current_claim, None) > value)
-        return self
+        return self._compare(lambda claim_value: claim_value > value)
 
     def gte(self, value):
-        self.conditions.append(lambda claims: claims.get(self.current_claim, None) >= value)
-        return self
+        return self._compare(lambda claim_value: claim_value >= value)
 
     def lt(self, value):
-        self.conditions.append(lambda claims: claims.get(self.current_claim, None) < value)
-        return self
+        return self._compare(lambda claim_value: claim_value < value)
 
     def lte(self, value):
-        self.conditions.append(lambda claims: claims.get(self.current_claim, None) <= value)
-        return self
+        return self._compare(lambda claim_value: claim_value <= value)
 
     def in_collection(self, collection):
-        self.conditions.append(lambda claims: claims.get(self.current_claim, None) in collection)
-        return self
+        claim_key = self.current_claim
+        is_member = _membership(collection)
+        return self._add_condition(lambda claims: is_member(claims.get(claim_key)))
 
     def not_in_collection(self, collection):
-        self.conditions.append(
-            lambda claims: claims.get(self.current_claim, None) not in collection
-        )
-        return self
+        claim_key = self.current_claim
+        is_member = _membership(collection)
+        return self._add_condition(lambda claims: not is_member(claims.get(claim_key)))
+
+    def compile(self):
+        # Returns a single predicate over the claims dict, or None if there are no
+        # conditions (in which case no claims are required at all)
+        if self._predicate is None and self.conditions:
+            conditions = tuple(self.conditions)
+            if len(conditions) == 1:
+                self._predicate = conditions[0]
+            else:
+                self._predicate = lambda claims: all(condition(claims) for condition in conditions)
+        return self._predicate
 
     def evaluate(self, event):
-        if len(self.conditions) == 0:
+        predicate = self.compile()
+        if predicate is None:
             return True
 
-        if (
-            "authorizer" not in event["requestContext"]
-            or "claims" not in event["requestContext"]["authorizer"]
-        ):
+        claims = get_event_claims(event)
+        if claims is None:
             return False
-        claims = event["requestContext"]["authorizer"]["claims"]
-        return all(condition(claims) for condition in self.conditions)
+        return predicate(claims)
+
+
+def compile_auth_conditions(auth_conditions: list[Auth]):
+    # Combine the conditions of several Auth objects into a single predicate over
+    # the claims dict, or None if none of them has any conditions
+    predicates = tuple(
+        predicate
+        for predicate in (auth_condition.compile() for auth_condition in auth_conditions)
+        if predicate is not None
+    )
+    if not predicates:
+        return None
+    if len(predicates) == 1:
+        return predicates[0]
+    return lambda claims: all(predicate(claims) for predicate in predicates)
 
 
 def claim(claim_key):
     instance = Auth()
     return instance._claim(claim_key)
-
-
-class ApiError(Exception):
-    def __init__(self, error_message, status_code: int = 400):
-        Exception.__init__(self)
-        self.error_message = error_message
-        self.status_code = status_code
-        logger.warning(f"API Error (status {status_code}): {error_message}")
-
-    def to_dict(self):
-        return {"error": self.error_message}
-
-    def to_api_response(self):
-        return api_response(self.to_dict(), self.status_code)
@@ -0,0 +1,265 @@
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+from .log import get_logger
+from .request import as_request
+
+logger = get_logger()
+
+# Container-scoped dependencies are created on first use and kept for the life of the
+# warm container; request-scoped dependencies are created once per request
+CONTAINER = "container"
+REQUEST = "request"
+
+_MISSING: Any = object()
+
+
+# Provider creates and holds one named dependency. Container-scoped factories may ask
+# for other container-scoped dependencies by argument name. Request-scoped factories
+# are injected like a handler, so they may also ask for params, query, data, claims and
+# container-scoped dependencies (e.g. a session checked out from a connection pool).
+# Request-scoped values are passed to close (if set) once the route handler finishes,
+# e.g. to return the session to the pool.
+#
+# Stale container-scoped values are replaced with a fresh one from the factory, after
+# passing the old value to close (if set), when:
+# - they are older than max_age seconds, e.g. clients holding temporary credentials
+# - health_check(value) returns False or raises, e.g. a dropped database connection.
+#   The check runs on the request path, at most every check_interval seconds
+# - refresh() is called, e.g. by a handler that caught a connection error
+class Provider:
+    def __init__(  # noqa: PLR0913
+        self,
+        name: str,
+        factory: Callable,
+        scope: str = CONTAINER,
+        health_check: Callable[[Any], bool] | None = None,
+        check_interval: float = 60,
+        max_age: float | None = None,
+        close: Callable[[Any], Any] | None = None,
+        registry: "Dependencies | None" = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if scope not in (CONTAINER, REQUEST):
+            raise ValueError(f"Unsupported dependency scope: {scope}")
+        if scope == REQUEST and (health_check is not None or max_age is not None):
+            raise ValueError("Only container-scoped dependencies have health checks and max_age")
+        self.name = name
+        self.factory = factory
+        self.scope = scope
+        self.health_check = health_check
+        self.check_interval = check_interval
+        self.max_age = max_age
+        self.close = close
+        self.registry = registry
+        self.clock = clock
+        self.value = _MISSING
+        self.created = 0
+        self.refreshed = 0
+        self._created_at = 0.0
+        self._checked_at = 0.0
+        # The time of the next health check or max_age expiry, checked on every use
+        self._next_check = float("inf")
+        self._lock = threading.RLock()
+        self._creating = False
+        self._plan: Any = None
+
+    def _argument_names(self) -> list[str]:
+        import inspect
+
+        return list(inspect.signature(self.factory).parameters)
+
+    def _create(self):
+        if self._creating:
+            raise ValueError(f"Dependency cycle involving {self.name!r}")
+        self._creating = True
+        try:
+            registry = self.registry or Dependencies()
+            value = self.factory(**{name: registry.get(name) for name in self._argument_names()})
+        finally:
+            self._creating = False
+        now = self.clock()
+        self.value = value
+        self.created += 1
+        self._created_at = self._checked_at = now
+        self._schedule_check()
+        return value
+
+    def _schedule_check(self):
+        next_check = float("inf")
+        if self.health_check is not None:
+            next_check = self._checked_at + self.check_interval
+        if self.max_age is not None:
+            next_check = min(next_check, self._created_at + self.max_age)
+        self._next_check = next_check
+
+    def _discard(self):
+        value, self.value = self.value, _MISSING
+        if value is not _MISSING and self.close is not None:
+            try:
+                self.close(value)
+            except Exception:
+                logger.exception(f"Error closing dependency {self.name!r}")
+
+    def _is_stale(self) -> bool:
+        now = self.clock()
+        if self.max_age is not None and now - self._created_at >= self.max_age:
+            return True
+        if self.health_check is not None and now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            self._schedule_check()
+            try:
+                healthy = self.health_check(self.value)
+            except Exception:
+                logger.exception(f"Health check of dependency {self.name!r} failed")
+                healthy = False
+            return not healthy
+        return False
+
+    def get(self):
+        # The container-scoped value, created or refreshed if needed
+        value = self.value
+        if value is not _MISSING and self.clock() < self._next_check:
+            return value
+        with self._lock:
+            if self.value is _MISSING:
+                return self._create()
+            if self._is_stale():
+                logger.info(f"Refreshing stale dependency {self.name!r}")
+                self.refreshed += 1
+                self._discard()
+                return self._create()
+            return self.value
+
+    def refresh(self):
+        # Drop the current value; the next use creates a new one
+        with self._lock:
+            self._discard()
+
+    def provide(self, params, event, context):
+        # Called by the injector of handler arguments with the dependency's name
+        if self.scope == CONTAINER:
+            return self.get()
+
+        # Request-scoped values are kept on the Request, so that the handler and
+        # anything else injected for the same request (e.g. an ETag version key or
+        # another dependency) share one value
+        request = as_request(event)
+        state = request.state
+        if self in state:
+            return state[self]
+        value = state[self] = self.plan().invoke(params, request, context)
+        return value
+
+    def plan(self):
+        # The invocation plan of a request-scoped factory, compiled on first use
+        if self._plan is None:
+            from .invocation import InvocationPlan
+
+            self._plan = InvocationPlan(self.factory, self.registry)
+        return self._plan
+
+    def stats(self) -> dict[str, Any]:
+        return {"scope": self.scope, "created": self.created, "refreshed": self.refreshed}
+
+
+def close_request_dependencies(request):
+    # Passes the request-scoped values created for the request to their provider's close
+    # function, most recently created first, so that values are closed before the ones
+    # they were created from
+    state = request._state
+    if not state:
+        return
+    for key, value in reversed(list(state.items())):
+        if isinstance(key, Provider) and key.close is not None:
+            del state[key]
+            try:
+                key.close(value)
+            except Exception:
+                logger.exception(f"Error closing dependency {key.name!r}")
+
+
+# Dependencies is a registry of named dependency factories, declared once and injected
+# into handler functions by argument name, like claims or data. Each ApiResource has a
+# registry, whose parent is the registry of the RestApi it is added to, so resources
+# can declare their own dependencies and use (or override) the ones shared by the API:
+#
+#   @api.dependency()
+#   def table():
+#       return boto3.resource("dynamodb").Table(os.environ["TABLE_NAME"])
+#
+#   @resource.get("/:id")
+#   def get_beer(params, table):
+#       return table.get_item(Key={"id": params["id"]})["Item"]
+class Dependencies:
+    def __init__(self, parent: "Dependencies | None" = None):
+        self.parent = parent
+        self.providers: dict[str, Provider] = {}
+
+    @property
+    def dependencies(self) -> "Dependencies":
+        # A registry stands in for the resource when request-scoped factories are
+        # compiled into invocation plans, so that their own arguments resolve here
+        return self
+
+    def register(self, name: str, factory: Callable, scope: str = CONTAINER, **options):
+        from .invocation import INJECTORS
+
+        if name in INJECTORS:
+            raise ValueError(f"{name!r} is a built-in handler argument")
+        provider = Provider(name, factory, scope, registry=self, **options)
+        self.providers[name] = provider
+        return provider
+
+    def provide(self, name: str | None = None, scope: str = CONTAINER, **options):
+        # Decorator form of register; the name defaults to the factory's name
+        def decorator(factory):
+            self.register(name or factory.__name__, factory, scope, **options)
+            return factory
+
+        return decorator
+
+    def lookup(self, name: str) -> Provider | None:
+        registry: Dependencies | None = self
+        while registry is not None:
+            provider = registry.providers.get(name)
+            if provider is not None:
+                return provider
+            registry = registry.parent
+        return None
+
+    def get(self, name: str):
+        # The value of a container-scoped dependency, e.g. for use outside of handlers
+        provider = self.lookup(name)
+        if provider is None:
+            raise KeyError(f"No dependency named {name!r}")
+        if provider.scope != CONTAINER:
+            raise ValueError(f"Request-scoped dependency {name!r} can only be injected")
+        return provider.get()
+
+    def refresh(self, name: str | None = None):
+        # Drop the value of one (or every) container-scoped dependency, which is
+        # created again on next use
+        if name is not None:
+            provider = self.lookup(name)
+            if provider is None:
+                raise KeyError(f"No dependency named {name!r}")
+            provider.refresh()
+            return
+        for provider in self.providers.values():
+            provider.refresh()
+
+    def warm(self):
+        # Create the container-scoped dependencies up front, e.g. during the init phase.
+        # Failures are logged and left for the first request to retry.
+        for provider in self.providers.values():
+            if provider.scope == CONTAINER:
+                try:
+                    provider.get()
+                except Exception:
+                    logger.exception(f"Error creating dependency {provider.name!r}")
+
+    def stats(self) -> dict[str, dict[str, Any]]:
+        return {name: provider.stats() for name, provider in self.providers.items()}
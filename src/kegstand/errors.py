@@ -0,0 +1,50 @@
+import math
+
+from .log import get_logger
+from .utils import api_response
+
+logger = get_logger()
+
+
+class ApiError(Exception):
+    def __init__(self, error_message, status_code: int = 400):
+        Exception.__init__(self)
+        self.error_message = error_message
+        self.status_code = status_code
+
+    def to_dict(self):
+        return {"error": self.error_message}
+
+    def to_api_response(self, codec=None):
+        # Client errors are expected (and show up in the access log), server errors are not
+        if self.status_code >= 500:  # noqa: PLR2004
+            logger.warning(
+                "API error",
+                extra={"status_code": self.status_code, "error": self.error_message},
+            )
+        return api_response(self.to_dict(), self.status_code, codec)
+
+
+# ValidationError is raised when a request body does not match the route's schema.
+# The response lists every invalid field, e.g.
+#   {"error": "Invalid request data", "fields": [{"field": "items[0].qty", "message": ...}]}
+class ValidationError(ApiError):
+    def __init__(self, field_errors: list[dict[str, str]], error_message="Invalid request data"):
+        ApiError.__init__(self, error_message, 400)
+        self.field_errors = field_errors
+
+    def to_dict(self):
+        return {"error": self.error_message, "fields": self.field_errors}
+
+
+# TooManyRequestsError is raised when a route's rate or concurrency limit is exceeded.
+# The response tells the client when to retry, in whole seconds.
+class TooManyRequestsError(ApiError):
+    def __init__(self, retry_after: float, error_message="Too many requests"):
+        ApiError.__init__(self, error_message, 429)
+        self.retry_after = retry_after
+
+    def to_api_response(self, codec=None):
+        response = ApiError.to_api_response(self, codec)
+        response["headers"]["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return response
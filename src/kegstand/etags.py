@@ -0,0 +1,105 @@
+import zlib
+from collections.abc import Callable
+from typing import Any
+
+# Content codings that response compression appends to the ETag (e.g. "abc-gzip"), so
+# that each representation has its own strong ETag
+ENCODING_SUFFIXES = ("-gzip", "-br")
+
+_hexdigest: Callable[[bytes], str] | None = None
+
+
+def _get_hexdigest() -> Callable[[bytes], str]:
+    # Use xxHash if it is installed; otherwise CRC-32 combined with the length, which
+    # is in the standard library. Neither is cryptographic, which an ETag does not need.
+    global _hexdigest  # noqa: PLW0603
+    if _hexdigest is None:
+        try:
+            from xxhash import xxh3_64_hexdigest  # type: ignore[import-not-found]
+
+            _hexdigest = xxh3_64_hexdigest
+        except ImportError:
+            _hexdigest = lambda data: f"{len(data):x}-{zlib.crc32(data):08x}"  # noqa: E731
+    return _hexdigest
+
+
+def compute_etag(body: str | bytes) -> str:
+    # A strong ETag for the serialized body
+    data = body.encode() if isinstance(body, str) else body
+    return f'"{_get_hexdigest()(data)}"'
+
+
+def version_etag(version: Any) -> str:
+    # A strong ETag for a handler-supplied version key (e.g. an updated_at timestamp)
+    return f'"v-{_get_hexdigest()(str(version).encode())}"'
+
+
+def _strip_encoding_suffix(tag: str) -> str:
+    for suffix in ENCODING_SUFFIXES:
+        if tag.endswith(f'{suffix}"'):
+            return f'{tag[: -len(suffix) - 1]}"'
+    return tag
+
+
+def matching_etag(if_none_match: str | None, etag: str) -> str | None:
+    # Returns the client's tag that matches etag, or None. If-None-Match uses weak
+    # comparison and matches any content coding of the tag; the client's tag is the
+    # one to send back, since it names the representation the client has.
+    if not if_none_match:
+        return None
+    if if_none_match.strip() == "*":
+        return etag
+    for client_tag in if_none_match.split(","):
+        tag = client_tag.strip().removeprefix("W/")
+        if _strip_encoding_suffix(tag) == etag:
+            return tag
+    return None
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    return matching_etag(if_none_match, etag) is not None
+
+
+def not_modified_response(etag: str) -> dict[str, Any]:
+    return {"statusCode": 304, "headers": {"ETag": etag}, "body": ""}
+
+
+def conditional_response(request, etag: str) -> dict[str, Any] | None:
+    # A 304 if the request's If-None-Match matches etag, otherwise None
+    tag = matching_etag(request.headers.get("if-none-match"), etag)
+    return not_modified_response(tag) if tag is not None else None
+
+
+# ConditionalGet adds a strong ETag to the successful responses of a GET route and
+# answers requests whose If-None-Match matches it with a bodyless 304. By default the
+# ETag is a hash of the serialized body, so the handler still runs but the body is not
+# sent again. Routes can instead supply a cheap version key function, which is called
+# with the same injected arguments as a handler (e.g. params), so that a 304 can be
+# answered without running the handler at all.
+class ConditionalGet:
+    def __init__(self, version_key: Callable | None = None):
+        self.version_key = version_key
+
+    def apply(self, response: dict[str, Any], request, etag: str | None = None):
+        # Add the ETag to a successful response, or replace it with a 304 if the
+        # client already has it
+        if response["statusCode"] != 200:  # noqa: PLR2004
+            return response
+        if etag is None:
+            etag = compute_etag(response["body"])
+        not_modified = conditional_response(request, etag)
+        if not_modified is not None:
+            return not_modified
+        return {**response, "headers": {**response["headers"], "ETag": etag}}
+
+
+def make_conditional_get(etag) -> ConditionalGet | None:
+    # The `etag=` route option is either True (hash the body), a version key function,
+    # or a ConditionalGet
+    if etag is None or etag is False:
+        return None
+    if isinstance(etag, ConditionalGet):
+        return etag
+    if etag is True:
+        return ConditionalGet()
+    return ConditionalGet(version_key=etag)
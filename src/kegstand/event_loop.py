@@ -0,0 +1,43 @@
+import threading
+from collections.abc import AsyncIterator, Coroutine, Iterator
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    import asyncio
+
+# Async handlers run on a persistent event loop that is created on first use and
+# then reused across warm invocations, so that clients bound to the loop (aiohttp
+# sessions, aioboto3 clients, ...) can be kept for the life of the container. Each
+# thread gets its own loop, since a loop can only run in one thread at a time.
+# asyncio is only imported once an async handler actually needs a loop.
+_local = threading.local()
+
+
+def get_event_loop() -> "asyncio.AbstractEventLoop":
+    loop = getattr(_local, "loop", None)
+    if loop is None or loop.is_closed():
+        import asyncio
+
+        loop = asyncio.new_event_loop()
+        _local.loop = loop
+    return loop
+
+
+def run_coroutine(coroutine: Coroutine[Any, Any, Any]) -> Any:
+    return get_event_loop().run_until_complete(coroutine)
+
+
+def iterate_async(items: AsyncIterator[Any]) -> Iterator[Any]:
+    # Iterates an async generator (e.g. from an `async def` handler that yields) from
+    # synchronous code, running it on the persistent event loop one item at a time
+    loop = get_event_loop()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(items.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        aclose = getattr(items, "aclose", None)
+        if aclose is not None:
+            loop.run_until_complete(aclose())
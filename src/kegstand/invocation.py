@@ -0,0 +1,196 @@
+from collections.abc import Callable
+from time import perf_counter
+from typing import Any
+
+from .dependencies import REQUEST
+from .errors import ApiError
+from .event_loop import iterate_async, run_coroutine
+from .json_codec import DEFAULT_CODEC
+from .pagination import page_injector
+from .request import as_request
+from .utils import get_event_claims
+from .validation import compile_schema
+
+# An injector produces the value for one argument that a handler function can ask
+# for by name. Injectors are called with the same (params, event, context) triple as
+# the route handler, where the event is usually a Request view (see kegstand.request),
+# and may raise ApiError to reject the request.
+Injector = Callable[[dict[str, str], dict[str, Any], Any], Any]
+
+# Injector factories are called once per route, at decoration time, with the route's
+# resource (or None) and its decorator options. Anything that can be worked out ahead
+# of the request belongs in the factory rather than in the injector it returns.
+InjectorFactory = Callable[[Any, dict[str, Any]], Injector]
+
+
+def _inject_claims(_params, event, _context):
+    # The authorized user properties (claims) from the authorizer
+    claims = get_event_claims(event)
+    if claims is None:
+        raise ApiError("Unauthorized (missing authorizer context)", 401)
+    return claims
+
+
+def _inject_params(params, _event, _context):
+    return params
+
+
+def _inject_query(_params, event, _context):
+    return as_request(event).query
+
+
+def _data_injector(resource, options):
+    # The request body is only decoded for handlers that take a `data` argument,
+    # using the resource's codec (which is set when it is added to a RestApi). If the
+    # route declares a schema, the decoded body is validated and converted right away,
+    # so invalid requests are rejected with a 400 before the handler runs.
+    validate = compile_schema(options["schema"]) if options.get("schema") is not None else None
+
+    def inject_data(_params, event, _context):
+        body = as_request(event).body
+        if not body:
+            data = {}
+        else:
+            codec = getattr(resource, "codec", None) or DEFAULT_CODEC
+            try:
+                data = codec.loads(body)
+            except ValueError as e:
+                raise ApiError("Invalid JSON data provided", 400) from e
+        return validate(data) if validate is not None else data
+
+    return inject_data
+
+
+# Registry of injectable arguments. Injectors run in registration order, so checks
+# that reject unauthorized requests (claims) come before the request body is decoded.
+INJECTORS: dict[str, InjectorFactory] = {
+    "claims": lambda _resource, _options: _inject_claims,
+    "params": lambda _resource, _options: _inject_params,
+    "query": lambda _resource, _options: _inject_query,
+    "page": page_injector,
+    "data": _data_injector,
+}
+
+
+def register_injector(name: str, factory: InjectorFactory):
+    # Make a new argument available to handler functions. Only routes decorated after
+    # registration will pick it up, since invocation plans are compiled at decoration time.
+    INJECTORS[name] = factory
+
+
+# Sentinel for handler arguments without a default value
+_NO_DEFAULT: Any = object()
+
+
+def _dependency_injector(resource, name: str, default) -> Injector:
+    # Other arguments are dependencies, looked up by name in the resource's registry
+    # (see kegstand.dependencies) on first use rather than at decoration time, since a
+    # resource only inherits the RestApi's dependencies when it is added to it.
+    # Arguments with a default value keep it if no such dependency is registered.
+    provider = None
+
+    def inject_dependency(params, event, context):
+        nonlocal provider
+        if provider is None:
+            dependencies = getattr(resource, "dependencies", None)
+            provider = dependencies.lookup(name) if dependencies is not None else None
+            if provider is None:
+                if default is not _NO_DEFAULT:
+                    return default
+                raise TypeError(f"No dependency named {name!r} is registered")
+        return provider.provide(params, event, context)
+
+    return inject_dependency
+
+
+# InvocationPlan is compiled once per route, at decoration time. It inspects the
+# handler function's signature up front and keeps only the injectors for the
+# arguments it accepts, so the per-request path just runs those and calls the function.
+# Arguments that are not built-in injectables are resolved as dependencies, after the
+# built-in ones, so unauthorized requests are rejected before any are created.
+class InvocationPlan:
+    def __init__(self, func: Callable, resource=None, options: dict[str, Any] | None = None):
+        # Imported here rather than at module level, since it is slow to import and
+        # only needed once routes are being declared
+        import inspect
+
+        parameters = inspect.signature(func).parameters
+        self.func = func
+        # Coroutine functions are run to completion on the persistent event loop, and
+        # async generators are iterated on it as their items are consumed
+        self.is_async_generator = inspect.isasyncgenfunction(func)
+        self.is_async = inspect.iscoroutinefunction(func) or self.is_async_generator
+        self.injectors: list[tuple[str, Injector]] = [
+            (name, factory(resource, options or {}))
+            for name, factory in INJECTORS.items()
+            if name in parameters
+        ]
+        self.resource = resource
+        # The other arguments, resolved as dependencies, with their default values
+        self.dependencies: dict[str, Any] = {
+            name: _NO_DEFAULT if parameter.default is parameter.empty else parameter.default
+            for name, parameter in parameters.items()
+            if name not in INJECTORS
+            and parameter.kind not in (parameter.VAR_POSITIONAL, parameter.VAR_KEYWORD)
+        }
+        self.injectors.extend(
+            (name, _dependency_injector(resource, name, default))
+            for name, default in self.dependencies.items()
+        )
+        # A declared request body schema is enforced even if the handler does not take
+        # the `data` argument, before any other argument is injected
+        self.validate_body: Injector | None = None
+        if "data" not in parameters and (options or {}).get("schema") is not None:
+            self.validate_body = _data_injector(resource, options)
+
+    def injected_names(self, _seen: set | None = None) -> set[str]:
+        # The built-in arguments (claims, query, ...) that a request needs: the handler's
+        # own, and those of the request-scoped dependencies it asks for, directly or
+        # through other ones. Looks up the dependencies, so it is only complete once the
+        # resource has been added to a RestApi, and raises TypeError for arguments
+        # without a default value that no registered dependency provides.
+        seen = set() if _seen is None else _seen
+        names = {name for name, _ in self.injectors if name in INJECTORS}
+        registry = getattr(self.resource, "dependencies", None)
+        for name, default in self.dependencies.items():
+            provider = registry.lookup(name) if registry is not None else None
+            if provider is None:
+                if default is _NO_DEFAULT:
+                    raise TypeError(f"No dependency named {name!r} is registered")
+                continue
+            if provider.scope == REQUEST and provider not in seen:
+                seen.add(provider)
+                names |= provider.plan().injected_names(seen)
+        return names
+
+    def check(self):
+        # Raises TypeError if a handler argument, or an argument of a request-scoped
+        # dependency it asks for, is neither built in nor a registered dependency
+        self.injected_names()
+
+    def inject(self, params, event, context) -> dict[str, Any]:
+        # May raise ApiError
+        if self.validate_body is not None:
+            self.validate_body(params, event, context)
+        return {name: inject(params, event, context) for name, inject in self.injectors}
+
+    def call(self, func_kwargs: dict[str, Any]):
+        result = self.func(**func_kwargs)
+        if self.is_async:
+            if self.is_async_generator:
+                return iterate_async(result)
+            return run_coroutine(result)
+        return result
+
+    def invoke(self, params, event, context, timings: dict[str, float] | None = None):
+        # May raise ApiError. If timings is given, the time spent injecting the
+        # arguments and running the function is recorded in it.
+        if timings is None:
+            return self.call(self.inject(params, event, context))
+        start = perf_counter()
+        func_kwargs = self.inject(params, event, context)
+        decoded = perf_counter()
+        result = self.call(func_kwargs)
+        timings["decode"] = decoded - start
+        timings["handler"] = perf_counter() - decoded
+        return result
@@ -0,0 +1,91 @@
+import datetime
+import json
+import sys
+from collections.abc import Iterator
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None  # type: ignore[assignment]
+
+
+def _encode_default(obj: Any) -> Any:
+    # Fallback encoder for types that the JSON backends do not handle natively.
+    # The decimal, uuid and dataclasses modules are looked up rather than imported,
+    # since an object can only be one of their types if the module is already loaded,
+    # and importing them (uuid and dataclasses especially) slows down Lambda init.
+    decimal = sys.modules.get("decimal")
+    # DynamoDB returns all numbers as Decimal, so integral values stay integers.
+    # Infinity and NaN become floats, which each backend encodes in its own way.
+    if decimal is not None and isinstance(obj, decimal.Decimal):
+        is_integral = obj.is_finite() and obj == obj.to_integral_value()
+        return int(obj) if is_integral else float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    uuid = sys.modules.get("uuid")
+    if uuid is not None and isinstance(obj, uuid.UUID):
+        return str(obj)
+    dataclasses = sys.modules.get("dataclasses")
+    if dataclasses is not None and dataclasses.is_dataclass(obj) and not isinstance(obj, type):
+        return dataclasses.asdict(obj)
+    # Generators and other iterators (e.g. from streaming handlers) become arrays
+    if isinstance(obj, Iterator):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+# A codec decodes request bodies (loads) and encodes response bodies (dumps, or
+# dumps_bytes for streamed responses). Both codecs accept Decimal, datetime/date/time,
+# UUID, dataclasses, sets and iterators in addition to the standard JSON types, and
+# raise a ValueError subclass on invalid input.
+class StdlibJsonCodec:
+    name = "stdlib"
+
+    def loads(self, data: str | bytes) -> Any:
+        return json.loads(data)
+
+    def dumps(self, obj: Any) -> str:
+        return json.dumps(obj, default=_encode_default)
+
+    def dumps_bytes(self, obj: Any) -> bytes:
+        return self.dumps(obj).encode()
+
+
+# OrjsonCodec uses orjson, which encodes datetimes, UUIDs and dataclasses natively
+# and is several times faster than the stdlib json module for large responses.
+# Its output is compact (no whitespace between separators). orjson only handles
+# integers that fit in 64 bits, so responses with larger ones are encoded with the
+# stdlib json module instead.
+class OrjsonCodec:
+    name = "orjson"
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError("OrjsonCodec requires orjson (pip install kegstand[orjson])")
+        self._option = orjson.OPT_NON_STR_KEYS
+
+    def loads(self, data: str | bytes) -> Any:
+        return orjson.loads(data)
+
+    def dumps(self, obj: Any) -> str:
+        return self.dumps_bytes(obj).decode()
+
+    def dumps_bytes(self, obj: Any) -> bytes:
+        try:
+            return orjson.dumps(obj, default=_encode_default, option=self._option)
+        except orjson.JSONEncodeError as e:
+            # Other errors would fail the same way, possibly after consuming iterators
+            if "Integer exceeds" not in str(e):
+                raise
+            return json.dumps(obj, default=_encode_default, separators=(",", ":")).encode()
+
+
+def default_codec():
+    # Use the fast backend if it is installed, otherwise fall back to the stdlib
+    return OrjsonCodec() if orjson is not None else StdlibJsonCodec()
+
+
+DEFAULT_CODEC = default_codec()
@@ -0,0 +1,179 @@
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterator
+from typing import Any
+
+from .cache import _hashable
+from .errors import TooManyRequestsError
+from .request import as_request
+
+
+# RouteLimit limits how often and how many at once a route's handler runs in this
+# container, to protect fragile downstreams from bursts before API Gateway throttling
+# kicks in:
+# - rate: a token bucket refilled with `rate` requests per `per` seconds, holding up to
+#   `burst` tokens (defaults to rate)
+# - concurrency: the maximum number of requests in flight at once
+# Requests over a limit get a 429 with a Retry-After header. Limits are kept per route
+# and, if claims are declared (e.g. claims=["tenant"]), per combination of their values,
+# so one tenant cannot use up another's share. The least recently used keys are dropped
+# beyond max_keys. Responses served from the response cache do not count.
+class RouteLimit:
+    def __init__(  # noqa: PLR0913
+        self,
+        rate: float | None = None,
+        per: float = 1,
+        burst: float | None = None,
+        concurrency: int | None = None,
+        claims: list[str] | None = None,
+        max_keys: int = 10_000,
+        retry_after: float = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if rate is None and concurrency is None:
+            raise ValueError("A route limit needs a rate or a concurrency limit")
+        if rate is not None and (rate <= 0 or per <= 0):
+            raise ValueError("A route limit's rate and per must be positive")
+        if concurrency is not None and concurrency < 1:
+            raise ValueError("A route limit's concurrency must be at least 1")
+        self.rate = rate
+        self.per = per
+        self.burst: float = burst if burst is not None else rate or 0
+        # Tokens added per second
+        self.refill_rate = rate / per if rate is not None else 0.0
+        self.concurrency = concurrency
+        self.claim_keys = tuple(claims or ())
+        self.max_keys = max_keys
+        # Suggested wait for clients rejected by the concurrency limit
+        self.retry_after = retry_after
+        self.clock = clock
+        self.allowed = 0
+        self.limited = 0
+        # key -> [tokens, updated_at]
+        self._buckets: OrderedDict[Any, list[float]] = OrderedDict()
+        # key -> requests in flight (keys are removed when they reach zero)
+        self._in_flight: dict[Any, int] = {}
+        self._lock = threading.Lock()
+
+    def key(self, route_key: str, event):
+        if not self.claim_keys:
+            return route_key
+        claims = as_request(event).claims or {}
+        return (
+            route_key,
+            tuple(_hashable(claims.get(claim_key)) for claim_key in self.claim_keys),
+        )
+
+    def _take_token(self, key) -> float:
+        # Returns 0 if a token was taken, or the seconds until one is available.
+        # Called with the lock held.
+        now = self.clock()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [self.burst, now]
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.refill_rate)
+            bucket[1] = now
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / self.refill_rate
+
+    def acquire(self, key):
+        # May raise TooManyRequestsError
+        with self._lock:
+            if self.concurrency is not None and self._in_flight.get(key, 0) >= self.concurrency:
+                self.limited += 1
+                raise TooManyRequestsError(self.retry_after)
+            if self.rate is not None:
+                wait = self._take_token(key)
+                if wait:
+                    self.limited += 1
+                    raise TooManyRequestsError(wait)
+            if self.concurrency is not None:
+                self._in_flight[key] = self._in_flight.get(key, 0) + 1
+            self.allowed += 1
+
+    def release(self, key):
+        if self.concurrency is None:
+            return
+        with self._lock:
+            in_flight = self._in_flight[key] - 1
+            if in_flight:
+                self._in_flight[key] = in_flight
+            else:
+                del self._in_flight[key]
+
+    def run(self, route_key: str, event, func: Callable, *args):
+        # Runs func(*args) within the limits. May raise TooManyRequestsError. Lazy
+        # results (e.g. from generator handlers) do their work as they are consumed, so
+        # they hold the concurrency slot until they are exhausted or closed.
+        key = self.key(route_key, event)
+        self.acquire(key)
+        try:
+            result = func(*args)
+        except BaseException:
+            self.release(key)
+            raise
+        if self.concurrency is not None and isinstance(result, Iterator):
+            return _HeldIterator(result, lambda: self.release(key))
+        self.release(key)
+        return result
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "allowed": self.allowed,
+            "limited": self.limited,
+            "in_flight": sum(self._in_flight.values()),
+            "keys": len(self._buckets),
+        }
+
+
+# _HeldIterator iterates a lazy result and calls release once, when the result is
+# exhausted, raises, or is closed (or garbage collected) before the end
+class _HeldIterator:
+    def __init__(self, items: Iterator, release: Callable[[], None]):
+        self._items = items
+        self._release: Callable[[], None] | None = release
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._items)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        release, self._release = self._release, None
+        if release is None:
+            return
+        try:
+            close = getattr(self._items, "close", None)
+            if close is not None:
+                close()
+        finally:
+            release()
+
+    def __del__(self):
+        self.close()
+
+
+def make_route_limit(limit) -> RouteLimit | None:
+    # The `limit=` route option is either a RouteLimit, a dict of RouteLimit options
+    # (e.g. {"rate": 10, "concurrency": 2, "claims": ["tenant"]}), or a rate in requests
+    # per second. A RouteLimit shared by several routes (e.g. through method_defaults)
+    # still limits each route separately.
+    if limit is None or limit is False:
+        return None
+    if isinstance(limit, RouteLimit):
+        return limit
+    if isinstance(limit, dict):
+        return RouteLimit(**limit)
+    return RouteLimit(rate=limit)
@@ -0,0 +1,303 @@
+import base64
+import json
+import sys
+import time
+import uuid
+from collections.abc import Callable, Iterable
+from typing import Any
+from urllib.parse import parse_qs
+
+# Runs an exported RestApi handler under a real HTTP server, for local load testing,
+# latency investigations and profiling without deploying. Each HTTP request is turned
+# into the REST API (payload 1.0) event that API Gateway would send, with the claims
+# of a configurable fake authorizer, and the handler's response is sent back over HTTP.
+#
+#   python -m kegstand.local_server my_service.lambda:handler --port 8000 --claims '{"sub": "u1"}'
+#
+# The same adapter is available as a WSGI app (for any multi-threaded WSGI server) and
+# as an ASGI app (e.g. `uvicorn my_module:app`). Streaming handlers are not supported.
+
+# Headers that carry the fake authorizer's claims as JSON (see claims_from_header)
+CLAIMS_HEADER = "X-Kegstand-Claims"
+
+ClaimsSource = Callable[[dict[str, str]], dict[str, Any] | None]
+
+
+def claims_from_header(header: str = CLAIMS_HEADER) -> ClaimsSource:
+    # A claims source that reads the claims as JSON from a request header, so that
+    # load tests can send requests as different users
+    header = header.lower()
+
+    def get_claims(headers: dict[str, str]):
+        value = next((v for name, v in headers.items() if name.lower() == header), None)
+        return json.loads(value) if value else None
+
+    return get_claims
+
+
+def make_claims_source(claims) -> ClaimsSource:
+    # The `claims=` option is a dict of static claims, a function of the request
+    # headers, or None for requests without an authorizer
+    if claims is None or callable(claims):
+        return claims or (lambda _headers: None)
+    return lambda _headers: claims
+
+
+# LocalContext stands in for the Lambda context object
+class LocalContext:
+    function_name = "kegstand-local"
+    function_version = "$LATEST"
+    invoked_function_arn = "arn:aws:lambda:local:000000000000:function:kegstand-local"
+    memory_limit_in_mb = 128
+    log_group_name = "/aws/lambda/kegstand-local"
+    log_stream_name = "local"
+
+    def __init__(self, timeout: float = 30):
+        self.aws_request_id = str(uuid.uuid4())
+        self._deadline = time.monotonic() + timeout
+
+    def get_remaining_time_in_millis(self) -> int:
+        return max(0, int((self._deadline - time.monotonic()) * 1000))
+
+
+def build_event(  # noqa: PLR0913
+    method: str,
+    path: str,
+    query_string: str,
+    headers: Iterable[tuple[str, str]],
+    body: bytes,
+    claims_source: ClaimsSource,
+) -> dict[str, Any]:
+    multi_value_headers: dict[str, list[str]] = {}
+    for name, value in headers:
+        multi_value_headers.setdefault(name, []).append(value)
+    single_value_headers = {name: values[-1] for name, values in multi_value_headers.items()}
+    multi_value_query = parse_qs(query_string, keep_blank_values=True) if query_string else {}
+    request_id = str(uuid.uuid4())
+
+    request_context: dict[str, Any] = {
+        "requestId": request_id,
+        "httpMethod": method,
+        "path": path,
+        "stage": "local",
+        "identity": {"sourceIp": single_value_headers.get("X-Forwarded-For", "127.0.0.1")},
+    }
+    claims = claims_source(single_value_headers)
+    if claims is not None:
+        request_context["authorizer"] = {"claims": claims}
+
+    try:
+        decoded_body: str | None = body.decode() if body else None
+        is_base64_encoded = False
+    except UnicodeDecodeError:
+        decoded_body = base64.b64encode(body).decode()
+        is_base64_encoded = True
+
+    return {
+        "resource": path,
+        "path": path,
+        "httpMethod": method,
+        "headers": single_value_headers,
+        "multiValueHeaders": multi_value_headers,
+        "queryStringParameters": (
+            {name: values[-1] for name, values in multi_value_query.items()} or None
+        ),
+        "multiValueQueryStringParameters": multi_value_query or None,
+        "pathParameters": None,
+        "requestContext": request_context,
+        "body": decoded_body,
+        "isBase64Encoded": is_base64_encoded,
+    }
+
+
+def response_status_line(status_code: int) -> str:
+    from http import HTTPStatus
+
+    try:
+        return f"{status_code} {HTTPStatus(status_code).phrase}"
+    except ValueError:
+        return f"{status_code} Unknown"
+
+
+def response_headers(response: dict[str, Any]) -> list[tuple[str, str]]:
+    headers = [(name, str(value)) for name, value in (response.get("headers") or {}).items()]
+    for name, values in (response.get("multiValueHeaders") or {}).items():
+        headers.extend((name, str(value)) for value in values)
+    return headers
+
+
+def response_body(response: dict[str, Any]) -> bytes:
+    body = response.get("body") or ""
+    if response.get("isBase64Encoded"):
+        return base64.b64decode(body)
+    return body.encode() if isinstance(body, str) else body
+
+
+def _export(handler_or_api):
+    # Accept a RestApi as well as an exported handler
+    return handler_or_api.export() if hasattr(handler_or_api, "export") else handler_or_api
+
+
+# WsgiAdapter is a WSGI application that runs an exported handler
+class WsgiAdapter:
+    def __init__(self, handler, claims=None, timeout: float = 30):
+        self.handler = _export(handler)
+        self.claims_source = make_claims_source(claims)
+        self.timeout = timeout
+
+    def __call__(self, environ: dict[str, Any], start_response):
+        headers = [
+            (key[5:].replace("_", "-").title(), value)
+            for key, value in environ.items()
+            if key.startswith("HTTP_")
+        ]
+        for key, name in (("CONTENT_TYPE", "Content-Type"), ("CONTENT_LENGTH", "Content-Length")):
+            if environ.get(key):
+                headers.append((name, environ[key]))
+        content_length = int(environ.get("CONTENT_LENGTH") or 0)
+        body = environ["wsgi.input"].read(content_length) if content_length else b""
+
+        event = build_event(
+            environ["REQUEST_METHOD"],
+            environ.get("PATH_INFO") or "/",
+            environ.get("QUERY_STRING", ""),
+            headers,
+            body,
+            self.claims_source,
+        )
+        response = self.handler(event, LocalContext(self.timeout))
+        start_response(response_status_line(response["statusCode"]), response_headers(response))
+        return [response_body(response)]
+
+
+# AsgiAdapter is an ASGI application that runs an exported handler. The handler is
+# synchronous, so each request runs on a worker thread of the event loop's default
+# executor, which also gives async route handlers their own (per-thread) event loop.
+class AsgiAdapter:
+    def __init__(self, handler, claims=None, timeout: float = 30):
+        self.handler = _export(handler)
+        self.claims_source = make_claims_source(claims)
+        self.timeout = timeout
+
+    async def __call__(self, scope: dict[str, Any], receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+        body_parts = []
+        while True:
+            message = await receive()
+            body_parts.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+
+        event = build_event(
+            scope["method"],
+            scope["path"],
+            scope.get("query_string", b"").decode(),
+            [(name.decode().title(), value.decode()) for name, value in scope["headers"]],
+            b"".join(body_parts),
+            self.claims_source,
+        )
+        import asyncio
+
+        response = await asyncio.get_running_loop().run_in_executor(
+            None, self.handler, event, LocalContext(self.timeout)
+        )
+        await send(
+            {
+                "type": "http.response.start",
+                "status": response["statusCode"],
+                "headers": [
+                    (name.lower().encode(), value.encode())
+                    for name, value in response_headers(response)
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": response_body(response)})
+
+
+def make_server(handler, host: str = "127.0.0.1", port: int = 8000, claims=None, workers: int = 8):
+    # A WSGI server from the standard library, for local use only. Requests are handled
+    # by a fixed pool of worker threads rather than a new thread per request, so that
+    # each worker keeps its persistent event loop for async handlers, like a warm
+    # Lambda container does.
+    from concurrent.futures import ThreadPoolExecutor
+    from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+    class PooledWSGIServer(WSGIServer):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.executor = ThreadPoolExecutor(workers, thread_name_prefix="kegstand-worker")
+
+        def process_request(self, request, client_address):
+            self.executor.submit(self.process_request_thread, request, client_address)
+
+        def process_request_thread(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+        def server_close(self):
+            super().server_close()
+            self.executor.shutdown(wait=True)
+
+    class QuietRequestHandler(WSGIRequestHandler):
+        # The exported handler writes its own access log
+        def log_message(self, format, *args):  # noqa: A002
+            pass
+
+    server = PooledWSGIServer((host, port), QuietRequestHandler)
+    server.set_app(WsgiAdapter(handler, claims=claims))
+    return server
+
+
+def load_handler(spec: str):
+    # Load `module.path:attribute`, e.g. `api.lambda:handler`
+    import importlib
+
+    module_name, _, attribute = spec.partition(":")
+    return getattr(importlib.import_module(module_name), attribute or "handler")
+
+
+def main(argv: list[str] | None = None):
+    import argparse
+    import os
+
+    parser = argparse.ArgumentParser(description="Run a Kegstand API under a local HTTP server")
+    parser.add_argument("handler", help="module:attribute of the exported handler or RestApi")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--claims", help=f"Fake authorizer claims as JSON (default: read from {CLAIMS_HEADER})"
+    )
+    parser.add_argument("--path", default=".", help="Folder to import the handler from")
+    parser.add_argument("--workers", type=int, default=8, help="Number of worker threads")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, os.path.abspath(args.path))
+    claims = json.loads(args.claims) if args.claims else claims_from_header()
+    server = make_server(
+        load_handler(args.handler), args.host, args.port, claims=claims, workers=args.workers
+    )
+    print(f"Serving {args.handler} on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
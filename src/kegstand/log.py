@@ -0,0 +1,48 @@
+import logging
+import os
+
+# Kegstand logs through Powertools' structured Logger by default. Powertools is only
+# imported when the first message is logged, and setting KEGSTAND_LOGGER=builtin (or
+# calling use_builtin_logger()) switches to a plain stdlib logger, so Lambdas that do
+# not need Powertools never pay for importing it.
+_use_builtin = os.environ.get("KEGSTAND_LOGGER", "powertools").lower() == "builtin"
+
+
+def use_builtin_logger(enabled: bool = True):
+    # Takes effect for loggers that have not logged anything yet
+    global _use_builtin  # noqa: PLW0603
+    _use_builtin = enabled
+
+
+def _create_logger(name: str):
+    if _use_builtin:
+        builtin_logger = logging.getLogger(name)
+        if builtin_logger.level == logging.NOTSET:
+            builtin_logger.setLevel(
+                os.environ.get("POWERTOOLS_LOG_LEVEL", os.environ.get("LOG_LEVEL", "INFO"))
+            )
+        return builtin_logger
+
+    from aws_lambda_powertools import Logger
+
+    return Logger()
+
+
+# LazyLogger stands in for the module-level loggers and creates the real logger the
+# first time it is used.
+class LazyLogger:
+    def __init__(self, name: str = "kegstand"):
+        self._name = name
+        self._logger = None
+
+    def _resolve(self):
+        if self._logger is None:
+            self._logger = _create_logger(self._name)
+        return self._logger
+
+    def __getattr__(self, attribute: str):
+        return getattr(self._resolve(), attribute)
+
+
+def get_logger(name: str = "kegstand") -> LazyLogger:
+    return LazyLogger(name)
@@ -0,0 +1,80 @@
+import importlib
+import json
+import os
+import sys
+from typing import Any
+
+from .utils import find_resource_modules
+
+MANIFEST_FILENAME = "kegstand_manifest.json"
+MANIFEST_VERSION = 1
+
+
+# The route manifest maps each method + route to the resource module that defines it,
+# so that a RestApi in lazy mode can register all routes without importing any of
+# the resource modules until a request actually needs one. Building the manifest
+# imports every resource module, so it is meant to run as a build step rather than
+# during Lambda init:
+#
+#   python -m kegstand.manifest path/to/src [--output path/to/manifest.json] [--recursive]
+def build_manifest(api_source_root: str, recursive: bool = False) -> dict[str, Any]:
+    api_source_root = os.path.abspath(api_source_root)
+    if api_source_root not in sys.path:
+        sys.path.insert(0, api_source_root)
+
+    routes = []
+    for resource_module_folder in find_resource_modules(api_source_root, recursive=recursive):
+        resource_module = importlib.import_module(resource_module_folder["module_path"])
+        for method in resource_module.api.methods:
+            routes.append(
+                {
+                    "method": method["method"],
+                    "route": method["full_route"],
+                    "module": resource_module_folder["module_path"],
+                    "is_public": resource_module_folder["is_public"],
+                }
+            )
+
+    return {"version": MANIFEST_VERSION, "routes": routes}
+
+
+def write_manifest(
+    api_source_root: str, manifest_path: str | None = None, recursive: bool = False
+) -> str:
+    if manifest_path is None:
+        manifest_path = os.path.join(api_source_root, MANIFEST_FILENAME)
+
+    manifest = build_manifest(api_source_root, recursive=recursive)
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest_path
+
+
+def load_manifest(manifest_path: str) -> dict[str, Any]:
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError(
+            f"Unsupported route manifest version {manifest.get('version')} in {manifest_path}"
+        )
+    return manifest
+
+
+def main(argv: list[str] | None = None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build a Kegstand route manifest")
+    parser.add_argument("api_source_root", help="Folder containing the api/ resource folder")
+    parser.add_argument("--output", "-o", help=f"Output path (default: <root>/{MANIFEST_FILENAME})")
+    parser.add_argument(
+        "--recursive", action="store_true", help="Include resources in nested subfolders"
+    )
+    args = parser.parse_args(argv)
+
+    manifest_path = write_manifest(args.api_source_root, args.output, recursive=args.recursive)
+    print(f"Route manifest written to {manifest_path}")
+
+
+if __name__ == "__main__":
+    main()
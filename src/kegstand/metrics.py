@@ -0,0 +1,55 @@
+import random
+
+# Phases of a request, in the order they run. Routing is timed by RestApi, the others
+# by the route's handler. Phases that do not run for a request (e.g. the handler for
+# a cached response or a request rejected by auth) are not recorded.
+PHASES = ("routing", "auth", "decode", "handler", "serialize", "compress")
+UNMATCHED_ROUTE = "UNMATCHED"
+
+
+# HotPathMetrics emits per-phase request timings as CloudWatch embedded metrics (EMF)
+# through Powertools Metrics. Timings are dimensioned by route template (e.g.
+# `GET /users/:id`) rather than by raw path, and by whether the request was the
+# container's cold start. The init duration (from RestApi construction until the
+# handler was exported) is emitted once, on the cold start, as a separate metric.
+#
+# When RestApi has no metrics configured, the exported handler is not instrumented at
+# all, and unsampled requests take the uninstrumented path.
+class HotPathMetrics:
+    def __init__(
+        self,
+        namespace: str = "Kegstand",
+        service: str | None = None,
+        sample_rate: float = 1.0,
+        metrics=None,
+    ):
+        if metrics is None:
+            from aws_lambda_powertools import Metrics
+
+            metrics = Metrics(namespace=namespace, service=service)
+        self.metrics = metrics
+        self.sample_rate = sample_rate
+        self.cold_start = True
+        self.init_duration: float | None = None
+
+    def should_sample(self) -> bool:
+        return self.sample_rate >= 1 or random.random() < self.sample_rate  # noqa: S311
+
+    def record(self, route_key: str, timings: dict[str, float], cold_start: bool = False):
+        self.metrics.add_dimension(name="route", value=route_key)
+        self.metrics.add_dimension(name="cold_start", value=str(cold_start).lower())
+        for phase in PHASES:
+            if phase in timings:
+                self._add_duration(f"{phase}_duration", timings[phase])
+        self._add_duration("total_duration", sum(timings.values()))
+        self.metrics.flush_metrics()
+
+    def record_init(self):
+        # Emitted on the cold start, whether or not that request is sampled
+        if self.init_duration is not None:
+            self.metrics.add_dimension(name="cold_start", value="true")
+            self._add_duration("init_duration", self.init_duration)
+            self.metrics.flush_metrics()
+
+    def _add_duration(self, name: str, seconds: float):
+        self.metrics.add_metric(name=name, unit="Milliseconds", value=seconds * 1000)
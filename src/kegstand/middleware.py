@@ -0,0 +1,122 @@
+from collections.abc import Callable
+from typing import Any
+
+from .errors import ApiError
+
+# The hooks a middleware can implement:
+#
+#   before_route(request, context) -> response | None
+#       Runs before the request is routed, e.g. to answer CORS preflight requests.
+#       Only applies to middleware added to the RestApi.
+#   before_handler(params, request, context) -> response | None
+#       Runs after routing, before the route's handler (and its authorization), e.g.
+#       to resolve the tenant into request.state.
+#   after_handler(response, params, request, context) -> response
+#       Runs on every response of the route, e.g. to add CORS or request ID headers.
+#   on_error(error, params, request, context) -> response | None
+#       Runs when the route raises an unexpected exception (ApiErrors are already
+#       responses by then). Returning None re-raises the exception.
+#
+# A before hook short-circuits the request by returning a response, or by raising
+# ApiError. Hooks are looked up once, when the pipeline is compiled by RestApi.export(),
+# and a middleware that does not implement a hook adds nothing to the call chain for it.
+HOOKS = ("before_route", "before_handler", "after_handler", "on_error")
+ROUTE_HOOKS = HOOKS[1:]
+
+
+# Middleware bundles the hooks of one cross-cutting concern. Subclasses implement the
+# hooks they need as methods, or the hooks are passed as functions, e.g.
+#   api.use(Middleware(after_handler=add_cors_headers))
+class Middleware:
+    before_route: Callable | None = None
+    before_handler: Callable | None = None
+    after_handler: Callable | None = None
+    on_error: Callable | None = None
+
+    def __init__(self, **hooks: Callable):
+        for name, hook in hooks.items():
+            if name not in HOOKS:
+                raise ValueError(f"Unknown middleware hook: {name}")
+            setattr(self, name, hook)
+
+
+def _hook(middleware, name: str) -> Callable | None:
+    return getattr(middleware, name, None)
+
+
+def _wrap_route(handler, middleware, codec):
+    # Layers one middleware's route hooks around the handler, outermost first:
+    # after_handler(before_handler(on_error(handler)))
+    before, after, on_error = (_hook(middleware, name) for name in ROUTE_HOOKS)
+
+    if on_error is not None:
+        inner_handler = handler
+
+        def handle_errors(params, request, context, *args):
+            try:
+                return inner_handler(params, request, context, *args)
+            except ApiError:
+                raise
+            except Exception as e:
+                response = on_error(e, params, request, context)
+                if response is None:
+                    raise
+                return response
+
+        handler = handle_errors
+
+    if before is not None:
+        next_handler = handler
+
+        def run_before(params, request, context, *args):
+            try:
+                response = before(params, request, context)
+            except ApiError as e:
+                return e.to_api_response(codec)
+            if response is not None:
+                return response
+            return next_handler(params, request, context, *args)
+
+        handler = run_before
+
+    if after is not None:
+        wrapped_handler = handler
+
+        def run_after(params, request, context, *args):
+            return after(wrapped_handler(params, request, context, *args), params, request, context)
+
+        handler = run_after
+
+    return handler
+
+
+def compile_route(handler, middleware: list[Any], codec=None):
+    # Compiles the route hooks of the middleware (outermost first) into a single call
+    # chain around a route handler. Extra arguments of the handler (the timings of
+    # sampled requests) are passed through. Without route hooks, the handler is
+    # returned as it is.
+    for item in reversed(middleware):
+        handler = _wrap_route(handler, item, codec)
+    return handler
+
+
+def compile_before_route(handler, middleware: list[Any], codec=None):
+    # Compiles the before_route hooks into a call chain in front of the exported
+    # handler's routing
+    hooks = [hook for hook in (_hook(item, "before_route") for item in middleware) if hook]
+    for hook in reversed(hooks):
+        handler = _before_route(handler, hook, codec)
+    return handler
+
+
+def _before_route(handler, hook, codec):
+    def run_before_route(request, context):
+        try:
+            response = hook(request, context)
+        except ApiError as e:
+            return e.to_api_response(codec)
+        if response is not None:
+            return response
+        return handler(request, context)
+
+    return run_before_route
@@ -0,0 +1,207 @@
+import base64
+import json
+import os
+from collections.abc import Callable
+from itertools import islice
+from typing import Any
+from urllib.parse import urlencode
+
+from .errors import ApiError
+from .request import as_request
+
+# Environment variable holding the secret that cursors are signed with. It must be the
+# same in every container of the function, so that any of them accepts the cursor.
+CURSOR_SECRET_ENV = "KEGSTAND_CURSOR_SECRET"  # noqa: S105
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 1000
+
+# Length of the truncated HMAC-SHA256 signature, in bytes
+_SIGNATURE_SIZE = 16
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+# CursorCodec turns a cursor payload (a small JSON-serializable dict) into an opaque,
+# URL-safe string signed with HMAC-SHA256, so that clients cannot forge cursors that
+# skip into other users' data or make the handler run arbitrary queries.
+class CursorCodec:
+    def __init__(self, secret: str | bytes | None = None):
+        self._secret = secret.encode() if isinstance(secret, str) else secret
+
+    @property
+    def secret(self) -> bytes:
+        if self._secret is None:
+            secret = os.environ.get(CURSOR_SECRET_ENV)
+            if not secret:
+                raise ValueError(f"Set {CURSOR_SECRET_ENV} to sign pagination cursors")
+            self._secret = secret.encode()
+        return self._secret
+
+    def _sign(self, data: bytes) -> bytes:
+        import hashlib
+        import hmac
+
+        return hmac.new(self.secret, data, hashlib.sha256).digest()[:_SIGNATURE_SIZE]
+
+    def encode(self, payload: dict[str, Any]) -> str:
+        data = json.dumps(payload, separators=(",", ":"), sort_keys=True).encode()
+        return f"{_b64encode(data)}.{_b64encode(self._sign(data))}"
+
+    def decode(self, cursor: str) -> dict[str, Any]:
+        # May raise ApiError
+        import hmac
+
+        encoded_data, _, encoded_signature = cursor.partition(".")
+        try:
+            data = _b64decode(encoded_data)
+            signature = _b64decode(encoded_signature)
+        except ValueError as e:
+            raise ApiError("Invalid cursor", 400) from e
+        if not hmac.compare_digest(signature, self._sign(data)):
+            raise ApiError("Invalid cursor", 400)
+        return json.loads(data)
+
+
+DEFAULT_CURSOR_CODEC = CursorCodec()
+
+
+# Page is the injectable `page` argument of paginated routes. Handlers return the items
+# starting at the page's position: after the `after` position for keyset pagination
+# (the dict that the route's cursor function returned for the last item of the
+# previous page), or from `offset` otherwise. They must produce up to `fetch_size`
+# items, one more than the page size, since the extra item is what tells that there is
+# a next page: a handler that returns only `size` items always gets the last page.
+# Handlers can also return a lazy iterator over the rest of the table, which is only
+# consumed up to `fetch_size` items.
+class Page:
+    __slots__ = ("size", "offset", "after", "path", "query")
+
+    def __init__(  # noqa: PLR0913
+        self,
+        size: int,
+        offset: int = 0,
+        after: dict[str, Any] | None = None,
+        path: str = "/",
+        query: dict[str, str] | None = None,
+    ):
+        self.size = size
+        self.offset = offset
+        self.after = after
+        self.path = path
+        self.query = query or {}
+
+    @property
+    def fetch_size(self) -> int:
+        # The number of items to query for, e.g. LIMIT in SQL or Limit in DynamoDB
+        return self.size + 1
+
+
+# Paginator parses the page from the request's `limit` and `cursor` query parameters and
+# wraps a handler's result in a response envelope:
+#   {"items": [...], "cursor": "<next cursor>", "next": "/beers/?limit=50&cursor=..."}
+# where cursor and next are null on the last page. The cursor function maps the last item
+# of a page to the keyset position of the next one (e.g. lambda beer: {"id": beer["id"]});
+# without one, cursors hold an offset.
+class Paginator:
+    def __init__(
+        self,
+        size: int = DEFAULT_PAGE_SIZE,
+        max_size: int = MAX_PAGE_SIZE,
+        cursor: Callable[[Any], dict[str, Any]] | None = None,
+        codec: CursorCodec | None = None,
+    ):
+        self.size = size
+        self.max_size = max_size
+        self.cursor = cursor
+        self.codec = codec or DEFAULT_CURSOR_CODEC
+
+    def parse_page(self, event) -> Page:
+        # May raise ApiError
+        request = as_request(event)
+        query = request.query
+        size = self.size
+        if query.get("limit"):
+            try:
+                size = int(query["limit"])
+            except ValueError as e:
+                raise ApiError("Invalid limit", 400) from e
+            if not 1 <= size <= self.max_size:
+                raise ApiError(f"Limit must be between 1 and {self.max_size}", 400)
+
+        page = Page(size, path=request.path, query=query)
+        if query.get("cursor"):
+            payload = self.codec.decode(query["cursor"])
+            if "after" in payload:
+                page.after = payload["after"]
+            else:
+                page.offset = payload.get("offset", 0)
+        return page
+
+    def check(self):
+        # Raises ValueError if cursors cannot be signed, so that a missing secret fails
+        # the export rather than the first request with a next page
+        self.codec.secret  # noqa: B018
+
+    def page(self, event) -> Page:
+        # The page is parsed once per request, for both the `page` argument and the
+        # response envelope
+        request = as_request(event)
+        page = request.state.get(self)
+        if page is None:
+            page = request.state[self] = self.parse_page(request)
+        return page
+
+    def envelope(self, result, event, skip_offset: bool = False) -> dict[str, Any]:
+        # Handlers that do not take the page argument return all items, and the ones
+        # before the page's offset are skipped here
+        if isinstance(result, (dict, str, bytes)) or not hasattr(result, "__iter__"):
+            raise TypeError(
+                f"Paginated handlers must return an iterable of items, not {type(result).__name__}"
+            )
+        page = self.page(event)
+        start = page.offset if skip_offset else 0
+        # One item more than the page size tells whether there is a next page, without
+        # consuming (or loading) the rest
+        items = list(islice(result, start, start + page.fetch_size))
+        next_cursor = None
+        if len(items) > page.size:
+            del items[page.size :]
+            if self.cursor is not None:
+                next_cursor = self.codec.encode({"after": self.cursor(items[-1])})
+            else:
+                next_cursor = self.codec.encode({"offset": page.offset + page.size})
+        next_link = None
+        if next_cursor is not None:
+            next_link = f"{page.path}?{urlencode({**page.query, 'cursor': next_cursor})}"
+        return {"items": items, "cursor": next_cursor, "next": next_link}
+
+
+def make_paginator(paginate) -> Paginator | None:
+    # The `paginate=` route option is either a Paginator, True for the defaults, a page
+    # size, or a dict of Paginator options (e.g. {"size": 20, "cursor": ...})
+    if paginate is None or paginate is False:
+        return None
+    if isinstance(paginate, Paginator):
+        return paginate
+    if paginate is True:
+        return Paginator()
+    if isinstance(paginate, dict):
+        return Paginator(**paginate)
+    return Paginator(size=paginate)
+
+
+def page_injector(_resource, options: dict[str, Any]):
+    # Routes without the paginate= option still get a page parsed with the defaults
+    paginator = make_paginator(options.get("paginate")) or Paginator()
+
+    def inject_page(_params, event, _context):
+        return paginator.page(event)
+
+    return inject_page
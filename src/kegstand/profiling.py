@@ -0,0 +1,256 @@
+import json
+import os
+import random
+import threading
+import time
+from collections.abc import Iterable
+from time import perf_counter
+from typing import Any
+
+from .log import get_logger
+
+logger = get_logger()
+
+CPU = "cpu"
+MEMORY = "memory"
+MODES = (CPU, MEMORY)
+
+# Profiling can be switched on in a deployed function through its environment, without
+# changing code: KEGSTAND_PROFILE sets the modes (e.g. "cpu,memory") and profiles every
+# request, or the share set by KEGSTAND_PROFILE_SAMPLE_RATE; KEGSTAND_PROFILE_SECRET
+# enables requests signed with profile_header(); KEGSTAND_PROFILE_OUTPUT is "log"
+# (default) or a directory to write the reports to, e.g. /tmp/profiles.
+PROFILE_ENV = "KEGSTAND_PROFILE"
+SAMPLE_RATE_ENV = "KEGSTAND_PROFILE_SAMPLE_RATE"
+SECRET_ENV = "KEGSTAND_PROFILE_SECRET"  # noqa: S105
+OUTPUT_ENV = "KEGSTAND_PROFILE_OUTPUT"
+
+# Request header that asks for a profile of the request, and response header with the
+# id of the report
+PROFILE_HEADER = "X-Kegstand-Profile"
+PROFILE_ID_HEADER = "X-Kegstand-Profile-Id"
+
+
+def _parse_modes(modes: str | Iterable[str]) -> tuple[str, ...]:
+    if isinstance(modes, str):
+        modes = modes.split(",")
+    parsed = tuple(mode.strip().lower() for mode in modes if mode.strip())
+    if parsed in ((), ("1",), ("true",), ("all",)):
+        return (CPU,) if parsed != ("all",) else MODES
+    for mode in parsed:
+        if mode not in MODES:
+            raise ValueError(f"Unsupported profiling mode: {mode}")
+    return parsed
+
+
+def _sign(secret: str, message: str) -> str:
+    import hashlib
+    import hmac
+
+    return hmac.new(secret.encode(), message.encode(), hashlib.sha256).hexdigest()
+
+
+def profile_header(secret: str, modes: str = CPU, ttl: float = 300) -> str:
+    # The value of the X-Kegstand-Profile header for requests to profile, valid for ttl
+    # seconds: "<modes>.<expires>.<signature>"
+    message = f"{modes}.{int(time.time() + ttl)}"
+    return f"{message}.{_sign(secret, message)}"
+
+
+def _short_path(filename: str) -> str:
+    # Keeps the part of the path that identifies the module
+    for marker in ("site-packages/", "src/"):
+        if marker in filename:
+            return filename.rsplit(marker, 1)[1]
+    return "/".join(filename.rsplit("/", 2)[-2:])
+
+
+# Profiler profiles single invocations of the exported handler with cProfile (cpu)
+# and/or tracemalloc (memory), when triggered by sampling or by a signed request
+# header, and writes a compact summary of the top functions and allocation sites. It
+# wraps the whole handler, so Kegstand's own dispatch path shows up next to the
+# route's handler. Only one request is profiled at a time; concurrent requests that
+# would be profiled run as usual. cProfile only sees the thread that runs the handler.
+class Profiler:
+    def __init__(  # noqa: PLR0913
+        self,
+        modes: str | Iterable[str] = CPU,
+        sample_rate: float | None = None,
+        secret: str | None = None,
+        top: int = 20,
+        output: str = "log",
+        trace_frames: int = 1,
+    ):
+        self.modes = _parse_modes(modes)
+        # With a secret, only signed requests are profiled unless a sample rate is set;
+        # without one, every request is
+        if sample_rate is None:
+            sample_rate = 0.0 if secret is not None else 1.0
+        self.sample_rate = sample_rate
+        self.secret = secret
+        self.top = top
+        self.output = output
+        self.trace_frames = trace_frames
+        self.profiled = 0
+        self._lock = threading.Lock()
+
+    def _header_modes(self, request) -> tuple[str, ...] | None:
+        header = request.headers.get(PROFILE_HEADER.lower())
+        if header is None or self.secret is None:
+            return None
+        import hmac
+
+        message, _, signature = header.rpartition(".")
+        modes, _, expires = message.partition(".")
+        try:
+            valid = (
+                hmac.compare_digest(signature, _sign(self.secret, message))
+                and float(expires) > time.time()
+            )
+            return _parse_modes(modes) if valid else None
+        except ValueError:
+            return None
+
+    def trigger(self, request) -> tuple[str, ...] | None:
+        # The modes to profile the request with, or None
+        modes = self._header_modes(request) if self.secret is not None else None
+        if modes is None and (
+            self.sample_rate >= 1 or (self.sample_rate > 0 and random.random() < self.sample_rate)  # noqa: S311
+        ):
+            modes = self.modes
+        return modes
+
+    def wrap(self, handler):
+        def profiled_handler(request, context):
+            modes = self.trigger(request)
+            if modes is None or not self._lock.acquire(blocking=False):
+                return handler(request, context)
+            try:
+                return self.profile(handler, request, context, modes)
+            finally:
+                self._lock.release()
+
+        return profiled_handler
+
+    def profile(self, handler, request, context, modes: tuple[str, ...]):
+        # Imported here, since they are only needed for profiled requests
+        import cProfile
+        import tracemalloc
+
+        cpu_profile = cProfile.Profile() if CPU in modes else None
+        trace_memory = MEMORY in modes and not tracemalloc.is_tracing()
+        if trace_memory:
+            tracemalloc.start(self.trace_frames)
+        if cpu_profile is not None:
+            cpu_profile.enable()
+        start = perf_counter()
+        try:
+            response = handler(request, context)
+        finally:
+            duration = perf_counter() - start
+            if cpu_profile is not None:
+                cpu_profile.disable()
+            snapshot = peak = None
+            if trace_memory:
+                snapshot = tracemalloc.take_snapshot()
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+
+        profile_id = f"{int(time.time())}-{request.request_id or os.getpid()}"
+        report: dict[str, Any] = {
+            "profile_id": profile_id,
+            "method": request.method,
+            "path": request.path,
+            "status_code": response.get("statusCode"),
+            "duration_ms": round(duration * 1000, 3),
+        }
+        if cpu_profile is not None:
+            report["cpu"] = self.cpu_summary(cpu_profile)
+        if snapshot is not None:
+            report["memory"] = {
+                "peak_kb": round((peak or 0) / 1024, 1),
+                "top": self.memory_summary(snapshot),
+            }
+        self.write(report, cpu_profile)
+        self.profiled += 1
+        headers = {**(response.get("headers") or {}), PROFILE_ID_HEADER: profile_id}
+        return {**response, "headers": headers}
+
+    def cpu_summary(self, cpu_profile) -> list[dict[str, Any]]:
+        # The top functions by cumulative time
+        import pstats
+
+        stats = pstats.Stats(cpu_profile).stats  # type: ignore[attr-defined]
+        entries = sorted(stats.items(), key=lambda entry: entry[1][3], reverse=True)
+        return [
+            {
+                "function": f"{_short_path(filename)}:{line}({name})",
+                "calls": calls,
+                "own_ms": round(own_time * 1000, 3),
+                "cumulative_ms": round(cumulative_time * 1000, 3),
+            }
+            for (filename, line, name), (_, calls, own_time, cumulative_time, _) in entries[
+                : self.top
+            ]
+        ]
+
+    def memory_summary(self, snapshot) -> list[dict[str, Any]]:
+        # The top allocation sites by size of the memory still allocated at the end of
+        # the request
+        import tracemalloc
+
+        snapshot = snapshot.filter_traces(
+            (
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            )
+        )
+        return [
+            {
+                "site": f"{_short_path(stat.traceback[0].filename)}:{stat.traceback[0].lineno}",
+                "size_kb": round(stat.size / 1024, 1),
+                "count": stat.count,
+            }
+            for stat in snapshot.statistics("lineno")[: self.top]
+        ]
+
+    def write(self, report: dict[str, Any], cpu_profile=None):
+        if self.output == "log":
+            logger.info("Request profile", extra={"profile": report})
+            return
+        # Reports (and raw cProfile data, for pstats or snakeviz) go to the directory
+        os.makedirs(self.output, exist_ok=True)
+        path = os.path.join(self.output, f"profile-{report['profile_id']}")
+        with open(f"{path}.json", "w") as f:
+            json.dump(report, f, indent=2)
+        if cpu_profile is not None:
+            cpu_profile.dump_stats(f"{path}.prof")
+        logger.info(f"Request profile written to {path}.json")
+
+
+def make_profiler(profiling) -> Profiler | None:
+    # The `profiling=` RestApi option is a Profiler, True for the defaults, a dict of
+    # Profiler options, or None to configure profiling from the environment. Without
+    # any of these, the exported handler is not wrapped at all.
+    if profiling is False:
+        return None
+    if isinstance(profiling, Profiler):
+        return profiling
+    if profiling is True:
+        return Profiler()
+    if isinstance(profiling, dict):
+        return Profiler(**profiling)
+
+    modes = os.environ.get(PROFILE_ENV)
+    secret = os.environ.get(SECRET_ENV)
+    if not modes and not secret:
+        return None
+    sample_rate = os.environ.get(SAMPLE_RATE_ENV)
+    return Profiler(
+        modes=modes or CPU,
+        # Without KEGSTAND_PROFILE, only signed requests are profiled
+        sample_rate=float(sample_rate) if sample_rate else (1.0 if modes else 0.0),
+        secret=secret,
+        output=os.environ.get(OUTPUT_ENV, "log"),
+    )
@@ -0,0 +1,191 @@
+import base64
+from collections.abc import Iterator, Mapping
+from typing import Any
+
+REST_API = "rest"  # API Gateway REST API (payload format 1.0)
+HTTP_API = "http"  # API Gateway HTTP API and Lambda function URLs (payload format 2.0)
+ALB = "alb"  # Application Load Balancer
+
+# Sentinel for lazily computed attributes that have not been computed yet
+_UNSET: Any = object()
+
+
+def detect_event_format(event: Mapping[str, Any]) -> str:
+    if event.get("version") == "2.0":
+        return HTTP_API
+    if "elb" in (event.get("requestContext") or {}):
+        return ALB
+    return REST_API
+
+
+# Request is a lightweight, read-only view of an API event. The event format is
+# detected once, when the view is created, and each accessor (method, path, query,
+# headers, body, claims) reads its value from the format's keys on first use, without
+# copying the event. The exported RestApi handler creates one Request per event, and
+# routing, auth and the injectors all work on it.
+#
+# For backwards compatibility, a Request is also a read-only mapping over the raw event,
+# so that code reading the event's keys directly keeps working.
+class Request(Mapping):
+    __slots__ = ("event", "format", "_path", "_query", "_headers", "_body", "_claims", "_state")
+
+    def __init__(self, event: dict[str, Any], event_format: str | None = None):
+        self.event = event
+        self.format = event_format or detect_event_format(event)
+        self._path = _UNSET
+        self._query = _UNSET
+        self._headers = _UNSET
+        self._body = _UNSET
+        self._claims = _UNSET
+        self._state: dict[Any, Any] | None = None
+
+    def __getitem__(self, key: str):
+        return self.event[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.event)
+
+    def __len__(self) -> int:
+        return len(self.event)
+
+    @property
+    def request_context(self) -> dict[str, Any]:
+        return self.event.get("requestContext") or {}
+
+    @property
+    def method(self) -> str:
+        if self.format == HTTP_API:
+            return self.event["requestContext"]["http"]["method"]
+        return self.event["httpMethod"]
+
+    @property
+    def path(self) -> str:
+        if self._path is _UNSET:
+            if self.format == HTTP_API:
+                path = self.event["rawPath"]
+                # Outside the $default stage, the raw path starts with the stage name
+                stage = self.request_context.get("stage")
+                if stage and stage != "$default" and path.startswith(f"/{stage}/"):
+                    path = path[len(stage) + 1 :]
+                self._path = path
+            else:
+                self._path = self.event["path"]
+        return self._path
+
+    @property
+    def query(self) -> dict[str, str]:
+        if self._query is _UNSET:
+            query = self.event.get("queryStringParameters")
+            if query is None and self.event.get("multiValueQueryStringParameters"):
+                # Single-value view of multi-value parameters (last value wins, as in
+                # API Gateway's queryStringParameters)
+                query = {
+                    name: values[-1]
+                    for name, values in self.event["multiValueQueryStringParameters"].items()
+                    if values
+                }
+            query = query or {}
+            if self.format == ALB and query:
+                # The load balancer passes query parameters on without decoding them
+                from urllib.parse import unquote_plus
+
+                query = {unquote_plus(name): unquote_plus(value) for name, value in query.items()}
+            self._query = query
+        return self._query
+
+    @property
+    def headers(self) -> dict[str, str]:
+        # Header names are lower-cased, whatever the event format
+        if self._headers is _UNSET:
+            headers = self.event.get("headers")
+            if headers is None and self.event.get("multiValueHeaders"):
+                self._headers = {
+                    name.lower(): ", ".join(values)
+                    for name, values in self.event["multiValueHeaders"].items()
+                }
+            else:
+                self._headers = {name.lower(): value for name, value in (headers or {}).items()}
+        return self._headers
+
+    @property
+    def body(self) -> str | bytes | None:
+        if self._body is _UNSET:
+            body = self.event.get("body")
+            if body and self.event.get("isBase64Encoded"):
+                body = base64.b64decode(body)
+            self._body = body
+        return self._body
+
+    @property
+    def claims(self) -> dict[str, Any] | None:
+        # The authorized user properties (claims) from the authorizer, if any
+        if self._claims is _UNSET:
+            authorizer = self.request_context.get("authorizer")
+            claims = None
+            if authorizer is not None:
+                if "claims" in authorizer:
+                    claims = authorizer["claims"]
+                elif self.format == HTTP_API:
+                    # JWT authorizers put the claims under jwt, Lambda authorizers
+                    # put their context under lambda
+                    claims = (authorizer.get("jwt") or {}).get("claims") or authorizer.get("lambda")
+            self._claims = claims
+        return self._claims
+
+    @property
+    def is_authenticated(self) -> bool:
+        # True if the request passed an authorizer (or in-Lambda token verification)
+        if self._claims is not _UNSET and self._claims is not None:
+            return True
+        return "authorizer" in self.request_context
+
+    @property
+    def request_id(self) -> str | None:
+        if self.format == ALB:
+            return self.headers.get("x-amzn-trace-id")
+        return self.request_context.get("requestId")
+
+    @property
+    def state(self) -> dict[Any, Any]:
+        # Per-request values, e.g. request-scoped dependencies (see kegstand.dependencies)
+        if self._state is None:
+            self._state = {}
+        return self._state
+
+    def with_claims(self, claims: dict[str, Any]) -> "Request":
+        # A view of the same event, with the given claims in place of the authorizer's
+        request = Request(self.event, self.format)
+        request._claims = claims
+        return request
+
+    def format_response(self, response: dict[str, Any]) -> dict[str, Any]:
+        # Responses are built in the REST API format, which HTTP APIs accept as is. The
+        # load balancer also needs a status description, and if the target group has
+        # multi-value headers enabled, the headers must be sent as multi-value headers.
+        if self.format != ALB:
+            return response
+
+        from http import HTTPStatus
+
+        status_code = response["statusCode"]
+        try:
+            status_description = f"{status_code} {HTTPStatus(status_code).phrase}"
+        except ValueError:
+            status_description = str(status_code)
+        response = {
+            **response,
+            "statusDescription": status_description,
+            "isBase64Encoded": response.get("isBase64Encoded", False),
+        }
+        if "multiValueHeaders" in self.event:
+            headers = response.pop("headers", None) or {}
+            response["multiValueHeaders"] = {
+                **{name: [value] for name, value in headers.items()},
+                **response.get("multiValueHeaders", {}),
+            }
+        return response
+
+
+def as_request(event) -> Request:
+    # Route handlers and injectors accept either a Request or a raw event
+    return event if isinstance(event, Request) else Request(event)
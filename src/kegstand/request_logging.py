@@ -0,0 +1,133 @@
+import logging
+import random
+from collections.abc import Iterable
+from time import perf_counter
+from typing import Any
+
+from .log import get_logger
+from .request import as_request
+
+logger = get_logger()
+
+REDACTED = "[REDACTED]"
+DEFAULT_REDACTED_HEADERS = ("authorization", "cookie", "set-cookie", "x-api-key")
+
+
+def is_enabled_for(level: int) -> bool:
+    # Powertools' Logger proxies isEnabledFor to the underlying stdlib logger
+    return logger.isEnabledFor(level)  # type: ignore[attr-defined]
+
+
+def truncate(value: str | None, max_length: int) -> str | None:
+    if value is None or len(value) <= max_length:
+        return value
+    return f"{value[:max_length]}...[truncated {len(value) - max_length} chars]"
+
+
+def redact_mapping(mapping: dict[str, Any] | None, names: frozenset[str] | None):
+    # Replace the values of the named keys (case-insensitive), or of all keys if names
+    # is None. Returns a new dict; the event itself is never modified.
+    if not mapping:
+        return mapping
+    return {
+        key: REDACTED if names is None or key.lower() in names else value
+        for key, value in mapping.items()
+    }
+
+
+# RequestLogger logs the requests handled by an exported RestApi handler:
+#  - One compact, structured access-log line per request (at INFO), with the method,
+#    path, status code, duration and request id.
+#  - The full event, at DEBUG and only for a sampled fraction of requests, with the
+#    body truncated and sensitive headers and claims redacted.
+# Nothing is formatted unless the corresponding log level is enabled.
+class RequestLogger:
+    def __init__(
+        self,
+        access_log: bool = True,
+        event_sample_rate: float = 1.0,
+        max_body_length: int = 1024,
+        redact_headers: Iterable[str] = DEFAULT_REDACTED_HEADERS,
+        redact_claims: Iterable[str] | None = None,
+    ):
+        self.access_log = access_log
+        self.event_sample_rate = event_sample_rate
+        self.max_body_length = max_body_length
+        self.redact_headers = frozenset(header.lower() for header in redact_headers)
+        # None redacts all claim values
+        self.redact_claims = (
+            frozenset(claim.lower() for claim in redact_claims)
+            if redact_claims is not None
+            else None
+        )
+
+    def should_log_event(self) -> bool:
+        if not is_enabled_for(logging.DEBUG):
+            return False
+        return self.event_sample_rate >= 1 or random.random() < self.event_sample_rate  # noqa: S311
+
+    def sanitize_event(self, event: dict[str, Any]) -> dict[str, Any]:
+        sanitized = {**event, "body": truncate(event.get("body"), self.max_body_length)}
+        if "headers" in event:
+            sanitized["headers"] = redact_mapping(event["headers"], self.redact_headers)
+        if "multiValueHeaders" in event:
+            sanitized["multiValueHeaders"] = redact_mapping(
+                event["multiValueHeaders"], self.redact_headers
+            )
+
+        # HTTP APIs (payload v2) pass cookies separately from the headers
+        if event.get("cookies") and "cookie" in self.redact_headers:
+            sanitized["cookies"] = [REDACTED for _ in event["cookies"]]
+
+        authorizer = (event.get("requestContext") or {}).get("authorizer")
+        if authorizer:
+            sanitized["requestContext"] = {
+                **event["requestContext"],
+                "authorizer": self.sanitize_authorizer(authorizer),
+            }
+        return sanitized
+
+    def sanitize_authorizer(self, authorizer: dict[str, Any]) -> dict[str, Any]:
+        # Claims from Cognito (REST API) and JWT authorizers (HTTP API); the context
+        # of HTTP API Lambda authorizers is treated as claims too
+        sanitized = dict(authorizer)
+        if "claims" in authorizer:
+            sanitized["claims"] = redact_mapping(authorizer["claims"], self.redact_claims)
+        if "claims" in (authorizer.get("jwt") or {}):
+            sanitized["jwt"] = {
+                **authorizer["jwt"],
+                "claims": redact_mapping(authorizer["jwt"]["claims"], self.redact_claims),
+            }
+        if isinstance(authorizer.get("lambda"), dict):
+            sanitized["lambda"] = redact_mapping(authorizer["lambda"], self.redact_claims)
+        return sanitized
+
+    def log_event(self, event):
+        if self.should_log_event():
+            logger.debug(
+                "Request event", extra={"event": self.sanitize_event(as_request(event).event)}
+            )
+
+    def log_access(self, event, status_code: int, start: float):
+        if self.access_log and is_enabled_for(logging.INFO):
+            request = as_request(event)
+            logger.info(
+                "Request",
+                extra={
+                    "http_method": request.method,
+                    "path": request.path,
+                    "status_code": status_code,
+                    "duration_ms": round((perf_counter() - start) * 1000, 3),
+                    "request_id": request.request_id,
+                },
+            )
+
+    def wrap(self, handler):
+        def logged_handler(event, context):
+            start = perf_counter()
+            self.log_event(event)
+            response = handler(event, context)
+            self.log_access(event, response["statusCode"], start)
+            return response
+
+        return logged_handler
@@ -0,0 +1,125 @@
+import base64
+from functools import lru_cache
+from typing import Any
+
+from .request import as_request
+
+DEFAULT_MIN_SIZE = 1024
+
+# Responses that never have a body worth compressing
+_UNCOMPRESSED_STATUS_CODES = frozenset((204, 304))
+
+
+@lru_cache(maxsize=64)
+def parse_accept_encoding(accept_encoding: str) -> dict[str, float]:
+    # Maps each coding to its quality value, e.g. "gzip;q=0.8, br" -> {"gzip": 0.8, "br": 1.0}.
+    # Clients send the same few headers over and over, so the results are cached.
+    qualities = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip().lower()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        qualities[coding] = quality
+    return qualities
+
+
+# ResponseCompression compresses response bodies with gzip, or with brotli if the
+# brotli package is installed and the client prefers it, when the request's
+# Accept-Encoding allows it. Bodies smaller than min_size are sent as they are. The
+# compressed body is base64-encoded with isBase64Encoded set, so REST APIs need a
+# binary media type (e.g. */*) for API Gateway to decode it; HTTP APIs, function URLs
+# and ALBs decode it as is.
+class ResponseCompression:
+    def __init__(
+        self,
+        min_size: int = DEFAULT_MIN_SIZE,
+        encodings: tuple[str, ...] = ("br", "gzip"),
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+    ):
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self._brotli = None
+        if "br" in encodings:
+            try:
+                import brotli  # type: ignore[import-not-found]
+
+                self._brotli = brotli
+            except ImportError:
+                encodings = tuple(encoding for encoding in encodings if encoding != "br")
+        # In order of preference, for clients that accept several equally
+        self.encodings = encodings
+
+    def negotiate(self, accept_encoding: str | None) -> str | None:
+        if not accept_encoding:
+            return None
+        qualities = parse_accept_encoding(accept_encoding)
+        wildcard = qualities.get("*", 0.0)
+        best_encoding, best_quality = None, 0.0
+        for encoding in self.encodings:
+            quality = qualities.get(encoding, wildcard)
+            if quality > best_quality:
+                best_encoding, best_quality = encoding, quality
+        return best_encoding
+
+    def encode(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br" and self._brotli is not None:
+            return self._brotli.compress(body, quality=self.brotli_quality)
+        import gzip
+
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    def compress(self, response: dict[str, Any], event) -> dict[str, Any]:
+        # Returns the response with a compressed body, or unchanged
+        body = response.get("body")
+        if (
+            not isinstance(body, str)
+            or len(body) < self.min_size
+            or response.get("isBase64Encoded")
+            or response["statusCode"] in _UNCOMPRESSED_STATUS_CODES
+        ):
+            return response
+        headers = response.get("headers") or {}
+        if "Content-Encoding" in headers:
+            return response
+
+        # The response depends on Accept-Encoding whether or not it gets compressed
+        vary = headers.get("Vary")
+        headers = {**headers, "Vary": f"{vary}, Accept-Encoding" if vary else "Accept-Encoding"}
+        encoding = self.negotiate(as_request(event).headers.get("accept-encoding"))
+        if encoding is not None:
+            raw = body.encode()
+            compressed = self.encode(raw, encoding)
+            if len(compressed) < len(raw):
+                headers["Content-Encoding"] = encoding
+                if "ETag" in headers:
+                    # Each content coding is a different representation, with its own ETag
+                    headers["ETag"] = f'{headers["ETag"][:-1]}-{encoding}"'
+                return {
+                    **response,
+                    "headers": headers,
+                    "body": base64.b64encode(compressed).decode(),
+                    "isBase64Encoded": True,
+                }
+        return {**response, "headers": headers}
+
+
+def make_response_compression(compression) -> ResponseCompression | None:
+    # The `compression=` RestApi option and `compress=` route option are either a
+    # ResponseCompression, True for the defaults, or a minimum body size in bytes
+    if compression is None or compression is False:
+        return None
+    if isinstance(compression, ResponseCompression):
+        return compression
+    if compression is True:
+        return ResponseCompression()
+    return ResponseCompression(min_size=compression)
@@ -0,0 +1,77 @@
+from typing import Any
+from urllib.parse import unquote_plus
+
+
+def split_route(route: str) -> list[str]:
+    # Remove trailing slash if present (/hello/world/ -> /hello/world)
+    if route.endswith("/"):
+        route = route[:-1]
+    return route.split("/")
+
+
+# _RouteNode is a single segment in the routing tree. Static segments are resolved
+# through a dict lookup, while all dynamic segments (`:param`) at a given position
+# share one typed edge, so matching never scans sibling routes.
+class _RouteNode:
+    __slots__ = ("param", "static", "targets")
+
+    def __init__(self):
+        self.static: dict[str, _RouteNode] = {}
+        self.param: _RouteNode | None = None
+        # HTTP method -> (target, names of the dynamic segments along the route)
+        self.targets: dict[str, tuple[Any, tuple[str, ...]]] = {}
+
+
+# Router compiles route templates (e.g. `/users/:id/posts`) into a segment tree once,
+# so that matching a request costs O(path depth) regardless of how many routes are
+# registered. Static segments take precedence over dynamic ones at the same position.
+class Router:
+    def __init__(self):
+        self._root = _RouteNode()
+
+    def add(self, httpmethod: str, route: str, target: Any, replace: bool = False):
+        node = self._root
+        param_names = []
+        for segment in split_route(route):
+            if segment.startswith(":"):
+                param_names.append(segment[1:])
+                if node.param is None:
+                    node.param = _RouteNode()
+                node = node.param
+            else:
+                node = node.static.setdefault(segment, _RouteNode())
+
+        # The first route registered for a method/template wins, unless replacing
+        if replace or httpmethod not in node.targets:
+            node.targets[httpmethod] = (target, tuple(param_names))
+
+    def match(self, httpmethod: str, request_uri: str):
+        values: list[str] = []
+        found = self._match_node(self._root, split_route(request_uri), 0, httpmethod, values)
+        if found is None:
+            return None, None
+
+        target, param_names = found
+        return target, {
+            name: unquote_plus(value) for name, value in zip(param_names, values, strict=True)
+        }
+
+    def _match_node(self, node, segments, index, httpmethod, values):
+        if index == len(segments):
+            return node.targets.get(httpmethod)
+
+        segment = segments[index]
+        static_child = node.static.get(segment)
+        if static_child is not None:
+            found = self._match_node(static_child, segments, index + 1, httpmethod, values)
+            if found is not None:
+                return found
+
+        if node.param is not None:
+            values.append(segment)
+            found = self._match_node(node.param, segments, index + 1, httpmethod, values)
+            if found is not None:
+                return found
+            values.pop()
+
+        return None
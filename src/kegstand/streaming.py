@@ -0,0 +1,165 @@
+import json
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+from .errors import ApiError
+from .log import get_logger
+
+logger = get_logger()
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# Content type and delimiter used by Lambda response streaming for HTTP integrations
+# (function URLs): a JSON prelude with the status code and headers, followed by eight
+# NUL bytes, followed by the response body.
+HTTP_INTEGRATION_CONTENT_TYPE = "application/vnd.awslambda.http-integration-response"
+PRELUDE_DELIMITER = b"\x00" * 8
+
+STREAM_CONTENT_TYPES = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def is_streamable(result: Any) -> bool:
+    # Lists, generators and other iterables are streamed item by item, while dicts,
+    # strings and scalars are written as a single JSON document
+    return isinstance(result, Iterable) and not isinstance(result, (dict, str, bytes))
+
+
+def iter_encoded_chunks(
+    items: Iterable[Any], codec, stream_format: str = "json", chunk_size: int = DEFAULT_CHUNK_SIZE
+) -> Iterator[bytes]:
+    # Incrementally encode the items as a JSON array or as NDJSON, yielding chunks of
+    # roughly chunk_size bytes so that memory use is bounded by the chunk size rather
+    # than by the number of items
+    if stream_format == "json":
+        opening, separator, terminator, closing = b"[", b",", b"", b"]"
+    elif stream_format == "ndjson":
+        opening, separator, terminator, closing = b"", b"", b"\n", b""
+    else:
+        raise ValueError(f"Unsupported stream format: {stream_format}")
+
+    parts = [opening]
+    buffered = len(opening)
+    for index, item in enumerate(items):
+        if index > 0:
+            parts.append(separator)
+        encoded = codec.dumps_bytes(item)
+        parts.append(encoded)
+        parts.append(terminator)
+        buffered += len(encoded) + 1
+        if buffered >= chunk_size:
+            yield b"".join(parts)
+            parts = []
+            buffered = 0
+
+    parts.append(closing)
+    remainder = b"".join(parts)
+    if remainder:
+        yield remainder
+
+
+def start_http_response(response_stream, status_code: int, headers: dict[str, str]):
+    # Write the HTTP integration prelude, which must come before any body bytes
+    if hasattr(response_stream, "set_content_type"):
+        response_stream.set_content_type(HTTP_INTEGRATION_CONTENT_TYPE)
+    prelude = json.dumps({"statusCode": status_code, "headers": headers}).encode()
+    response_stream.write(prelude + PRELUDE_DELIMITER)
+
+
+def write_api_response(response_stream, response: dict[str, Any]):
+    # Write a complete (buffered) api_response dict to a response stream
+    start_http_response(response_stream, response["statusCode"], response.get("headers", {}))
+    response_stream.write(response["body"].encode())
+    response_stream.close()
+
+
+def stream_result(
+    response_stream,
+    result: Any,
+    codec,
+    stream_format: str = "json",
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> int:
+    # Returns the status code that was written
+    if not is_streamable(result):
+        start_http_response(response_stream, 200, {"Content-Type": "application/json"})
+        response_stream.write(codec.dumps_bytes(result))
+        response_stream.close()
+        return 200
+
+    # Pull the first item before committing to a 200 status, so that errors raised
+    # up front by a generator handler (e.g. ApiError for a missing record) still map
+    # to the right status code
+    items = iter(result)
+    try:
+        first_item = next(items)
+        has_items = True
+    except StopIteration:
+        has_items = False
+    except ApiError as e:
+        response = e.to_api_response(codec)
+        write_api_response(response_stream, response)
+        return response["statusCode"]
+
+    def all_items():
+        if has_items:
+            yield first_item
+            yield from items
+
+    start_http_response(response_stream, 200, {"Content-Type": STREAM_CONTENT_TYPES[stream_format]})
+    try:
+        for chunk in iter_encoded_chunks(all_items(), codec, stream_format, chunk_size):
+            response_stream.write(chunk)
+    except Exception:
+        # The status code has already been sent, so all we can do is end the stream
+        logger.exception("Error while streaming response; the response is truncated")
+    finally:
+        response_stream.close()
+        # Let generator handlers clean up (and release their route limits) if the
+        # stream ended early
+        close = getattr(items, "close", None)
+        if close is not None:
+            close()
+    return 200
+
+
+# LocalResponseStream is an in-process stand-in for the Lambda response stream, for
+# tests and local development. It records the chunks written to it and parses the
+# HTTP integration prelude back into a status code and headers.
+class LocalResponseStream:
+    def __init__(self):
+        self.content_type: str | None = None
+        self.chunks: list[bytes] = []
+        self.closed = False
+        self.status_code: int | None = None
+        self.headers: dict[str, str] = {}
+        self._prelude_done = False
+
+    def set_content_type(self, content_type: str):
+        self.content_type = content_type
+
+    def write(self, data: bytes):
+        if self.closed:
+            raise ValueError("Write to a closed response stream")
+        if not self._prelude_done and self.content_type == HTTP_INTEGRATION_CONTENT_TYPE:
+            prelude, _, data = data.partition(PRELUDE_DELIMITER)
+            metadata = json.loads(prelude)
+            self.status_code = metadata["statusCode"]
+            self.headers = metadata.get("headers", {})
+            self._prelude_done = True
+            if not data:
+                return
+        self.chunks.append(data)
+
+    def close(self):
+        self.closed = True
+
+    @property
+    def body(self) -> bytes:
+        return b"".join(self.chunks)
+
+    @property
+    def max_chunk_size(self) -> int:
+        return max((len(chunk) for chunk in self.chunks), default=0)
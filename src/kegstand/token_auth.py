@@ -0,0 +1,184 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Iterable
+from typing import Any
+
+import jwt
+
+from .log import get_logger
+from .request import Request, as_request
+
+logger = get_logger()
+
+
+# JwksCache holds the signing keys of a JSON Web Key Set, loaded from a URL (e.g. a
+# Cognito user pool's /.well-known/jwks.json) or a local file, for the life of the
+# warm container. The key set is reloaded when a token is signed with an unknown key
+# id (after a key rotation), but at most once per min_refresh_interval seconds, so
+# that tokens with made-up key ids cannot trigger a fetch on every request.
+class JwksCache:
+    def __init__(
+        self,
+        url: str | None = None,
+        path: str | None = None,
+        min_refresh_interval: float = 300,
+        timeout: float = 5,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if (url is None) == (path is None):
+            raise ValueError("JwksCache requires either a url or a path")
+        self.url = url
+        self.path = path
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self.clock = clock
+        self.refreshes = 0
+        self._keys: dict[str, jwt.PyJWK] = {}
+        self._refreshed_at: float | None = None
+        self._lock = threading.Lock()
+
+    def _fetch(self) -> dict[str, Any]:
+        if self.url is None:
+            with open(str(self.path)) as f:
+                return json.load(f)
+
+        # Only imported when the key set is actually fetched over HTTP
+        from urllib.request import urlopen
+
+        with urlopen(self.url, timeout=self.timeout) as response:  # noqa: S310
+            return json.load(response)
+
+    def refresh(self):
+        key_set = jwt.PyJWKSet.from_dict(self._fetch())
+        self._keys = {key.key_id: key for key in key_set.keys if key.key_id is not None}
+        self._refreshed_at = self.clock()
+        self.refreshes += 1
+
+    def get_signing_key(self, key_id: str) -> jwt.PyJWK:
+        key = self._keys.get(key_id)
+        if key is not None:
+            return key
+
+        with self._lock:
+            # Another thread may have refreshed the key set while we waited
+            key = self._keys.get(key_id)
+            if key is None and (
+                self._refreshed_at is None
+                or self.clock() - self._refreshed_at >= self.min_refresh_interval
+            ):
+                self.refresh()
+                key = self._keys.get(key_id)
+        if key is None:
+            raise jwt.InvalidTokenError(f"Unknown signing key: {key_id}")
+        return key
+
+
+# TokenVerifier verifies bearer tokens (JWTs) inside the Lambda, as an alternative to
+# an API Gateway authorizer. Set it on the RestApi, and the claims of a valid token
+# feed the `claims` argument and the Auth conditions exactly like authorizer claims.
+# Requests without a valid token are treated as unauthenticated. Events that already
+# carry authorizer claims are left as they are.
+#
+# Verified tokens are kept in a bounded LRU cache, keyed by the token's hash, until
+# they expire, so a client that reuses its token is only verified once per container.
+class TokenVerifier:
+    def __init__(  # noqa: PLR0913
+        self,
+        jwks: JwksCache,
+        audience: str | Iterable[str] | None = None,
+        issuer: str | None = None,
+        algorithms: Iterable[str] = ("RS256",),
+        leeway: float = 0,
+        cache_size: int = 1024,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.jwks = jwks
+        # Tokens with an `aud` claim are only accepted if it matches one of the audiences
+        if audience is not None and not isinstance(audience, str):
+            audience = list(audience)
+        self.audience = audience
+        self.issuer = issuer
+        self.algorithms = list(algorithms)
+        self.leeway = leeway
+        self.cache_size = cache_size
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._verified: OrderedDict[bytes, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _decode(self, token: str) -> dict[str, Any]:
+        # May raise jwt.PyJWTError
+        key_id = jwt.get_unverified_header(token).get("kid")
+        if key_id is None:
+            raise jwt.InvalidTokenError("Token has no key id")
+        return jwt.decode(
+            token,
+            key=self.jwks.get_signing_key(key_id).key,
+            algorithms=self.algorithms,
+            audience=self.audience,
+            issuer=self.issuer,
+            leeway=self.leeway,
+            options={"require": ["exp"]},
+        )
+
+    def verify(self, token: str) -> dict[str, Any]:
+        # Returns the token's claims. May raise jwt.PyJWTError
+        token_hash = hashlib.sha256(token.encode()).digest()
+        with self._lock:
+            entry = self._verified.get(token_hash)
+            if entry is not None:
+                expires_at, claims = entry
+                if self.clock() < expires_at:
+                    self._verified.move_to_end(token_hash)
+                    self.hits += 1
+                    # Handlers may modify the claims, so never hand out the cached dict
+                    return dict(claims)
+                del self._verified[token_hash]
+            self.misses += 1
+
+        claims = self._decode(token)
+        with self._lock:
+            self._verified[token_hash] = (claims["exp"], claims)
+            while len(self._verified) > self.cache_size:
+                self._verified.popitem(last=False)
+        return dict(claims)
+
+    def authenticate(self, event) -> Request:
+        # Returns a Request view of the event with the token's claims, or without any
+        # claims if it has no valid bearer token. The event itself is not modified.
+        request = as_request(event)
+        if request.claims is not None:
+            return request
+
+        token = bearer_token(request)
+        if token is None:
+            return request
+        try:
+            claims = self.verify(token)
+        except (jwt.PyJWTError, OSError, ValueError) as e:
+            logger.info("Rejected bearer token", extra={"reason": str(e)})
+            return request
+        return request.with_claims(claims)
+
+    def wrap(self, handler):
+        def authenticated_handler(event, context):
+            return handler(self.authenticate(event), context)
+
+        return authenticated_handler
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._verified)}
+
+
+def bearer_token(event) -> str | None:
+    authorization = as_request(event).headers.get("authorization")
+    if not authorization:
+        return None
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    return token.strip()
@@ -1,50 +1,72 @@
-import json
 import os
 from typing import Any, Dict
 
+from .json_codec import DEFAULT_CODEC
+from .request import as_request
 
-def api_response(body: Dict[str, Any], status_code: int = 200) -> Dict[str, Any]:
+
+def api_response(body: Dict[str, Any], status_code: int = 200, codec=None) -> Dict[str, Any]:
     return {
         "statusCode": status_code,
-        "body": json.dumps(body),
+        "body": (codec or DEFAULT_CODEC).dumps(body),
         "headers": {"Content-Type": "application/json"},
     }
 
 
-def find_resource_modules(api_src_dir: str) -> list:
+def get_event_claims(event) -> Dict[str, Any] | None:
+    # The authorized user properties (claims) from the authorizer, if any. Accepts a
+    # Request or a raw event in any of the supported formats.
+    return as_request(event).claims
+
+
+def find_resource_modules(api_src_dir: str, recursive: bool = False) -> list:
     # Look through folder structure and create a list of resource modules found.
     # Expects a folder structure like this:
     #   api/
     #       [resource_name].py which exposes a resource object named `api`
     #   api/public/
     #       [resource_name].py which exposes a resource object named `api`
+    # If recursive is True, resource modules in nested subfolders are included too
+    # (e.g. api/admin/users.py -> api.admin.users), inheriting the public/private
+    # status of the top-level folder they live in.
     resources = []
 
     api_folders: list[dict[str, str | bool]] = [
         {"name": "api", "resources_are_public": False},
         {"name": "api/public", "resources_are_public": True},
     ]
+    top_level_folders = {str(api_folder["name"]) for api_folder in api_folders}
 
     # Loop over folders in api_src_dir and list the resource modules
-    for api_folder in api_folders:
-        api_folder_full = os.path.join(api_src_dir, str(api_folder["name"]))
+    folders_to_scan = [
+        (str(api_folder["name"]), bool(api_folder["resources_are_public"]))
+        for api_folder in api_folders
+    ]
+    while folders_to_scan:
+        folder_name, is_public = folders_to_scan.pop(0)
+        api_folder_full = os.path.join(api_src_dir, folder_name)
         if not os.path.isdir(api_folder_full):
             continue
 
-        for file_descriptor in os.listdir(api_folder_full):
-            # Ignore folders, only look at files
-            if os.path.isdir(os.path.join(api_folder_full, file_descriptor)):
-                continue
+        for file_descriptor in sorted(os.listdir(api_folder_full)):
             # Skip dotfiles and special files
             if file_descriptor.startswith((".", "__")) or file_descriptor == "lambda.py":
                 continue
+            # Only descend into subfolders when scanning recursively
+            subfolder_name = f"{folder_name}/{file_descriptor}"
+            if os.path.isdir(os.path.join(api_folder_full, file_descriptor)):
+                if recursive and subfolder_name not in top_level_folders:
+                    folders_to_scan.append((subfolder_name, is_public))
+                continue
+            if not file_descriptor.endswith(".py"):
+                continue
             resource_name = os.path.splitext(file_descriptor)[0]
             resources.append(
                 {
                     "name": resource_name,
-                    "module_path": f"{str(api_folder['name']).replace('/', '.')}.{resource_name}",
+                    "module_path": f"{folder_name.replace('/', '.')}.{resource_name}",
                     "fromlist": [resource_name],
-                    "is_public": api_folder["resources_are_public"],
+                    "is_public": is_public,
                 }
             )
     return resources
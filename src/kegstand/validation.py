@@ -0,0 +1,381 @@
+import re
+import types
+import typing
+from collections.abc import Callable
+from typing import Any
+
+from .errors import ValidationError
+
+# A checker validates (and converts) one value. It appends an error for each invalid
+# field to the errors list and returns the converted value, which is only used if no
+# errors were added.
+Checker = Callable[[Any, str, list[dict[str, str]]], Any]
+
+ROOT_PATH = "$"
+
+_PRIMITIVE_NAMES = {str: "string", int: "integer", float: "number", bool: "boolean"}
+
+# JSON Schema keywords that are accepted but do not affect validation
+_ANNOTATION_KEYWORDS = frozenset(
+    ("$schema", "$id", "title", "description", "default", "examples", "format")
+)
+_VALIDATION_KEYWORDS = frozenset(
+    (
+        "type",
+        "properties",
+        "required",
+        "additionalProperties",
+        "items",
+        "minItems",
+        "maxItems",
+        "minLength",
+        "maxLength",
+        "pattern",
+        "minimum",
+        "maximum",
+        "exclusiveMinimum",
+        "exclusiveMaximum",
+        "enum",
+        "const",
+    )
+)
+
+
+def _join(path: str, key: str | int) -> str:
+    if isinstance(key, int):
+        return f"{path}[{key}]"
+    return key if path == ROOT_PATH else f"{path}.{key}"
+
+
+def _add_error(errors: list[dict[str, str]], path: str, message: str):
+    errors.append({"field": path, "message": message})
+
+
+def _is_integer(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+# Type annotations: dataclasses, TypedDicts, str/int/float/bool/None, list[X],
+# dict[str, X], Optional/Union, Literal and Any
+
+
+def _compile_primitive(expected: type) -> Checker:
+    type_name = _PRIMITIVE_NAMES[expected]
+    if expected is int:
+        is_valid: Callable[[Any], bool] = _is_integer
+    elif expected is float:
+        is_valid = _is_number
+    else:
+
+        def is_valid(value):
+            return isinstance(value, expected)
+
+    def check(value, path, errors):
+        if not is_valid(value):
+            _add_error(errors, path, f"Expected {type_name}")
+            return value
+        # JSON does not distinguish 1 from 1.0, so integers are accepted as floats
+        return float(value) if expected is float else value
+
+    return check
+
+
+def _check_none(value, path, errors):
+    if value is not None:
+        _add_error(errors, path, "Expected null")
+    return value
+
+
+def _check_any(value, _path, _errors):
+    return value
+
+
+def _compile_union(alternatives: tuple, seen: dict) -> Checker:
+    nullable = type(None) in alternatives
+    checkers = [
+        _compile_type(alternative, seen)
+        for alternative in alternatives
+        if alternative is not type(None)
+    ]
+
+    def check(value, path, errors):
+        if value is None and nullable:
+            return None
+        if len(checkers) == 1:
+            return checkers[0](value, path, errors)
+        for checker in checkers:
+            alternative_errors: list[dict[str, str]] = []
+            converted = checker(value, path, alternative_errors)
+            if not alternative_errors:
+                return converted
+        _add_error(errors, path, "Does not match any of the allowed types")
+        return value
+
+    return check
+
+
+def _compile_literal(values: tuple) -> Checker:
+    allowed = list(values)
+
+    def check(value, path, errors):
+        # Compare types too, so that True does not match Literal[1]
+        if not any(value == item and type(value) is type(item) for item in allowed):
+            _add_error(errors, path, f"Must be one of {allowed}")
+        return value
+
+    return check
+
+
+def _compile_list(item_type, seen: dict) -> Checker:
+    check_item = _compile_type(item_type, seen)
+
+    def check(value, path, errors):
+        if not isinstance(value, list):
+            _add_error(errors, path, "Expected array")
+            return value
+        return [check_item(item, _join(path, index), errors) for index, item in enumerate(value)]
+
+    return check
+
+
+def _compile_dict(value_type, seen: dict) -> Checker:
+    check_value = _compile_type(value_type, seen)
+
+    def check(value, path, errors):
+        if not isinstance(value, dict):
+            _add_error(errors, path, "Expected object")
+            return value
+        return {key: check_value(item, _join(path, key), errors) for key, item in value.items()}
+
+    return check
+
+
+def _compile_fields(fields: list[tuple[str, Checker, bool]], build: Callable) -> Checker:
+    # Shared by dataclasses and TypedDicts: fields are (name, checker, required).
+    # Undeclared keys are dropped.
+    def check(value, path, errors):
+        if not isinstance(value, dict):
+            _add_error(errors, path, "Expected object")
+            return value
+        error_count = len(errors)
+        converted = {}
+        for name, check_field, required in fields:
+            if name in value:
+                converted[name] = check_field(value[name], _join(path, name), errors)
+            elif required:
+                _add_error(errors, _join(path, name), "Missing required field")
+        if len(errors) > error_count:
+            return value
+        return build(converted)
+
+    return check
+
+
+def _compile_dataclass(cls, seen: dict) -> Checker:
+    import dataclasses
+
+    hints = typing.get_type_hints(cls)
+    fields = [
+        (
+            field.name,
+            _compile_type(hints[field.name], seen),
+            field.default is dataclasses.MISSING and field.default_factory is dataclasses.MISSING,
+        )
+        for field in dataclasses.fields(cls)
+        if field.init
+    ]
+    return _compile_fields(fields, lambda converted: cls(**converted))
+
+
+def _compile_typeddict(cls, seen: dict) -> Checker:
+    hints = typing.get_type_hints(cls)
+    fields = [
+        (name, _compile_type(hint, seen), name in cls.__required_keys__)
+        for name, hint in hints.items()
+    ]
+    return _compile_fields(fields, lambda converted: converted)
+
+
+def _compile_type(annotation, seen: dict) -> Checker:  # noqa: PLR0911
+    import dataclasses
+
+    if annotation is Any or annotation is object:
+        return _check_any
+    if annotation is None or annotation is type(None):
+        return _check_none
+    if annotation in _PRIMITIVE_NAMES:
+        return _compile_primitive(annotation)
+
+    origin = typing.get_origin(annotation)
+    if origin is typing.Union or origin is types.UnionType:
+        return _compile_union(typing.get_args(annotation), seen)
+    if origin is typing.Literal:
+        return _compile_literal(typing.get_args(annotation))
+    if annotation is list or origin is list:
+        args = typing.get_args(annotation)
+        return _compile_list(args[0] if args else Any, seen)
+    if annotation is dict or origin is dict:
+        args = typing.get_args(annotation)
+        return _compile_dict(args[1] if args else Any, seen)
+
+    is_dataclass = dataclasses.is_dataclass(annotation) and isinstance(annotation, type)
+    if is_dataclass or typing.is_typeddict(annotation):
+        # Self-referencing (recursive) types look up their checker when it is called
+        if annotation in seen:
+            return lambda value, path, errors: seen[annotation](value, path, errors)
+        seen[annotation] = None
+        compile_fields = _compile_dataclass if is_dataclass else _compile_typeddict
+        seen[annotation] = compile_fields(annotation, seen)
+        return seen[annotation]
+
+    raise TypeError(f"Unsupported schema type: {annotation!r}")
+
+
+# JSON Schema subset: type, properties, required, additionalProperties (boolean),
+# items, minItems/maxItems, minLength/maxLength, pattern, minimum/maximum,
+# exclusiveMinimum/exclusiveMaximum (numbers), enum and const
+
+
+def _json_type_check(type_name: str) -> Callable[[Any], bool]:
+    json_types: dict[str, Callable[[Any], bool]] = {
+        "object": lambda value: isinstance(value, dict),
+        "array": _is_array,
+        "string": _is_string,
+        "integer": _is_integer,
+        "number": _is_number,
+        "boolean": lambda value: isinstance(value, bool),
+        "null": lambda value: value is None,
+    }
+    if type_name not in json_types:
+        raise ValueError(f"Unsupported JSON Schema type: {type_name!r}")
+    return json_types[type_name]
+
+
+def _is_string(value) -> bool:
+    return isinstance(value, str)
+
+
+def _is_array(value) -> bool:
+    return isinstance(value, list)
+
+
+# (keyword, which values it applies to, comparison, message)
+_LIMIT_KEYWORDS = (
+    ("minLength", _is_string, lambda value, limit: len(value) >= limit, "at least {} characters"),
+    ("maxLength", _is_string, lambda value, limit: len(value) <= limit, "at most {} characters"),
+    ("minItems", _is_array, lambda value, limit: len(value) >= limit, "at least {} items"),
+    ("maxItems", _is_array, lambda value, limit: len(value) <= limit, "at most {} items"),
+    ("minimum", _is_number, lambda value, limit: value >= limit, "at least {}"),
+    ("maximum", _is_number, lambda value, limit: value <= limit, "at most {}"),
+    ("exclusiveMinimum", _is_number, lambda value, limit: value > limit, "greater than {}"),
+    ("exclusiveMaximum", _is_number, lambda value, limit: value < limit, "less than {}"),
+)
+
+
+def _limit_predicate(applies_to: Callable[[Any], bool], compare: Callable, limit):
+    # Values of other types are left to the `type` keyword
+    return lambda value: not applies_to(value) or compare(value, limit)
+
+
+def _compile_json_schema(schema: dict[str, Any]) -> Checker:  # noqa: PLR0912
+    unsupported = set(schema) - _VALIDATION_KEYWORDS - _ANNOTATION_KEYWORDS
+    if unsupported:
+        raise ValueError(f"Unsupported JSON Schema keywords: {sorted(unsupported)}")
+
+    # Each constraint is a (predicate, message) pair; a predicate is only called if
+    # the value has the right type for it
+    constraints: list[tuple[Callable[[Any], bool], str]] = []
+
+    if "type" in schema:
+        type_names = schema["type"] if isinstance(schema["type"], list) else [schema["type"]]
+        type_checks = [_json_type_check(type_name) for type_name in type_names]
+        constraints.append(
+            (
+                lambda value: any(type_check(value) for type_check in type_checks),
+                f"Expected {' or '.join(type_names)}",
+            )
+        )
+    if "enum" in schema:
+        allowed = schema["enum"]
+        constraints.append((lambda value: value in allowed, f"Must be one of {allowed}"))
+    if "const" in schema:
+        const = schema["const"]
+        constraints.append((lambda value: value == const, f"Must be {const!r}"))
+
+    for keyword, applies_to, compare, message in _LIMIT_KEYWORDS:
+        if keyword in schema:
+            constraints.append(
+                (
+                    _limit_predicate(applies_to, compare, schema[keyword]),
+                    f"Must be {message.format(schema[keyword])}",
+                )
+            )
+    if "pattern" in schema:
+        pattern = re.compile(schema["pattern"])
+        constraints.append(
+            (
+                lambda value: not isinstance(value, str) or pattern.search(value) is not None,
+                f"Must match pattern {schema['pattern']!r}",
+            )
+        )
+
+    check_items = _compile_json_schema(schema["items"]) if "items" in schema else None
+    properties = {
+        name: _compile_json_schema(property_schema)
+        for name, property_schema in schema.get("properties", {}).items()
+    }
+    required = tuple(schema.get("required", ()))
+    additional_properties = schema.get("additionalProperties", True)
+    if not isinstance(additional_properties, bool):
+        raise ValueError("Only boolean additionalProperties are supported")
+
+    def check(value, path, errors):
+        for predicate, message in constraints:
+            if not predicate(value):
+                _add_error(errors, path, message)
+                return value
+
+        if isinstance(value, list) and check_items is not None:
+            return [
+                check_items(item, _join(path, index), errors) for index, item in enumerate(value)
+            ]
+
+        if isinstance(value, dict):
+            for name in required:
+                if name not in value:
+                    _add_error(errors, _join(path, name), "Missing required field")
+            converted = {}
+            for key, item in value.items():
+                check_property = properties.get(key)
+                if check_property is not None:
+                    converted[key] = check_property(item, _join(path, key), errors)
+                elif additional_properties:
+                    converted[key] = item
+                else:
+                    _add_error(errors, _join(path, key), "Unexpected field")
+            return converted
+
+        return value
+
+    return check
+
+
+def compile_schema(schema) -> Callable[[Any], Any]:
+    # Compile a schema (a dataclass, a TypedDict, another supported type annotation or
+    # a JSON Schema dict) into a validator, once, at decoration time. The validator
+    # returns the converted value (e.g. a dataclass instance) or raises a
+    # ValidationError listing every invalid field.
+    check = _compile_json_schema(schema) if isinstance(schema, dict) else _compile_type(schema, {})
+
+    def validate(value):
+        errors: list[dict[str, str]] = []
+        converted = check(value, ROOT_PATH, errors)
+        if errors:
+            raise ValidationError(errors)
+        return converted
+
+    return validate
@@ -0,0 +1,61 @@
+import os
+from collections.abc import Callable
+from typing import Any
+
+from .log import get_logger
+
+logger = get_logger()
+
+# Lambda sets AWS_LAMBDA_INITIALIZATION_TYPE to on-demand, provisioned-concurrency or
+# snap-start. Outside of on-demand initialization, the init phase runs ahead of the
+# first request, so it is the place for all of the expensive setup.
+INITIALIZATION_TYPE_ENV = "AWS_LAMBDA_INITIALIZATION_TYPE"
+ON_DEMAND = "on-demand"
+PROVISIONED_CONCURRENCY = "provisioned-concurrency"
+SNAP_START = "snap-start"
+
+# Sources of the events that keep-warm schedules invoke the function with: EventBridge
+# (CloudWatch Events) scheduled rules and the serverless-plugin-warmup plugin
+WARMER_SOURCES = frozenset(("aws.events", "serverless-plugin-warmup"))
+
+WARMER_RESPONSE = {"warmed": True}
+
+
+def initialization_type() -> str:
+    return os.environ.get(INITIALIZATION_TYPE_ENV, ON_DEMAND)
+
+
+def is_pre_warmed_init() -> bool:
+    # True if the init phase runs ahead of requests, so warming up costs them nothing
+    return initialization_type() in (PROVISIONED_CONCURRENCY, SNAP_START)
+
+
+def is_warmer_event(event) -> bool:
+    # Warmer events invoke the function directly, so they never look like API events
+    if not isinstance(event, dict) or "httpMethod" in event or "requestContext" in event:
+        return False
+    return event.get("source") in WARMER_SOURCES or bool(event.get("warmer"))
+
+
+def register_snapshot_hooks(before_snapshot: Callable[[], Any], after_restore: Callable[[], Any]):
+    # Registers the hooks with the SnapStart runtime hooks package, which the Lambda
+    # Python runtime provides. Returns False where it is not available.
+    try:
+        from snapshot_restore_py import (  # type: ignore[import-not-found]
+            register_after_restore,
+            register_before_snapshot,
+        )
+    except ImportError:
+        return False
+    register_before_snapshot(before_snapshot)
+    register_after_restore(after_restore)
+    return True
+
+
+def run_hooks(hooks: list[Callable[[], Any]], phase: str):
+    # Hooks run in registration order; a failing hook is logged and the rest still run
+    for hook in hooks:
+        try:
+            hook()
+        except Exception:
+            logger.exception(f"Error in {phase} hook {getattr(hook, '__name__', hook)!r}")
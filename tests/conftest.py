@@ -0,0 +1,50 @@
+import pytest
+
+from kegstand.api import RestApi
+
+USER_CLAIMS = {"sub": "user123"}
+
+
+def build_event(  # noqa: PLR0913
+    path="/beers/1",
+    method="GET",
+    body=None,
+    query=None,
+    headers=None,
+    claims=USER_CLAIMS,
+    request_id=None,
+):
+    # A REST API (payload v1) event, as API Gateway passes it to the exported handler.
+    # claims=None leaves out the authorizer context, as for public routes.
+    request_context = {}
+    if claims is not None:
+        request_context["authorizer"] = {"claims": claims}
+    if request_id is not None:
+        request_context["requestId"] = request_id
+    return {
+        "httpMethod": method,
+        "path": path,
+        "body": body,
+        "queryStringParameters": query,
+        "headers": headers or {},
+        "requestContext": request_context,
+    }
+
+
+def build_api(*resources, public=False, **options):
+    # A RestApi with the resources added. Request logging is off unless asked for.
+    options.setdefault("request_logging", False)
+    api = RestApi(**options)
+    for resource in resources:
+        api.add_resource(resource, is_public=public)
+    return api
+
+
+@pytest.fixture
+def make_event():
+    return build_event
+
+
+@pytest.fixture
+def make_api():
+    return build_api
@@ -1,3 +1,4 @@
+import json
 from unittest.mock import MagicMock, patch
 
 from kegstand.api import RestApi
@@ -148,7 +149,7 @@ def test_export_handler_with_body():
 
     response = handler(event, {})
     assert response["statusCode"] == 200
-    assert '"key": "value"' in response["body"]
+    assert json.loads(response["body"]) == {"received": {"key": "value"}}
 
 
 def test_export_handler_invalid_json():
@@ -168,3 +169,31 @@ def test_export_handler_invalid_json():
     response = handler(event, {})
     assert response["statusCode"] == 400
     assert "Invalid JSON" in response["body"]
+
+
+def test_export_handler_routes_across_resources():
+    api = RestApi()
+    users = ApiResource("/users")
+    posts = ApiResource("/posts")
+
+    @users.get("/:id")
+    def get_user(params):
+        return {"user": params["id"]}
+
+    @posts.get("/:id")
+    def get_post(params):
+        return {"post": params["id"]}
+
+    api.add_resource(users, is_public=True)
+    api.add_resource(posts, is_public=True)
+    handler = api.export()
+
+    event = {"httpMethod": "GET", "path": "/posts/42", "body": None, "requestContext": {}}
+    response = handler(event, {})
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"]) == {"post": "42"}
+
+    # Wrong method on an existing route
+    event = {"httpMethod": "DELETE", "path": "/posts/42", "body": None, "requestContext": {}}
+    response = handler(event, {})
+    assert response["statusCode"] == 404
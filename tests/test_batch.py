@@ -0,0 +1,125 @@
+import base64
+import json
+import threading
+import time
+
+import pytest
+
+from kegstand.api import RestApi
+from kegstand.batch import decode_record, record_identifier
+from kegstand.decorators import ApiResource
+from kegstand.errors import ApiError
+
+WORKER = {"sub": "worker"}
+
+
+@pytest.fixture
+def command(make_event):
+    # A POST /commands/<name> event, as a worker enqueues it
+    def build(name, data=None):
+        body = json.dumps(data) if data is not None else None
+        return make_event(f"/commands/{name}", method="POST", body=body, claims=WORKER)
+
+    return build
+
+
+def sqs_record(message_id, event):
+    return {"eventSource": "aws:sqs", "messageId": message_id, "body": json.dumps(event)}
+
+
+def kinesis_record(sequence_number, event):
+    data = base64.b64encode(json.dumps(event).encode()).decode()
+    return {
+        "eventSource": "aws:kinesis",
+        "kinesis": {"sequenceNumber": sequence_number, "data": data},
+    }
+
+
+@pytest.fixture
+def api():
+    api = RestApi()
+    resource = ApiResource("/commands")
+    threads = set()
+
+    @resource.post("/:name")
+    def run_command(params, data, claims):
+        threads.add(threading.get_ident())
+        time.sleep(0.01)
+        if params["name"] == "crash":
+            raise RuntimeError("Boom")
+        if params["name"] == "invalid":
+            raise ApiError("Invalid command", 400)
+        return {"ran": params["name"], "data": data, "by": claims["sub"]}
+
+    api.add_resource(resource)
+    api.threads = threads  # type: ignore[attr-defined]
+    return api
+
+
+def test_decode_record(command):
+    event = command("a")
+
+    assert decode_record(sqs_record("m1", event)) == event
+    assert decode_record(kinesis_record("s1", event)) == event
+    assert decode_record(event) == event
+
+
+def test_record_identifier(command):
+    event = command("a")
+
+    assert record_identifier(sqs_record("m1", event), 0) == "m1"
+    assert record_identifier(kinesis_record("s1", event), 0) == "s1"
+    assert record_identifier(event, 3) == "3"
+
+
+def test_batch_handler_sqs(api, make_event, command):
+    handler = api.export_batch()
+    event = {
+        "Records": [
+            sqs_record("m1", command("brew", {"litres": 20})),
+            sqs_record("m2", command("invalid")),
+            sqs_record("m3", command("crash")),
+            sqs_record("m4", make_event("/nowhere", claims=WORKER)),
+            {"eventSource": "aws:sqs", "messageId": "m5", "body": "not json"},
+        ]
+    }
+
+    result = handler(event, {})
+
+    statuses = {item["itemIdentifier"]: item["statusCode"] for item in result["results"]}
+    assert statuses == {"m1": 200, "m2": 400, "m3": 500, "m4": 404, "m5": 500}
+    assert json.loads(result["results"][0]["body"]) == {
+        "ran": "brew",
+        "data": {"litres": 20},
+        "by": "worker",
+    }
+    # Only server errors are retried
+    assert result["batchItemFailures"] == [{"itemIdentifier": "m3"}, {"itemIdentifier": "m5"}]
+
+
+def test_batch_handler_kinesis_and_plain_events(api, command):
+    handler = api.export_batch()
+
+    result = handler({"Records": [kinesis_record("s1", command("tap"))]}, {})
+    assert result["results"][0]["itemIdentifier"] == "s1"
+    assert result["results"][0]["statusCode"] == 200
+
+    result = handler([command("tap"), command("pour")], {})
+    assert [item["itemIdentifier"] for item in result["results"]] == ["0", "1"]
+    assert result["batchItemFailures"] == []
+
+
+def test_batch_handler_thread_pool(api, command):
+    handler = api.export_batch(max_workers=4)
+    records = [sqs_record(f"m{i}", command(f"c{i}")) for i in range(8)]
+
+    result = handler({"Records": records}, {})
+
+    # Results keep the order of the records
+    assert [item["itemIdentifier"] for item in result["results"]] == [f"m{i}" for i in range(8)]
+    assert all(item["statusCode"] == 200 for item in result["results"])
+    assert len(api.threads) > 1
+
+    # The pool is reused across invocations
+    assert handler.executor is not None
+    handler({"Records": records[:1]}, {})
@@ -0,0 +1,201 @@
+import json
+
+from kegstand.api import RestApi
+from kegstand.cache import ResponseCache, make_response_cache
+from kegstand.decorators import ApiResource
+from kegstand.dependencies import REQUEST
+from kegstand.errors import ApiError
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_make_response_cache():
+    assert make_response_cache(None) is None
+    assert make_response_cache(False) is None
+    cache = ResponseCache()
+    assert make_response_cache(cache) is cache
+    assert make_response_cache(30).ttl == 30
+    assert make_response_cache(True).ttl == ResponseCache().ttl
+
+
+def test_cache_ttl_and_lru_eviction():
+    clock = FakeClock()
+    cache = ResponseCache(ttl=10, max_size=2, clock=clock)
+    response = {"statusCode": 200, "body": "{}", "headers": {}}
+
+    cache.set("a", response)
+    cache.set("b", response)
+    assert cache.get("a") is response  # "a" is now the most recently used
+    cache.set("c", response)  # Evicts "b"
+    assert cache.get("b") is None
+
+    clock.now += 11
+    assert cache.get("a") is None
+    assert cache.stats() == {"hits": 1, "misses": 2, "evictions": 2, "size": 1}
+
+    cache.clear()
+    assert cache.stats()["size"] == 0
+
+
+def test_cached_get_route(make_event):
+    calls = []
+    api = RestApi()
+    resource = ApiResource("/config")
+
+    @resource.get("/:name", cache=ResponseCache(ttl=60, query=["lang"]))
+    def get_config(params, query):
+        calls.append(params["name"])
+        return {"name": params["name"], "lang": query.get("lang"), "call": len(calls)}
+
+    api.add_resource(resource, is_public=True)
+    handler = api.export()
+
+    first = handler(make_event("/config/beer", query={"lang": "en", "ignored": "1"}), {})
+    second = handler(make_event("/config/beer", query={"lang": "en", "ignored": "2"}), {})
+    assert first == second
+    assert json.loads(second["body"])["call"] == 1
+
+    # Different path params and declared query params are cached separately
+    handler(make_event("/config/wine", query={"lang": "en"}), {})
+    handler(make_event("/config/beer", query={"lang": "da"}), {})
+    assert calls == ["beer", "wine", "beer"]
+
+    # Cached responses can be modified by the caller without affecting the cache
+    second["headers"]["X-Extra"] = "1"
+    assert "X-Extra" not in handler(make_event("/config/beer", query={"lang": "en"}), {})["headers"]
+
+    assert api.cache_stats() == {
+        "GET /config/:name": {"hits": 2, "misses": 3, "evictions": 0, "size": 3}
+    }
+
+
+def test_cached_route_keyed_by_claims(make_event):
+    api = RestApi()
+    resource = ApiResource("/me", method_defaults={"cache": ResponseCache(claims=["sub"])})
+
+    @resource.get("/")
+    def get_me(claims):
+        return {"user": claims["sub"]}
+
+    @resource.post("/")
+    def update_me(claims):
+        return {"updated": claims["sub"]}
+
+    api.add_resource(resource)
+    handler = api.export()
+
+    alice = handler(make_event("/me", claims={"sub": "alice"}), {})
+    bob = handler(make_event("/me", claims={"sub": "bob"}), {})
+    assert json.loads(alice["body"]) == {"user": "alice"}
+    assert json.loads(bob["body"]) == {"user": "bob"}
+
+    # Only GET routes are cached, even with a resource-level default
+    assert resource.methods[1]["cache"] is None
+    assert list(api.cache_stats()) == ["GET /me/"]
+
+
+def test_cached_route_does_not_cache_errors_or_skip_auth(make_event):
+    api = RestApi()
+    resource = ApiResource("/flaky")
+    calls = []
+
+    @resource.get("/", cache=60)
+    def flaky(claims):
+        calls.append(claims)
+        if len(calls) == 1:
+            raise ApiError("Try again", 503)
+        return {"ok": True}
+
+    api.add_resource(resource)
+    handler = api.export()
+
+    assert handler(make_event("/flaky", claims={"sub": "a"}), {})["statusCode"] == 503
+    assert handler(make_event("/flaky", claims={"sub": "a"}), {})["statusCode"] == 200
+    assert handler(make_event("/flaky", claims={"sub": "a"}), {})["statusCode"] == 200
+    assert len(calls) == 2
+
+    # Unauthenticated requests never reach the cache
+    assert handler(make_event("/flaky", claims=None), {})["statusCode"] == 401
+
+
+def test_cached_route_taking_claims_or_query_is_keyed_on_them(make_event, make_api):
+    resource = ApiResource("/me")
+
+    @resource.get("/", cache=60)
+    def me(claims):
+        return {"sub": claims["sub"]}
+
+    @resource.get("/search", cache=60)
+    def search(query):
+        return {"q": query.get("q")}
+
+    handler = make_api(resource).export()
+
+    alice = handler(make_event("/me/", claims={"sub": "alice"}), {})
+    bob = handler(make_event("/me/", claims={"sub": "bob"}), {})
+    assert json.loads(alice["body"]) == {"sub": "alice"}
+    assert json.loads(bob["body"]) == {"sub": "bob"}
+
+    for q in ("ale", "stout"):
+        response = handler(make_event("/me/search", query={"q": q}, claims={"sub": "alice"}), {})
+        assert json.loads(response["body"]) == {"q": q}
+
+
+def test_cached_route_is_keyed_on_claims_of_request_scoped_dependencies(make_event, make_api):
+    resource = ApiResource("/me")
+
+    @resource.get("/", cache=60)
+    def me(current_user):
+        return {"user": current_user}
+
+    @resource.get("/beers", cache=60)
+    def list_beers(table):
+        return {"beers": table}
+
+    api = make_api(resource)
+
+    @api.dependency(scope=REQUEST)
+    def current_user(claims):
+        return claims["sub"]
+
+    @api.dependency()
+    def table():
+        return ["Heady"]
+
+    handler = api.export()
+    alice = handler(make_event("/me/", claims={"sub": "alice"}), {})
+    bob = handler(make_event("/me/", claims={"sub": "bob"}), {})
+    assert json.loads(alice["body"]) == {"user": "alice"}
+    assert json.loads(bob["body"]) == {"user": "bob"}
+
+    # Container-scoped dependencies do not make the response per-user
+    handler(make_event("/me/beers", claims={"sub": "alice"}), {})
+    handler(make_event("/me/beers", claims={"sub": "bob"}), {})
+    assert api.cache_stats()["GET /me/beers"]["hits"] == 1
+
+
+def test_shared_cache_is_not_changed_by_routes(make_event):
+    cache = ResponseCache(ttl=60, query=["region"])
+    resource = ApiResource("/beers", method_defaults={"cache": cache})
+
+    @resource.get("/", paginate=2)
+    def list_beers():
+        return iter(range(5))
+
+    @resource.get("/:id")
+    def get_beer(params):
+        return {"id": params["id"]}
+
+    assert cache.query_keys == ("region",)
+    paged_key = resource.methods[0]["cache_key"]
+    plain_key = resource.methods[1]["cache_key"]
+    first = make_event("/beers/", query={"region": "eu", "cursor": "a"})
+    second = make_event("/beers/", query={"region": "eu", "cursor": "b"})
+    assert paged_key({}, first) != paged_key({}, second)
+    assert plain_key({"id": "1"}, first) == plain_key({"id": "1"}, second)
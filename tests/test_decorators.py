@@ -255,3 +255,74 @@ def test_api_error_with_custom_status():
     response = error.to_api_response()
     assert response["statusCode"] == 404
     assert json.loads(response["body"]) == {"error": "Resource not found"}
+
+
+def test_auth_chained_conditions_on_different_claims():
+    auth = claim("role").eq("admin").claim("age").gte(18)
+
+    event = {"requestContext": {"authorizer": {"claims": {"role": "admin", "age": 21}}}}
+    assert auth.evaluate(event) is True
+
+    event = {"requestContext": {"authorizer": {"claims": {"role": "user", "age": 21}}}}
+    assert auth.evaluate(event) is False
+
+    event = {"requestContext": {"authorizer": {"claims": {"role": "admin", "age": 16}}}}
+    assert auth.evaluate(event) is False
+
+
+def test_auth_missing_or_incomparable_claims():
+    event = {"requestContext": {"authorizer": {"claims": {"age": "old"}}}}
+
+    assert claim("age").gt(18).evaluate(event) is False
+    assert claim("height").lt(200).evaluate(event) is False
+    assert claim("role").eq("Admin", case_sensitive=False).evaluate(event) is False
+    assert claim("groups").contains("Admins", case_sensitive=False).evaluate(event) is False
+
+
+def test_auth_claim_not_in_collection():
+    auth = claim("role").not_in_collection({"banned", "suspended"})
+
+    event = {"requestContext": {"authorizer": {"claims": {"role": "admin"}}}}
+    assert auth.evaluate(event) is True
+
+    event = {"requestContext": {"authorizer": {"claims": {"role": "banned"}}}}
+    assert auth.evaluate(event) is False
+
+    # Unhashable claim values are never members
+    event = {"requestContext": {"authorizer": {"claims": {"role": ["banned"]}}}}
+    assert auth.evaluate(event) is True
+
+
+def test_auth_compile():
+    assert Auth().compile() is None
+
+    auth = claim("role").eq("admin")
+    predicate = auth.compile()
+    assert predicate({"role": "admin"}) is True
+    assert auth.compile() is predicate
+
+    # Adding a condition invalidates the compiled predicate
+    auth.claim("age").gte(18)
+    assert auth.compile()({"role": "admin"}) is False
+    assert auth.compile()({"role": "admin", "age": 18}) is True
+
+
+def test_route_with_multiple_auth_conditions():
+    resource = ApiResource("/api")
+
+    @resource.get("/admin", auth=[claim("role").eq("admin"), claim("groups").contains("beer")])
+    def admin_route():
+        return {"message": "cheers"}
+
+    method, params = resource.get_matching_route("GET", "/api/admin")
+
+    def call(claims):
+        event = {"httpMethod": "GET", "path": "/api/admin", "body": None, "requestContext": {}}
+        if claims is not None:
+            event["requestContext"] = {"authorizer": {"claims": claims}}
+        return method["handler"](params, event, {})["statusCode"]
+
+    assert call({"role": "admin", "groups": ["beer"]}) == 200
+    assert call({"role": "admin", "groups": ["wine"]}) == 401
+    assert call({"role": "user", "groups": ["beer"]}) == 401
+    assert call(None) == 401
@@ -0,0 +1,283 @@
+import json
+import threading
+
+import pytest
+
+from kegstand.decorators import ApiResource
+from kegstand.dependencies import REQUEST, Dependencies
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_container_dependencies_are_created_once():
+    dependencies = Dependencies()
+    calls = []
+
+    @dependencies.provide()
+    def pool():
+        calls.append("pool")
+        return {"connections": 4}
+
+    assert dependencies.get("pool") is dependencies.get("pool")
+    assert calls == ["pool"]
+    assert dependencies.stats() == {"pool": {"scope": "container", "created": 1, "refreshed": 0}}
+
+
+def test_container_dependencies_are_created_once_across_threads():
+    dependencies = Dependencies()
+    barrier = threading.Barrier(8)
+    created = []
+    dependencies.register("client", lambda: created.append(1) or object())
+
+    def use():
+        barrier.wait()
+        dependencies.get("client")
+
+    threads = [threading.Thread(target=use) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(created) == 1
+
+
+def test_factories_can_depend_on_other_dependencies():
+    dependencies = Dependencies()
+    dependencies.register("endpoint", lambda: "https://db.local")
+    dependencies.register("client", lambda endpoint: {"endpoint": endpoint})
+    assert dependencies.get("client") == {"endpoint": "https://db.local"}
+
+
+def test_dependency_cycles_are_reported():
+    dependencies = Dependencies()
+    dependencies.register("a", lambda b: b)
+    dependencies.register("b", lambda a: a)
+    with pytest.raises(ValueError, match="cycle"):
+        dependencies.get("a")
+
+
+def test_unknown_and_invalid_dependencies():
+    dependencies = Dependencies()
+    with pytest.raises(KeyError):
+        dependencies.get("missing")
+    with pytest.raises(ValueError, match="built-in"):
+        dependencies.register("claims", dict)
+    with pytest.raises(ValueError, match="scope"):
+        dependencies.register("session", dict, scope="invocation")
+    dependencies.register("session", dict, scope=REQUEST)
+    with pytest.raises(ValueError, match="injected"):
+        dependencies.get("session")
+
+
+def test_unhealthy_dependencies_are_refreshed():
+    clock = FakeClock()
+    closed = []
+    healthy = {"value": True}
+    dependencies = Dependencies()
+    connections = iter(range(10))
+    dependencies.register(
+        "connection",
+        lambda: next(connections),
+        health_check=lambda _connection: healthy["value"],
+        check_interval=30,
+        close=closed.append,
+        clock=clock,
+    )
+    assert dependencies.get("connection") == 0
+
+    healthy["value"] = False
+    clock.now = 10
+    # Not checked again until the check interval has passed
+    assert dependencies.get("connection") == 0
+    clock.now = 30
+    assert dependencies.get("connection") == 1
+    assert closed == [0]
+    assert dependencies.stats()["connection"]["refreshed"] == 1
+
+
+def test_failing_health_check_counts_as_unhealthy():
+    clock = FakeClock()
+    dependencies = Dependencies()
+    connections = iter(range(10))
+
+    def health_check(_connection):
+        raise ConnectionError("gone")
+
+    dependencies.register(
+        "connection", lambda: next(connections), health_check=health_check, clock=clock
+    )
+    assert dependencies.get("connection") == 0
+    clock.now = 60
+    assert dependencies.get("connection") == 1
+
+
+def test_max_age_and_refresh():
+    clock = FakeClock()
+    dependencies = Dependencies()
+    credentials = iter(range(10))
+    dependencies.register("credentials", lambda: next(credentials), max_age=900, clock=clock)
+    assert dependencies.get("credentials") == 0
+    clock.now = 899
+    assert dependencies.get("credentials") == 0
+    clock.now = 900
+    assert dependencies.get("credentials") == 1
+
+    dependencies.refresh("credentials")
+    assert dependencies.get("credentials") == 2
+    dependencies.refresh()
+    assert dependencies.get("credentials") == 3
+
+
+@pytest.fixture
+def beer_api(make_api):
+    created = []
+    resource = ApiResource("/beers")
+    api = make_api(resource)
+
+    @api.dependency()
+    def table():
+        created.append("table")
+        return {"1": "Heady Topper", "2": "Pliny"}
+
+    @api.dependency(scope=REQUEST)
+    def session(table, claims):
+        created.append("session")
+        return {"user": claims["sub"], "tables": len(table)}
+
+    @resource.dependency()
+    def greeting():
+        return "Cheers"
+
+    @resource.get("/:id")
+    def get_beer(params, table, session, greeting, missing="default"):
+        return {
+            "name": table[params["id"]],
+            "session": session,
+            "greeting": greeting,
+            "missing": missing,
+        }
+
+    @resource.get("/:id/etag", etag=lambda params, session: f"{params['id']}-{session['user']}")
+    def get_beer_with_etag(params, session):
+        return {"id": params["id"], "user": session["user"]}
+
+    return api, created
+
+
+def test_dependencies_are_injected_by_name(make_event, beer_api):
+    api, created = beer_api
+    handler = api.export()
+    for _ in range(3):
+        response = handler(make_event(), {})
+        assert json.loads(response["body"]) == {
+            "name": "Heady Topper",
+            "session": {"user": "user123", "tables": 2},
+            "greeting": "Cheers",
+            "missing": "default",
+        }
+    # The table is created once for the container, the session once per request
+    assert created == ["table", "session", "session", "session"]
+
+
+def test_request_scoped_dependencies_are_shared_within_a_request(make_event, beer_api):
+    api, created = beer_api
+    response = api.export()(make_event("/beers/1/etag"), {})
+    assert response["statusCode"] == 200
+    assert response["headers"]["ETag"]
+    # Used by both the version key and the handler
+    assert created.count("session") == 1
+
+
+def test_dependencies_are_not_created_for_unauthorized_requests(make_event, beer_api):
+    api, created = beer_api
+    assert api.export()(make_event(claims=None), {})["statusCode"] == 401
+    assert created == []
+
+
+def test_missing_dependency_raises(make_event):
+    resource = ApiResource("/beers")
+
+    @resource.get("/")
+    def list_beers(table):
+        return table
+
+    method, params = resource.get_matching_route("GET", "/beers/")
+    with pytest.raises(TypeError, match="table"):
+        method["handler"](params, make_event("/beers/"), {})
+
+
+def test_missing_dependencies_fail_the_export(make_api):
+    resource = ApiResource("/beers")
+
+    @resource.get("/")
+    def list_beers(tabel):
+        return tabel
+
+    with pytest.raises(TypeError, match="GET /beers/: No dependency named 'tabel'"):
+        make_api(resource).export()
+
+    # Including the arguments of request-scoped dependencies
+    resource = ApiResource("/beers")
+
+    @resource.dependency(scope=REQUEST)
+    def session(conection):
+        return conection
+
+    @resource.get("/")
+    def list_session_beers(session):
+        return session
+
+    with pytest.raises(TypeError, match="'conection'"):
+        make_api(resource).export()
+
+    # Arguments with a default value are optional
+    resource = ApiResource("/beers")
+
+    @resource.get("/")
+    def list_default_beers(table=None):
+        return table
+
+    assert make_api(resource).export() is not None
+
+
+def test_request_scoped_dependencies_are_closed_after_the_handler(make_event, make_api):
+    events = []
+    resource = ApiResource("/beers")
+    api = make_api(resource)
+
+    @api.dependency(scope=REQUEST, close=lambda session: events.append(f"close {session}"))
+    def session(params):
+        events.append(f"open {params['id']}")
+        return f"session {params['id']}"
+
+    @api.dependency(scope=REQUEST, close=lambda unit: events.append(f"close {unit}"))
+    def unit_of_work(session):
+        return f"unit of {session}"
+
+    @resource.get("/:id")
+    def get_beer(params, unit_of_work):
+        events.append("handler")
+        if params["id"] == "2":
+            raise RuntimeError("boom")
+        return {"unit": unit_of_work}
+
+    handler = api.export()
+    handler(make_event("/beers/1"), {})
+    assert events == [
+        "open 1",
+        "handler",
+        "close unit of session 1",
+        "close session 1",
+    ]
+    with pytest.raises(RuntimeError):
+        handler(make_event("/beers/2"), {})
+    assert events[-1] == "close session 2"
+    handler(make_event("/beers/3"), {})
+    assert events.count("handler") == 3
+    assert len([event for event in events if event.startswith("close session")]) == 3
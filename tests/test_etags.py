@@ -0,0 +1,119 @@
+import json
+
+import pytest
+
+from kegstand.decorators import ApiResource, claim
+from kegstand.etags import compute_etag, etag_matches, version_etag
+from kegstand.response_compression import ResponseCompression
+
+LARGE_BODY = {"beers": [{"name": f"Beer {n}", "style": "ipa"} for n in range(200)]}
+
+
+ADMIN = {"sub": "user123", "role": "admin"}
+
+
+def test_compute_etag_is_strong_and_stable():
+    etag = compute_etag('{"name": "Heady"}')
+    assert etag.startswith('"') and etag.endswith('"')
+    assert etag == compute_etag(b'{"name": "Heady"}')
+    assert etag != compute_etag('{"name": "Focal Banger"}')
+    assert version_etag(3) != version_etag(4)
+
+
+def test_etag_matches():
+    etag = '"abc"'
+    assert etag_matches('"abc"', etag)
+    assert etag_matches('"xyz", W/"abc"', etag)
+    assert etag_matches('"abc-gzip"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"xyz"', etag)
+    assert not etag_matches(None, etag)
+
+
+@pytest.fixture
+def beer_handler(make_api):
+    def build(calls, compression=None, **route_options):
+        resource = ApiResource("/beers")
+
+        @resource.get("/:id", auth=claim("role").eq("admin"), **route_options)
+        def get_beer(params):
+            calls.append(params["id"])
+            return {"id": params["id"], **LARGE_BODY}
+
+        @resource.post("/:id", etag=True)
+        def update_beer(params):
+            return {"id": params["id"]}
+
+        return make_api(resource, compression=compression).export()
+
+    return build
+
+
+def test_etags_are_disabled_by_default(make_event, beer_handler):
+    response = beer_handler([])(make_event(claims=ADMIN), {})
+    assert "ETag" not in response["headers"]
+
+
+def test_body_etag_and_304(make_event, beer_handler):
+    calls: list[str] = []
+    handler = beer_handler(calls, etag=True)
+    response = handler(make_event(claims=ADMIN), {})
+    etag = response["headers"]["ETag"]
+    assert etag == compute_etag(response["body"])
+
+    not_modified = handler(make_event(headers={"If-None-Match": etag}, claims=ADMIN), {})
+    assert not_modified == {"statusCode": 304, "headers": {"ETag": etag}, "body": ""}
+    assert (
+        handler(make_event(headers={"If-None-Match": '"stale"'}, claims=ADMIN), {})["statusCode"]
+        == 200
+    )
+    # Without a version key, the handler runs to compute the ETag
+    assert calls == ["1", "1", "1"]
+
+
+def test_version_key_skips_the_handler(make_event, beer_handler):
+    calls: list[str] = []
+    versions = {"1": 7}
+    handler = beer_handler(calls, etag=lambda params: versions[params["id"]])
+
+    etag = handler(make_event(claims=ADMIN), {})["headers"]["ETag"]
+    assert etag == version_etag(7)
+    assert (
+        handler(make_event(headers={"If-None-Match": etag}, claims=ADMIN), {})["statusCode"] == 304
+    )
+    assert calls == ["1"]
+
+    versions["1"] = 8
+    response = handler(make_event(headers={"If-None-Match": etag}, claims=ADMIN), {})
+    assert response["statusCode"] == 200
+    assert response["headers"]["ETag"] == version_etag(8)
+    assert calls == ["1", "1"]
+
+
+def test_version_key_is_checked_after_auth(make_event, beer_handler):
+    calls: list[str] = []
+    handler = beer_handler(calls, etag=lambda: 7)
+    response = handler(
+        make_event(headers={"If-None-Match": version_etag(7)}, claims={**ADMIN, "role": "user"}), {}
+    )
+    assert response["statusCode"] == 401
+    assert json.loads(response["body"]) == {"error": "Unauthorized"}
+
+
+def test_etags_only_apply_to_get_routes(make_event, beer_handler):
+    event = make_event(method="POST", claims=ADMIN)
+    assert "ETag" not in beer_handler([])(event, {})["headers"]
+
+
+def test_etags_with_compression(make_event, beer_handler):
+    handler = beer_handler([], compression=ResponseCompression(encodings=("gzip",)), etag=True)
+    response = handler(make_event(headers={"Accept-Encoding": "gzip"}, claims=ADMIN), {})
+    etag = response["headers"]["ETag"]
+    assert etag.endswith('-gzip"')
+
+    # A 304 for the compressed representation is bodyless and not compressed
+    not_modified = handler(
+        make_event(headers={"If-None-Match": etag, "Accept-Encoding": "gzip"}, claims=ADMIN), {}
+    )
+    assert not_modified["statusCode"] == 304
+    assert not_modified["headers"]["ETag"] == etag
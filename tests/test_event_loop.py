@@ -0,0 +1,92 @@
+import asyncio
+import json
+import threading
+import time
+
+from kegstand.api import RestApi
+from kegstand.decorators import ApiResource
+from kegstand.errors import ApiError
+from kegstand.event_loop import get_event_loop, run_coroutine
+
+
+def test_event_loop_is_reused_per_thread():
+    loop = get_event_loop()
+    assert get_event_loop() is loop
+
+    other_loops = []
+    thread = threading.Thread(target=lambda: other_loops.append(get_event_loop()))
+    thread.start()
+    thread.join()
+    assert other_loops[0] is not loop
+
+
+def test_event_loop_is_recreated_when_closed():
+    loop = get_event_loop()
+    loop.close()
+    assert get_event_loop() is not loop
+
+
+def test_run_coroutine():
+    async def add(a, b):
+        await asyncio.sleep(0)
+        return a + b
+
+    assert run_coroutine(add(1, 2)) == 3
+
+
+def test_async_handlers(make_event):
+    api = RestApi()
+    resource = ApiResource("/orders")
+    loops = []
+
+    @resource.post("/:id")
+    async def update_order(params, query, data, claims):
+        loops.append(asyncio.get_running_loop())
+        return {"id": params["id"], "query": query, "data": data, "user": claims["sub"]}
+
+    @resource.get("/:id")
+    async def get_order(params):
+        raise ApiError(f"Order {params['id']} not found", 404)
+
+    api.add_resource(resource)
+    handler = api.export()
+
+    for _ in range(2):
+        response = handler(
+            make_event("/orders/1", method="POST", body='{"qty": 2}', query={"v": "1"}), {}
+        )
+        assert response["statusCode"] == 200
+        assert json.loads(response["body"]) == {
+            "id": "1",
+            "query": {"v": "1"},
+            "data": {"qty": 2},
+            "user": "user123",
+        }
+
+    # The same loop is reused across invocations
+    assert loops[0] is loops[1]
+
+    response = handler(make_event("/orders/2"), {})
+    assert response["statusCode"] == 404
+    assert json.loads(response["body"]) == {"error": "Order 2 not found"}
+
+
+def test_async_handler_runs_io_concurrently(make_event):
+    api = RestApi()
+    resource = ApiResource("/dashboard")
+
+    @resource.get("/")
+    async def dashboard():
+        async def fetch(name):
+            await asyncio.sleep(0.05)
+            return name
+
+        return await asyncio.gather(fetch("orders"), fetch("users"), fetch("kegs"))
+
+    api.add_resource(resource, is_public=True)
+    handler = api.export()
+
+    start = time.monotonic()
+    response = handler(make_event("/dashboard"), {})
+    assert time.monotonic() - start < 0.14
+    assert json.loads(response["body"]) == ["orders", "users", "kegs"]
@@ -0,0 +1,62 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+SRC_DIR = str(Path(__file__).parent.parent / "src")
+
+# Generous, so that the test only catches heavy dependencies creeping back into the
+# import path rather than failing on a slow machine
+IMPORT_BUDGET_SECONDS = 0.5
+
+DEFERRED_MODULES = (
+    "aws_lambda_powertools",
+    "asyncio",
+    "concurrent.futures",
+    "argparse",
+    "inspect",
+    "cProfile",
+    "tracemalloc",
+)
+
+
+def run_in_fresh_interpreter(code: str):
+    result = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", code],
+        capture_output=True,
+        check=True,
+        env={**os.environ, "PYTHONPATH": SRC_DIR},
+        text=True,
+    )
+    return json.loads(result.stdout)
+
+
+def test_import_defers_heavy_dependencies():
+    loaded = run_in_fresh_interpreter(
+        "import json, sys\n"
+        "from kegstand import ApiError, ApiResource, Auth, RestApi, claim\n"
+        f"print(json.dumps([name for name in {DEFERRED_MODULES!r} if name in sys.modules]))"
+    )
+    assert loaded == []
+
+
+def test_import_time_budget():
+    elapsed = run_in_fresh_interpreter(
+        "import json, time\n"
+        "start = time.perf_counter()\n"
+        "from kegstand import ApiResource, RestApi\n"
+        "print(json.dumps(time.perf_counter() - start))"
+    )
+    assert elapsed < IMPORT_BUDGET_SECONDS
+
+
+def test_lazy_attributes():
+    from aws_lambda_powertools import Logger
+
+    import kegstand
+    from kegstand.api import RestApi
+
+    assert kegstand.RestApi is RestApi
+    assert kegstand.Logger is Logger
+    assert "ApiResource" in dir(kegstand)
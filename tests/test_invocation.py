@@ -0,0 +1,105 @@
+import inspect
+from unittest.mock import patch
+
+import pytest
+
+from kegstand.decorators import ApiResource
+from kegstand.errors import ApiError
+from kegstand.invocation import INJECTORS, InvocationPlan, register_injector
+
+ITEM_REQUEST = {
+    "path": "/api/items",
+    "method": "POST",
+    "body": '{"name": "keg"}',
+    "query": {"q": "ipa"},
+}
+
+
+def test_plan_only_injects_accepted_arguments(make_event):
+    def handler(params, data):
+        return {"params": params, "data": data}
+
+    plan = InvocationPlan(handler)
+    assert [name for name, _ in plan.injectors] == ["params", "data"]
+    assert plan.invoke({"id": "1"}, make_event(**ITEM_REQUEST), {}) == {
+        "params": {"id": "1"},
+        "data": {"name": "keg"},
+    }
+
+
+def test_plan_injects_all_arguments(make_event):
+    def handler(params, query, data, claims):
+        return (params, query, data, claims)
+
+    result = InvocationPlan(handler).invoke({}, make_event(**ITEM_REQUEST), {})
+    assert result == ({}, {"q": "ipa"}, {"name": "keg"}, {"sub": "user123"})
+
+
+def test_plan_without_arguments(make_event):
+    def handler():
+        return "ok"
+
+    plan = InvocationPlan(handler)
+    assert plan.injectors == []
+    assert plan.invoke({"id": "1"}, make_event(**ITEM_REQUEST), {}) == "ok"
+
+
+def test_plan_missing_query_and_body(make_event):
+    def handler(query, data):
+        return (query, data)
+
+    event = make_event(**ITEM_REQUEST | {"body": None, "query": None})
+    assert InvocationPlan(handler).invoke({}, event, {}) == ({}, {})
+
+
+def test_plan_invalid_json_raises_api_error(make_event):
+    def handler(data):
+        return data
+
+    with pytest.raises(ApiError) as excinfo:
+        InvocationPlan(handler).invoke({}, make_event(**ITEM_REQUEST | {"body": "not json"}), {})
+    assert excinfo.value.status_code == 400
+
+
+def test_plan_missing_claims_raises_api_error(make_event):
+    def handler(claims):
+        return claims
+
+    with pytest.raises(ApiError) as excinfo:
+        InvocationPlan(handler).invoke({}, make_event(**ITEM_REQUEST, claims=None), {})
+    assert excinfo.value.status_code == 401
+
+
+def test_signature_is_inspected_once_per_route(make_event):
+    resource = ApiResource("/api")
+
+    with patch("inspect.signature", wraps=inspect.signature) as sig:
+
+        @resource.post("/items")
+        def create_item(data, claims):
+            return {"data": data, "user": claims["sub"]}
+
+        method, params = resource.get_matching_route("POST", "/api/items")
+        for _ in range(3):
+            response = method["handler"](params, make_event(**ITEM_REQUEST), {})
+            assert response["statusCode"] == 200
+
+    assert sig.call_count == 1
+
+
+def test_register_injector(make_event):
+    def request_id_injector(_resource, _options):
+        return lambda _params, event, _context: event["requestContext"]["requestId"]
+
+    register_injector("request_id", request_id_injector)
+    try:
+
+        def handler(request_id):
+            return request_id
+
+        assert (
+            InvocationPlan(handler).invoke({}, make_event(**ITEM_REQUEST, request_id="abc"), {})
+            == "abc"
+        )
+    finally:
+        del INJECTORS["request_id"]
@@ -0,0 +1,128 @@
+import dataclasses
+import datetime
+import json
+from decimal import Decimal
+from uuid import UUID
+
+import pytest
+
+from kegstand.api import RestApi
+from kegstand.decorators import ApiResource
+from kegstand.json_codec import OrjsonCodec, StdlibJsonCodec, default_codec, orjson
+from kegstand.utils import api_response
+
+CODECS: list[type] = [StdlibJsonCodec]
+if orjson is not None:
+    CODECS.append(OrjsonCodec)
+
+
+@dataclasses.dataclass
+class Keg:
+    name: str
+    litres: int
+
+
+@pytest.mark.parametrize("codec_class", CODECS)
+def test_codec_round_trip(codec_class):
+    codec = codec_class()
+    body = {"name": "keg", "items": [1, 2.5, None, True]}
+    assert codec.loads(codec.dumps(body)) == body
+    assert codec.loads(b'{"a": 1}') == {"a": 1}
+
+
+@pytest.mark.parametrize("codec_class", CODECS)
+def test_codec_extended_types(codec_class):
+    codec = codec_class()
+    body = {
+        "count": Decimal("3"),
+        "price": Decimal("2.50"),
+        "tags": {"ipa"},
+        "tapped_at": datetime.datetime(2024, 1, 2, 3, 4, 5),
+        "brewed_on": datetime.date(2023, 12, 24),
+        "id": UUID("12345678-1234-5678-1234-567812345678"),
+        "keg": Keg("Tap 1", 50),
+    }
+    assert json.loads(codec.dumps(body)) == {
+        "count": 3,
+        "price": 2.5,
+        "tags": ["ipa"],
+        "tapped_at": "2024-01-02T03:04:05",
+        "brewed_on": "2023-12-24",
+        "id": "12345678-1234-5678-1234-567812345678",
+        "keg": {"name": "Tap 1", "litres": 50},
+    }
+
+
+@pytest.mark.parametrize("codec_class", CODECS)
+def test_codec_large_and_non_finite_numbers(codec_class):
+    codec = codec_class()
+    body = {"big": 2**70, "total": Decimal("1e30"), "negative": -(2**64)}
+    assert json.loads(codec.dumps(body)) == {"big": 2**70, "total": 10**30, "negative": -(2**64)}
+    for number in (Decimal("Infinity"), Decimal("-Infinity"), Decimal("NaN")):
+        # Encoded as a float: Infinity/NaN with the stdlib, null with orjson
+        codec.dumps({"number": number})
+
+
+@pytest.mark.parametrize("codec_class", CODECS)
+def test_codec_errors(codec_class):
+    codec = codec_class()
+    with pytest.raises(TypeError):
+        codec.dumps({"unsupported": object()})
+    with pytest.raises(ValueError):
+        codec.loads("invalid json")
+
+
+def test_default_codec():
+    expected = OrjsonCodec if orjson is not None else StdlibJsonCodec
+    assert isinstance(default_codec(), expected)
+
+
+def test_api_response_with_codec():
+    response = api_response({"price": Decimal("1.5")}, codec=StdlibJsonCodec())
+    assert response["body"] == '{"price": 1.5}'
+
+
+def test_rest_api_codec_is_inherited_by_resources():
+    codec = StdlibJsonCodec()
+    api = RestApi(codec=codec)
+    inherits = ApiResource("/inherits")
+    own_codec = ApiResource("/own", codec=default_codec())
+
+    api.add_resource(inherits)
+    api.add_resource(own_codec)
+
+    assert inherits.codec is codec
+    assert own_codec.codec is not codec
+
+
+def test_request_body_is_only_decoded_when_needed():
+    class CountingCodec(StdlibJsonCodec):
+        loads_calls = 0
+
+        def loads(self, data):
+            self.loads_calls += 1
+            return super().loads(data)
+
+    codec = CountingCodec()
+    api = RestApi(codec=codec)
+    resource = ApiResource("/kegs")
+
+    @resource.delete("/:id")
+    def delete_keg(params):
+        return {"deleted": params["id"]}
+
+    @resource.put("/:id")
+    def update_keg(params, data):
+        return {"updated": params["id"], "with": data}
+
+    api.add_resource(resource, is_public=True)
+    handler = api.export()
+
+    event = {"httpMethod": "DELETE", "path": "/kegs/1", "body": "not json", "requestContext": {}}
+    assert handler(event, {})["statusCode"] == 200
+    assert codec.loads_calls == 0
+
+    event = {"httpMethod": "PUT", "path": "/kegs/1", "body": '{"a": 1}', "requestContext": {}}
+    response = handler(event, {})
+    assert response["body"] == '{"updated": "1", "with": {"a": 1}}'
+    assert codec.loads_calls == 1
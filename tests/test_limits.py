@@ -0,0 +1,206 @@
+import json
+import threading
+
+import pytest
+
+from kegstand.decorators import ApiResource
+from kegstand.errors import TooManyRequestsError
+from kegstand.limits import RouteLimit, make_route_limit
+from kegstand.streaming import LocalResponseStream
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket():
+    clock = FakeClock()
+    limit = RouteLimit(rate=2, per=1, burst=3, clock=clock)
+    for _ in range(3):
+        limit.acquire("GET /beers")
+    with pytest.raises(TooManyRequestsError) as excinfo:
+        limit.acquire("GET /beers")
+    assert excinfo.value.retry_after == pytest.approx(0.5)
+
+    clock.now = 0.5
+    limit.acquire("GET /beers")
+    with pytest.raises(TooManyRequestsError):
+        limit.acquire("GET /beers")
+    # Other routes have their own bucket
+    limit.acquire("GET /other")
+    assert limit.stats() == {"allowed": 5, "limited": 2, "in_flight": 0, "keys": 2}
+
+
+def test_buckets_are_bounded():
+    limit = RouteLimit(rate=1, max_keys=2, clock=FakeClock())
+    for key in ("a", "b", "c"):
+        limit.acquire(key)
+    assert list(limit._buckets) == ["b", "c"]
+
+
+def test_concurrency_limit():
+    limit = RouteLimit(concurrency=2, retry_after=3)
+    limit.acquire("key")
+    limit.acquire("key")
+    with pytest.raises(TooManyRequestsError) as excinfo:
+        limit.acquire("key")
+    assert excinfo.value.retry_after == 3
+    limit.release("key")
+    limit.acquire("key")
+    limit.release("key")
+    limit.release("key")
+    assert limit.stats()["in_flight"] == 0
+    assert limit._in_flight == {}
+
+
+def test_run_releases_on_error(make_event):
+    limit = RouteLimit(concurrency=1)
+
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        limit.run("GET /beers", make_event(), fail)
+    assert limit.run("GET /beers", make_event(), lambda: "ok") == "ok"
+
+
+def test_run_holds_concurrency_for_lazy_results(make_event):
+    limit = RouteLimit(concurrency=1)
+
+    def rows():
+        for index in range(3):
+            yield (index, limit.stats()["in_flight"])
+
+    assert list(limit.run("GET /beers", make_event(), rows)) == [(0, 1), (1, 1), (2, 1)]
+    assert limit.stats()["in_flight"] == 0
+
+    # Results that are not consumed to the end release the slot when closed
+    result = limit.run("GET /beers", make_event(), rows)
+    next(result)
+    with pytest.raises(TooManyRequestsError):
+        limit.run("GET /beers", make_event(), rows)
+    result.close()
+    assert limit.stats()["in_flight"] == 0
+
+
+def test_limits_per_claim(make_event):
+    limit = RouteLimit(rate=1, claims=["tenant"], clock=FakeClock())
+    limit.run("GET /beers", make_event(claims={"sub": "user123", "tenant": "acme"}), lambda: None)
+    limit.run("GET /beers", make_event(claims={"sub": "user123", "tenant": "globex"}), lambda: None)
+    with pytest.raises(TooManyRequestsError):
+        limit.run(
+            "GET /beers", make_event(claims={"sub": "user123", "tenant": "acme"}), lambda: None
+        )
+
+
+def test_make_route_limit():
+    assert make_route_limit(None) is None
+    assert make_route_limit(False) is None
+    assert make_route_limit(5).rate == 5
+    assert make_route_limit({"concurrency": 2}).concurrency == 2
+    limit = RouteLimit(rate=1)
+    assert make_route_limit(limit) is limit
+    with pytest.raises(ValueError, match="rate or a concurrency"):
+        RouteLimit()
+    for options in ({"rate": 0}, {"rate": -1}, {"rate": 5, "per": 0}, {"concurrency": 0}):
+        with pytest.raises(ValueError, match="must be"):
+            RouteLimit(**options)
+
+
+def test_too_many_requests_response():
+    response = TooManyRequestsError(0.2).to_api_response()
+    assert response["statusCode"] == 429
+    assert response["headers"]["Retry-After"] == "1"
+    assert json.loads(response["body"]) == {"error": "Too many requests"}
+    assert TooManyRequestsError(2.5).to_api_response()["headers"]["Retry-After"] == "3"
+
+
+def test_route_limits(make_event, make_api):
+    clock = FakeClock()
+    resource = ApiResource(
+        "/beers", method_defaults={"limit": RouteLimit(rate=1, burst=2, clock=clock)}
+    )
+
+    @resource.get("/:id")
+    def get_beer(params):
+        return {"id": params["id"]}
+
+    @resource.get("/")
+    def list_beers():
+        return []
+
+    @resource.get("/cached/:id", cache=60)
+    def get_cached_beer(params):
+        return {"id": params["id"]}
+
+    api = make_api(resource)
+    handler = api.export()
+
+    assert handler(make_event(), {})["statusCode"] == 200
+    assert handler(make_event(), {})["statusCode"] == 200
+    response = handler(make_event(), {})
+    assert response["statusCode"] == 429
+    assert response["headers"]["Retry-After"] == "1"
+    # The shared limit still applies per route
+    assert handler(make_event("/beers/"), {})["statusCode"] == 200
+    # Cache hits do not count against the limit
+    for _ in range(5):
+        assert handler(make_event("/beers/cached/1"), {})["statusCode"] == 200
+    assert api.limit_stats()["GET /beers/:id"]["limited"] == 1
+
+    clock.now = 1
+    assert handler(make_event(), {})["statusCode"] == 200
+
+
+def test_route_concurrency_limit(make_event, make_api):
+    started = threading.Event()
+    release = threading.Event()
+    resource = ApiResource("/beers")
+
+    @resource.get("/:id", limit={"concurrency": 1})
+    def get_beer(params):
+        started.set()
+        release.wait(5)
+        return {"id": params["id"]}
+
+    api = make_api(resource)
+    handler = api.export()
+
+    responses = []
+    thread = threading.Thread(target=lambda: responses.append(handler(make_event(), {})))
+    thread.start()
+    assert started.wait(5)
+    try:
+        assert handler(make_event(), {})["statusCode"] == 429
+    finally:
+        release.set()
+        thread.join()
+    assert responses[0]["statusCode"] == 200
+    assert handler(make_event(), {})["statusCode"] == 200
+
+
+def test_route_concurrency_limit_covers_streamed_results(make_event, make_api):
+    resource = ApiResource("/beers")
+    in_flight = []
+
+    @resource.get("/", limit={"concurrency": 1})
+    def list_beers():
+        for index in range(3):
+            in_flight.append(api.limit_stats()["GET /beers/"]["in_flight"])
+            yield {"id": index}
+
+    api = make_api(resource)
+    assert json.loads(api.export()(make_event("/beers/"), {})["body"]) == [
+        {"id": 0},
+        {"id": 1},
+        {"id": 2},
+    ]
+    stream = LocalResponseStream()
+    api.export(stream=True)(make_event("/beers/"), stream, {})
+    assert stream.status_code == 200
+    assert in_flight == [1] * 6
+    assert api.limit_stats()["GET /beers/"]["in_flight"] == 0
@@ -0,0 +1,203 @@
+import asyncio
+import base64
+import io
+import json
+import threading
+import urllib.request
+from wsgiref.util import setup_testing_defaults
+
+import pytest
+
+from kegstand.api import RestApi
+from kegstand.decorators import ApiResource
+from kegstand.local_server import (
+    AsgiAdapter,
+    LocalContext,
+    WsgiAdapter,
+    build_event,
+    claims_from_header,
+    make_claims_source,
+    make_server,
+)
+
+
+@pytest.fixture
+def beer_api(make_api):
+    resource = ApiResource("/beers")
+
+    @resource.get("/:id")
+    def get_beer(params, query, claims):
+        return {"id": params["id"], "style": query.get("style"), "user": claims["sub"]}
+
+    @resource.post("/")
+    def create_beer(data):
+        return data
+
+    return make_api(resource)
+
+
+def wsgi_request(app, method="GET", path="/beers/1", query="", body=b"", headers=None):  # noqa: PLR0913
+    environ: dict = {
+        "REQUEST_METHOD": method,
+        "PATH_INFO": path,
+        "QUERY_STRING": query,
+        "wsgi.input": io.BytesIO(body),
+    }
+    if body:
+        environ["CONTENT_LENGTH"] = str(len(body))
+        environ["CONTENT_TYPE"] = "application/json"
+    for name, value in (headers or {}).items():
+        environ[f"HTTP_{name.upper().replace('-', '_')}"] = value
+    setup_testing_defaults(environ)
+
+    started = {}
+
+    def start_response(status, response_headers):
+        started["status"] = status
+        started["headers"] = dict(response_headers)
+
+    body_parts = app(environ, start_response)
+    return started["status"], started["headers"], b"".join(body_parts)
+
+
+def test_build_event():
+    event = build_event(
+        "GET",
+        "/beers/1",
+        "style=ipa&tag=a&tag=b",
+        [("Accept", "text/html"), ("Accept", "application/json")],
+        b"\xff\x00",
+        make_claims_source({"sub": "user123"}),
+    )
+    assert event["httpMethod"] == "GET"
+    assert event["queryStringParameters"] == {"style": "ipa", "tag": "b"}
+    assert event["multiValueQueryStringParameters"]["tag"] == ["a", "b"]
+    assert event["multiValueHeaders"] == {"Accept": ["text/html", "application/json"]}
+    assert event["requestContext"]["authorizer"] == {"claims": {"sub": "user123"}}
+    # Bodies that are not text are base64-encoded, as API Gateway does for binary types
+    assert event["isBase64Encoded"] is True
+    assert base64.b64decode(event["body"]) == b"\xff\x00"
+
+
+def test_claims_sources():
+    assert make_claims_source(None)({}) is None
+    assert make_claims_source({"sub": "a"})({}) == {"sub": "a"}
+    assert make_claims_source(lambda headers: {"sub": headers["X-User"]})({"X-User": "b"}) == {
+        "sub": "b"
+    }
+    from_header = claims_from_header()
+    assert from_header({"X-Kegstand-Claims": '{"sub": "c"}'}) == {"sub": "c"}
+    assert from_header({}) is None
+
+
+def test_local_context():
+    context = LocalContext(timeout=1)
+    assert 0 < context.get_remaining_time_in_millis() <= 1000
+    assert context.aws_request_id != LocalContext().aws_request_id
+
+
+def test_wsgi_adapter(beer_api):
+    app = WsgiAdapter(beer_api, claims={"sub": "user123"})
+    status, headers, body = wsgi_request(app, query="style=ipa")
+    assert status == "200 OK"
+    assert headers["Content-Type"] == "application/json"
+    assert json.loads(body) == {"id": "1", "style": "ipa", "user": "user123"}
+
+    status, _, body = wsgi_request(app, method="POST", path="/beers/", body=b'{"name": "Heady"}')
+    assert status == "200 OK"
+    assert json.loads(body) == {"name": "Heady"}
+
+
+def test_wsgi_adapter_without_claims(beer_api):
+    app = WsgiAdapter(beer_api)
+    status, _, _ = wsgi_request(app)
+    assert status == "401 Unauthorized"
+
+    app = WsgiAdapter(beer_api, claims=claims_from_header())
+    status, _, body = wsgi_request(app, headers={"X-Kegstand-Claims": '{"sub": "user456"}'})
+    assert status == "200 OK"
+    assert json.loads(body)["user"] == "user456"
+
+
+def test_wsgi_adapter_decodes_base64_bodies():
+    def handler(_event, _context):
+        body = base64.b64encode(b"\x1f\x8b").decode()
+        return {"statusCode": 200, "headers": {}, "body": body, "isBase64Encoded": True}
+
+    _, _, body = wsgi_request(WsgiAdapter(handler))
+    assert body == b"\x1f\x8b"
+
+
+def test_asgi_adapter(beer_api):
+    app = AsgiAdapter(beer_api, claims={"sub": "user123"})
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/beers/1",
+        "query_string": b"style=ipa",
+        "headers": [(b"accept", b"application/json")],
+    }
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    assert sent[0]["status"] == 200
+    assert (b"content-type", b"application/json") in sent[0]["headers"]
+    assert json.loads(sent[1]["body"]) == {"id": "1", "style": "ipa", "user": "user123"}
+
+
+def test_asgi_lifespan(beer_api):
+    messages = iter([{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}])
+    sent = []
+
+    async def receive():
+        return next(messages)
+
+    async def send(message):
+        sent.append(message["type"])
+
+    asyncio.run(AsgiAdapter(beer_api)({"type": "lifespan"}, receive, send))
+    assert sent == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+
+
+def test_async_routes_reuse_the_workers_event_loops():
+    loops = set()
+    resource = ApiResource("/loops")
+
+    @resource.get("/")
+    async def current_loop():
+        loops.add(id(asyncio.get_running_loop()))
+        return {}
+
+    api = RestApi(request_logging=False)
+    api.add_resource(resource)
+    server = make_server(api, port=0, claims={"sub": "user123"}, workers=2)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = f"http://127.0.0.1:{server.server_port}/loops/"
+        for _ in range(10):
+            with urllib.request.urlopen(url, timeout=5) as response:  # noqa: S310
+                assert response.status == 200
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert 1 <= len(loops) <= 2
+
+
+def test_threaded_server(beer_api):
+    server = make_server(beer_api, port=0, claims={"sub": "user123"})
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        url = f"http://127.0.0.1:{server.server_port}/beers/7?style=stout"
+        with urllib.request.urlopen(url, timeout=5) as response:  # noqa: S310
+            assert json.loads(response.read()) == {"id": "7", "style": "stout", "user": "user123"}
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,28 @@
+import logging
+
+from aws_lambda_powertools import Logger
+
+from kegstand import log
+
+
+def test_logger_is_created_on_first_use(monkeypatch):
+    monkeypatch.setattr(log, "_use_builtin", False)
+    lazy_logger = log.get_logger()
+    assert lazy_logger._logger is None
+
+    lazy_logger.info("Hello")
+    assert isinstance(lazy_logger._logger, Logger)
+
+
+def test_builtin_logger(monkeypatch, caplog):
+    monkeypatch.setattr(log, "_use_builtin", False)
+    log.use_builtin_logger()
+    lazy_logger = log.get_logger("kegstand.test_builtin")
+
+    with caplog.at_level(logging.INFO, logger="kegstand.test_builtin"):
+        lazy_logger.info("Hello", extra={"route": "GET /beers"})
+        assert lazy_logger.isEnabledFor(logging.INFO)
+
+    assert isinstance(lazy_logger._logger, logging.Logger)
+    assert caplog.records[0].getMessage() == "Hello"
+    assert caplog.records[0].route == "GET /beers"
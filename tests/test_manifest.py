@@ -0,0 +1,181 @@
+import json
+import os
+import sys
+import tempfile
+
+import pytest
+
+from kegstand.api import RestApi
+from kegstand.manifest import (
+    MANIFEST_FILENAME,
+    build_manifest,
+    load_manifest,
+    main,
+    write_manifest,
+)
+
+USERS_MODULE = """
+from kegstand import ApiResource
+
+api = ApiResource("/users")
+
+
+@api.get("/:id")
+def get_user(params):
+    return {"id": params["id"]}
+
+
+@api.post("/")
+def create_user(data):
+    return {"created": data}
+"""
+
+HEALTH_MODULE = """
+from kegstand import ApiResource
+
+api = ApiResource("/health")
+
+
+@api.get("/")
+def health():
+    return {"status": "ok"}
+"""
+
+ADMIN_MODULE = """
+from kegstand import ApiResource
+
+api = ApiResource("/admin/reports")
+
+
+@api.get("/")
+def list_reports():
+    return {"reports": []}
+"""
+
+
+@pytest.fixture
+def api_source_root():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        os.makedirs(os.path.join(temp_dir, "api", "public"))
+        os.makedirs(os.path.join(temp_dir, "api", "admin"))
+        files = {
+            "api/users.py": USERS_MODULE,
+            "api/public/health.py": HEALTH_MODULE,
+            "api/admin/reports.py": ADMIN_MODULE,
+            "api/lambda.py": "",
+            "api/__init__.py": "",
+            "api/public/__init__.py": "",
+            "api/admin/__init__.py": "",
+        }
+        for file_name, source in files.items():
+            with open(os.path.join(temp_dir, file_name), "w") as f:
+                f.write(source)
+
+        sys.path.insert(0, temp_dir)
+        yield temp_dir
+        sys.path.remove(temp_dir)
+        for module_name in list(sys.modules):
+            if module_name == "api" or module_name.startswith("api."):
+                del sys.modules[module_name]
+
+
+def test_build_manifest(api_source_root):
+    manifest = build_manifest(api_source_root)
+
+    assert manifest["version"] == 1
+    routes = {(r["method"], r["route"]): r for r in manifest["routes"]}
+    assert set(routes) == {("GET", "/users/:id"), ("POST", "/users/"), ("GET", "/health/")}
+    assert routes[("GET", "/users/:id")]["module"] == "api.users"
+    assert routes[("GET", "/users/:id")]["is_public"] is False
+    assert routes[("GET", "/health/")]["module"] == "api.public.health"
+    assert routes[("GET", "/health/")]["is_public"] is True
+
+
+def test_build_manifest_recursive(api_source_root):
+    manifest = build_manifest(api_source_root, recursive=True)
+
+    modules = {r["module"] for r in manifest["routes"]}
+    assert modules == {"api.users", "api.public.health", "api.admin.reports"}
+
+
+def test_write_and_load_manifest(api_source_root):
+    manifest_path = write_manifest(api_source_root)
+
+    assert manifest_path == os.path.join(api_source_root, MANIFEST_FILENAME)
+    assert load_manifest(manifest_path) == build_manifest(api_source_root)
+
+
+def test_load_manifest_rejects_unknown_version(api_source_root):
+    manifest_path = os.path.join(api_source_root, "manifest.json")
+    with open(manifest_path, "w") as f:
+        json.dump({"version": 99, "routes": []}, f)
+
+    with pytest.raises(ValueError):
+        load_manifest(manifest_path)
+
+
+def test_main_writes_manifest(api_source_root, capsys):
+    output = os.path.join(api_source_root, "out.json")
+    main([api_source_root, "--output", output, "--recursive"])
+
+    assert "Route manifest written" in capsys.readouterr().out
+    assert len(load_manifest(output)["routes"]) == 4
+
+
+def test_lazy_api_imports_modules_on_first_request(api_source_root, make_event):
+    write_manifest(api_source_root)
+    for module_name in list(sys.modules):
+        if module_name.startswith("api."):
+            del sys.modules[module_name]
+
+    root = os.path.join(api_source_root, "api", "lambda.py")
+    api = RestApi(root=root, lazy=True)
+    handler = api.export()
+    assert "api.users" not in sys.modules
+    assert api.resources == []
+
+    response = handler(make_event("/users/42"), {})
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"]) == {"id": "42"}
+    assert "api.users" in sys.modules
+    assert "api.public.health" not in sys.modules
+
+    # Other routes of the loaded module are routed to the real methods from now on
+    response = handler(make_event("/users", method="POST", body='{"name": "Jens"}'), {})
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"]) == {"created": {"name": "Jens"}}
+    assert len(api.resources) == 1
+
+    # Public resources stay public
+    event = {"httpMethod": "GET", "path": "/health", "body": None, "requestContext": {}}
+    assert handler(event, {})["statusCode"] == 200
+
+    # Unknown routes are still not found
+    assert handler(make_event("/nope"), {})["statusCode"] == 404
+
+
+def test_lazy_api_preloads_modules(api_source_root):
+    manifest_path = write_manifest(api_source_root)
+
+    api = RestApi(manifest=manifest_path, preload=["api.public.health"])
+    assert len(api.resources) == 1
+    assert api.resources[0]["is_public"] is True
+
+    handler = api.export()
+    event = {"httpMethod": "GET", "path": "/health", "body": None, "requestContext": {}}
+    assert handler(event, {})["statusCode"] == 200
+
+
+def test_lazy_api_with_out_of_date_manifest(api_source_root, make_event):
+    manifest_path = os.path.join(api_source_root, "manifest.json")
+    with open(manifest_path, "w") as f:
+        route = {"method": "DELETE", "route": "/users/:id", "module": "api.users"}
+        json.dump({"version": 1, "routes": [{**route, "is_public": True}]}, f)
+
+    handler = RestApi(manifest=manifest_path).export()
+    assert handler(make_event("/users/1", method="DELETE"), {})["statusCode"] == 404
+
+
+def test_lazy_api_requires_manifest_location():
+    with pytest.raises(ValueError):
+        RestApi(lazy=True)
@@ -0,0 +1,149 @@
+import json
+
+import pytest
+
+from kegstand.api import RestApi
+from kegstand.decorators import ApiResource
+from kegstand.metrics import HotPathMetrics
+
+
+class FakeMetrics:
+    def __init__(self):
+        self.flushed = []
+        self._dimensions = {}
+        self._metrics = {}
+
+    def add_dimension(self, name, value):
+        self._dimensions[name] = value
+
+    def add_metric(self, name, unit, value):
+        assert unit == "Milliseconds"
+        self._metrics[name] = value
+
+    def flush_metrics(self):
+        self.flushed.append({"dimensions": self._dimensions, "metrics": self._metrics})
+        self._dimensions = {}
+        self._metrics = {}
+
+
+@pytest.fixture
+def keg_api(make_api):
+    def build(metrics, request_logging=True):
+        resource = ApiResource("/kegs")
+
+        @resource.post("/:id")
+        def update_keg(params, data):
+            return {"id": params["id"], "data": data}
+
+        @resource.get("/:id", cache=60)
+        def get_keg(params):
+            return {"id": params["id"]}
+
+        return make_api(resource, metrics=metrics, request_logging=request_logging)
+
+    return build
+
+
+def test_metrics_per_route_template_and_phase(make_event, keg_api):
+    fake = FakeMetrics()
+    handler = keg_api(HotPathMetrics(metrics=fake)).export()
+
+    response = handler(make_event("/kegs/1", method="POST", body='{"litres": 50}'), {})
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"]) == {"id": "1", "data": {"litres": 50}}
+    handler(make_event("/kegs/2", method="POST", body="{}"), {})
+
+    init, first, second = fake.flushed
+    assert init["dimensions"] == {"cold_start": "true"}
+    assert set(init["metrics"]) == {"init_duration"}
+
+    assert first["dimensions"] == {"route": "POST /kegs/:id", "cold_start": "true"}
+    assert set(first["metrics"]) == {
+        "routing_duration",
+        "auth_duration",
+        "decode_duration",
+        "handler_duration",
+        "serialize_duration",
+        "total_duration",
+    }
+    assert all(value >= 0 for value in first["metrics"].values())
+    assert second["dimensions"] == {"route": "POST /kegs/:id", "cold_start": "false"}
+
+
+def test_metrics_for_unmatched_errors_and_cache_hits(make_event, keg_api):
+    fake = FakeMetrics()
+    handler = keg_api(HotPathMetrics(metrics=fake)).export()
+
+    assert handler(make_event("/nope"), {})["statusCode"] == 404
+    assert handler(make_event("/kegs/1", method="POST", body="not json"), {})["statusCode"] == 400
+    handler(make_event("/kegs/1"), {})
+    handler(make_event("/kegs/1"), {})
+
+    _, unmatched, invalid, cache_miss, cache_hit = fake.flushed
+    assert unmatched["dimensions"]["route"] == "UNMATCHED"
+    assert set(unmatched["metrics"]) == {"routing_duration", "total_duration"}
+    assert "handler_duration" not in invalid["metrics"]
+    assert "handler_duration" in cache_miss["metrics"]
+    assert "handler_duration" not in cache_hit["metrics"]
+
+
+def test_sampled_and_unsampled_requests_share_the_pipeline(monkeypatch, make_event):
+    monkeypatch.setenv("KEGSTAND_CURSOR_SECRET", "test-secret")
+    fake = FakeMetrics()
+    metrics = HotPathMetrics(metrics=fake)
+    api = RestApi(metrics=metrics, request_logging=False, compression=1)
+    resource = ApiResource("/kegs")
+
+    @resource.get("/", paginate=2, limit={"rate": 100}, etag=True)
+    def list_kegs():
+        return ({"id": n} for n in range(5))
+
+    api.add_resource(resource)
+    handler = api.export()
+    event = make_event("/kegs/", headers={"Accept-Encoding": "gzip"})
+
+    sampled = handler(event, {})
+    metrics.sample_rate = 0
+    unsampled = handler(event, {})
+    assert sampled == unsampled
+    assert sampled["headers"]["Content-Encoding"] == "gzip"
+    assert set(fake.flushed[-1]["metrics"]) >= {
+        "auth_duration",
+        "handler_duration",
+        "serialize_duration",
+        "compress_duration",
+    }
+
+
+def test_metrics_sampling(make_event, keg_api):
+    fake = FakeMetrics()
+    handler = keg_api(HotPathMetrics(metrics=fake, sample_rate=0)).export()
+
+    for _ in range(5):
+        assert handler(make_event("/kegs/1", method="POST", body="{}"), {})["statusCode"] == 200
+
+    # Only the init duration is emitted
+    assert len(fake.flushed) == 1
+    assert set(fake.flushed[0]["metrics"]) == {"init_duration"}
+
+
+def test_metrics_disabled_by_default(keg_api):
+    handler = keg_api(None, request_logging=False).export()
+    # Only the event format adapter wraps the route dispatcher
+    assert handler.__name__ == "adapted_handler"
+    assert handler.__closure__[0].cell_contents.__name__ == "handler"
+
+
+@pytest.mark.filterwarnings("ignore")
+def test_metrics_emit_embedded_metric_format(capsys, make_event, keg_api):
+    handler = keg_api(HotPathMetrics(namespace="KegstandTest", service="kegs")).export()
+    handler(make_event("/kegs/1", method="POST", body="{}"), {})
+
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    request_metrics = next(line for line in lines if "_aws" in line and "route" in line)
+    assert request_metrics["route"] == "POST /kegs/:id"
+    assert request_metrics["cold_start"] == "true"
+    directive = request_metrics["_aws"]["CloudWatchMetrics"][0]
+    assert directive["Namespace"] == "KegstandTest"
+    assert {"route", "cold_start"} <= set(directive["Dimensions"][0])
+    assert "handler_duration" in request_metrics
@@ -0,0 +1,177 @@
+import json
+
+import pytest
+
+from kegstand.api import RestApi
+from kegstand.decorators import ApiResource
+from kegstand.errors import ApiError
+from kegstand.middleware import Middleware, compile_before_route, compile_route
+
+
+class Cors(Middleware):
+    def before_route(self, request, _context):
+        if request.method == "OPTIONS":
+            return {"statusCode": 204, "headers": {"Access-Control-Allow-Origin": "*"}, "body": ""}
+        return None
+
+    def after_handler(self, response, _params, _request, _context):
+        return {**response, "headers": {**response["headers"], "Access-Control-Allow-Origin": "*"}}
+
+
+class Tenant(Middleware):
+    def before_handler(self, _params, request, _context):
+        tenant = request.headers.get("x-tenant")
+        if tenant is None:
+            raise ApiError("Missing tenant", 400)
+        request.state["tenant"] = tenant
+
+
+@pytest.fixture
+def make_handler(make_api):
+    def build(*middleware, resource_middleware=()):
+        resource = ApiResource("/beers")
+        for item in resource_middleware:
+            resource.use(item)
+
+        @resource.get("/:id")
+        def get_beer(params):
+            return {"id": params["id"]}
+
+        @resource.get("/:id/fail")
+        def fail():
+            raise RuntimeError("boom")
+
+        api = make_api(resource)
+        for item in middleware:
+            api.use(item)
+        return api.export()
+
+    return build
+
+
+def test_routes_without_middleware_are_not_wrapped():
+    def handler(params, _request, _context):
+        return params
+
+    assert compile_route(handler, []) is handler
+    assert compile_route(handler, [Middleware(), Cors()]) is not handler
+    assert compile_route(handler, [Middleware()]) is handler
+    assert compile_before_route(handler, [Tenant()]) is handler
+
+    resource = ApiResource("/beers")
+
+    @resource.get("/")
+    def list_beers():
+        return []
+
+    api = RestApi(request_logging=False)
+    api.add_resource(resource)
+    (method, _), _ = api.build_router().match("GET", "/beers/")
+    assert method is resource.methods[0]
+
+
+def test_before_route_short_circuits(make_event, make_handler):
+    handler = make_handler(Cors())
+    response = handler(make_event(method="OPTIONS"), {})
+    assert response["statusCode"] == 204
+
+    response = handler(make_event(), {})
+    assert response["statusCode"] == 200
+    assert response["headers"]["Access-Control-Allow-Origin"] == "*"
+
+
+def test_before_handler_can_reject_requests(make_event, make_handler):
+    seen = []
+
+    def get_tenant(_params, request, _context):
+        seen.append(request.state["tenant"])
+
+    handler = make_handler(Tenant(), resource_middleware=[Middleware(before_handler=get_tenant)])
+    response = handler(make_event(), {})
+    assert response["statusCode"] == 400
+    assert json.loads(response["body"]) == {"error": "Missing tenant"}
+    assert seen == []
+
+    response = handler(make_event(headers={"X-Tenant": "acme"}), {})
+    assert response["statusCode"] == 200
+    assert seen == ["acme"]
+
+
+def test_middleware_order(make_event, make_handler):
+    calls = []
+
+    def record(name):
+        def before_handler(_params, _request, _context):
+            calls.append(f"before {name}")
+
+        def after_handler(response, _params, _request, _context):
+            calls.append(f"after {name}")
+            return response
+
+        return Middleware(before_handler=before_handler, after_handler=after_handler)
+
+    handler = make_handler(record("api"), resource_middleware=[record("resource")])
+    handler(make_event(), {})
+    assert calls == ["before api", "before resource", "after resource", "after api"]
+
+
+def test_after_handler_sees_short_circuited_and_error_responses(make_event, make_handler):
+    handler = make_handler(Cors(), Tenant())
+    response = handler(make_event(), {})
+    assert response["statusCode"] == 400
+    assert response["headers"]["Access-Control-Allow-Origin"] == "*"
+
+
+def test_on_error(make_event, make_handler):
+    def on_error(error, _params, _request, _context):
+        if isinstance(error, RuntimeError):
+            return {"statusCode": 503, "headers": {}, "body": json.dumps({"error": str(error)})}
+        return None
+
+    handler = make_handler(Middleware(on_error=on_error))
+    response = handler(make_event("/beers/1/fail"), {})
+    assert response["statusCode"] == 503
+    assert json.loads(response["body"]) == {"error": "boom"}
+
+    handler = make_handler(Middleware(on_error=lambda *_args: None))
+    with pytest.raises(RuntimeError):
+        handler(make_event("/beers/1/fail"), {})
+
+
+def test_invalid_middleware():
+    with pytest.raises(ValueError, match="Unknown middleware hook"):
+        Middleware(before_request=print)
+    with pytest.raises(ValueError, match="before_route"):
+        ApiResource("/beers").use(Cors())
+
+
+def test_lazy_routes_run_middleware(tmp_path, monkeypatch, make_event):
+    package = tmp_path / "lazy_middleware_api"
+    package.mkdir()
+    (package / "__init__.py").write_text("")
+    (package / "beers.py").write_text(
+        "from kegstand.decorators import ApiResource\n"
+        "api = ApiResource('/beers')\n"
+        "@api.get('/:id')\n"
+        "def get_beer(params):\n"
+        "    return {'id': params['id']}\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    api = RestApi(request_logging=False)
+    api.add_lazy_routes(
+        [
+            {
+                "method": "GET",
+                "route": "/beers/:id",
+                "module": "lazy_middleware_api.beers",
+                "is_public": False,
+            }
+        ]
+    )
+    api.use(Cors())
+    handler = api.export()
+    for _ in range(2):
+        response = handler(make_event(), {})
+        assert response["statusCode"] == 200
+        assert response["headers"]["Access-Control-Allow-Origin"] == "*"
@@ -0,0 +1,152 @@
+import json
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from kegstand.decorators import ApiResource
+from kegstand.errors import ApiError
+from kegstand.pagination import CursorCodec, Paginator, make_paginator
+
+BEERS = [{"id": n, "name": f"Beer {n}"} for n in range(1, 8)]
+
+
+@pytest.fixture(autouse=True)
+def cursor_secret(monkeypatch):
+    monkeypatch.setenv("KEGSTAND_CURSOR_SECRET", "test-secret")
+
+
+@pytest.fixture
+def follow(make_event):
+    def follow_pages(handler, path="/beers/", **query):
+        # Returns the ids of all pages, following the next links
+        pages = []
+        event = make_event(path, query=query or None)
+        while True:
+            body = json.loads(handler(event, {})["body"])
+            pages.append([item["id"] for item in body["items"]])
+            if body["next"] is None:
+                assert body["cursor"] is None
+                return pages
+            next_link = urlparse(body["next"])
+            assert next_link.path == path
+            next_query = {name: values[-1] for name, values in parse_qs(next_link.query).items()}
+            assert next_query["cursor"] == body["cursor"]
+            event = make_event(path, query=next_query)
+
+    return follow_pages
+
+
+def test_cursor_codec():
+    codec = CursorCodec("secret")
+    cursor = codec.encode({"after": {"id": 3}})
+    assert "=" not in cursor
+    assert codec.decode(cursor) == {"after": {"id": 3}}
+
+    _, _, signature = cursor.partition(".")
+    forged = CursorCodec("other").encode({"after": {"id": 100}})
+    for invalid in (forged, f"{forged.partition('.')[0]}.{signature}", "garbage", "a.b!"):
+        with pytest.raises(ApiError) as excinfo:
+            codec.decode(invalid)
+        assert excinfo.value.status_code == 400
+
+
+def test_cursor_secret_is_required(monkeypatch):
+    monkeypatch.delenv("KEGSTAND_CURSOR_SECRET")
+    with pytest.raises(ValueError, match="KEGSTAND_CURSOR_SECRET"):
+        CursorCodec().encode({"offset": 1})
+
+
+def test_parse_page(make_event):
+    paginator = Paginator(size=10, max_size=20)
+    page = paginator.parse_page(make_event())
+    assert (page.size, page.fetch_size, page.offset, page.after) == (10, 11, 0, None)
+    assert paginator.parse_page(make_event(query={"limit": "5"})).size == 5
+    for limit in ("0", "21", "many"):
+        with pytest.raises(ApiError):
+            paginator.parse_page(make_event(query={"limit": limit}))
+
+
+def test_envelope_consumes_only_one_item_past_the_page(make_event):
+    consumed = []
+
+    def table_scan():
+        for beer in BEERS:
+            consumed.append(beer["id"])
+            yield beer
+
+    body = Paginator(size=2, codec=CursorCodec("secret")).envelope(
+        table_scan(), make_event("/beers/")
+    )
+    assert [item["id"] for item in body["items"]] == [1, 2]
+    assert consumed == [1, 2, 3]
+    assert body["next"].startswith("/beers/?cursor=")
+
+
+def test_make_paginator():
+    assert make_paginator(None) is None
+    assert make_paginator(False) is None
+    assert make_paginator(True).size == 50
+    assert make_paginator(10).size == 10
+    assert make_paginator({"size": 5, "max_size": 10}).max_size == 10
+    paginator = Paginator()
+    assert make_paginator(paginator) is paginator
+
+
+@pytest.fixture
+def make_handler(make_api):
+    def build():
+        resource = ApiResource("/beers")
+
+        # Offset pagination, applied by the framework to a lazy iterator over the table
+        @resource.get("/", paginate=3)
+        def list_beers():
+            return iter(BEERS)
+
+        # Keyset pagination, with the handler querying from the page's position
+        @resource.get("/keyset", paginate={"size": 3, "cursor": lambda beer: {"id": beer["id"]}})
+        def list_beers_after(page):
+            after = page.after["id"] if page.after else 0
+            return (beer for beer in BEERS if beer["id"] > after)
+
+        # Offset pagination, with the handler applying the offset
+        @resource.get("/offset", paginate=True, cache=60)
+        def list_beers_from(page):
+            return BEERS[page.offset : page.offset + page.fetch_size]
+
+        return make_api(resource).export()
+
+    return build
+
+
+def test_offset_pagination(follow, make_handler):
+    assert follow(make_handler()) == [[1, 2, 3], [4, 5, 6], [7]]
+
+
+def test_keyset_pagination(follow, make_handler):
+    assert follow(make_handler(), "/beers/keyset") == [[1, 2, 3], [4, 5, 6], [7]]
+
+
+def test_limit_is_kept_in_next_links(follow, make_handler):
+    handler = make_handler()
+    assert follow(handler, "/beers/offset", limit="4") == [[1, 2, 3, 4], [5, 6, 7]]
+    # Each page is cached separately
+    assert follow(handler, "/beers/offset", limit="4") == [[1, 2, 3, 4], [5, 6, 7]]
+
+
+def test_invalid_cursor_is_rejected(make_event, make_handler):
+    response = make_handler()(make_event("/beers/", query={"cursor": "forged"}), {})
+    assert response["statusCode"] == 400
+    assert json.loads(response["body"]) == {"error": "Invalid cursor"}
+
+
+def test_export_requires_the_cursor_secret(monkeypatch, make_handler):
+    monkeypatch.delenv("KEGSTAND_CURSOR_SECRET")
+    monkeypatch.setattr("kegstand.pagination.DEFAULT_CURSOR_CODEC._secret", None)
+    with pytest.raises(ValueError, match="KEGSTAND_CURSOR_SECRET"):
+        make_handler()
+
+
+@pytest.mark.parametrize("result", [{"id": 1}, "beers", 42])
+def test_envelope_rejects_results_that_are_not_lists_of_items(result, make_event):
+    with pytest.raises(TypeError, match="iterable of items"):
+        Paginator(codec=CursorCodec("secret")).envelope(result, make_event("/beers/"))
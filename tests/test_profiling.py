@@ -0,0 +1,181 @@
+import json
+import time
+
+import pytest
+
+from kegstand.decorators import ApiResource
+from kegstand.profiling import (
+    PROFILE_ID_HEADER,
+    Profiler,
+    _sign,
+    make_profiler,
+    profile_header,
+)
+from kegstand.request import as_request
+
+SECRET = "test-secret"  # noqa: S105
+
+
+@pytest.fixture(autouse=True)
+def clean_environment(monkeypatch):
+    for name in (
+        "KEGSTAND_PROFILE",
+        "KEGSTAND_PROFILE_SAMPLE_RATE",
+        "KEGSTAND_PROFILE_SECRET",
+        "KEGSTAND_PROFILE_OUTPUT",
+    ):
+        monkeypatch.delenv(name, raising=False)
+
+
+def brew(n):
+    return [str(i) * 10 for i in range(n)]
+
+
+@pytest.fixture
+def make_handler(make_api):
+    def build(profiling):
+        resource = ApiResource("/beers")
+
+        @resource.get("/:id")
+        def get_beer(params):
+            return {"id": params["id"], "batch": len(brew(1000))}
+
+        return make_api(resource, profiling=profiling).export()
+
+    return build
+
+
+def capture_reports(monkeypatch, profiler):
+    reports = []
+    monkeypatch.setattr(profiler, "write", lambda report, _cpu_profile=None: reports.append(report))
+    return reports
+
+
+def test_make_profiler(monkeypatch):
+    assert make_profiler(None) is None
+    assert make_profiler(False) is None
+    assert make_profiler(True).modes == ("cpu",)
+    assert make_profiler({"modes": "cpu,memory", "top": 5}).modes == ("cpu", "memory")
+    assert make_profiler({"secret": SECRET}).sample_rate == 0
+    assert make_profiler({"secret": SECRET, "sample_rate": 0.01}).sample_rate == 0.01
+    profiler = Profiler()
+    assert make_profiler(profiler) is profiler
+
+    monkeypatch.setenv("KEGSTAND_PROFILE", "memory")
+    monkeypatch.setenv("KEGSTAND_PROFILE_SAMPLE_RATE", "0.1")
+    profiler = make_profiler(None)
+    assert (profiler.modes, profiler.sample_rate) == (("memory",), 0.1)
+    assert make_profiler(False) is None
+
+    # A secret alone only enables signed requests
+    monkeypatch.delenv("KEGSTAND_PROFILE")
+    monkeypatch.delenv("KEGSTAND_PROFILE_SAMPLE_RATE")
+    monkeypatch.setenv("KEGSTAND_PROFILE_SECRET", SECRET)
+    profiler = make_profiler(None)
+    assert (profiler.sample_rate, profiler.secret) == (0.0, SECRET)
+
+    with pytest.raises(ValueError, match="Unsupported profiling mode"):
+        Profiler(modes="gpu")
+
+
+def test_handler_is_not_wrapped_without_profiling(monkeypatch, make_event, make_handler):
+    def fail(*_args):
+        raise AssertionError("wrapped")
+
+    monkeypatch.setattr(Profiler, "wrap", fail)
+    handler = make_handler(None)
+    assert PROFILE_ID_HEADER not in handler(make_event(), {})["headers"]
+
+
+def test_cpu_profile(monkeypatch, make_event, make_handler):
+    profiler = Profiler(top=50)
+    reports = capture_reports(monkeypatch, profiler)
+    response = make_handler(profiler)(make_event(request_id="req-1"), {})
+
+    assert response["statusCode"] == 200
+    assert response["headers"][PROFILE_ID_HEADER].endswith("-req-1")
+    (report,) = reports
+    assert (report["method"], report["path"], report["status_code"]) == ("GET", "/beers/1", 200)
+    assert "memory" not in report
+    functions = [entry["function"] for entry in report["cpu"]]
+    # Both the handler and Kegstand's dispatch path show up
+    assert any(function.endswith("(brew)") for function in functions)
+    assert any(function.startswith("kegstand/api.py") for function in functions)
+    # Sorted by cumulative time, with the whole pipeline first
+    assert functions[0].endswith("(profiled_handler)") or functions[0].startswith("kegstand/")
+
+    profiler.top = 3
+    make_handler(profiler)(make_event(), {})
+    assert len(reports[1]["cpu"]) == 3
+
+
+def test_memory_profile(monkeypatch, make_event):
+    profiler = Profiler(modes="memory")
+    reports = capture_reports(monkeypatch, profiler)
+
+    def handler(_request, _context):
+        handler.batch = brew(1000)  # type: ignore[attr-defined]
+        return {"statusCode": 200, "headers": {}, "body": ""}
+
+    profiler.wrap(handler)(as_request(make_event()), {})
+    memory = reports[0]["memory"]
+    assert memory["peak_kb"] > 0
+    assert memory["top"][0]["site"].startswith("tests/test_profiling.py:")
+
+
+def test_signed_header_trigger(monkeypatch, make_event, make_handler):
+    profiler = Profiler(secret=SECRET)
+    assert profiler.sample_rate == 0
+    reports = capture_reports(monkeypatch, profiler)
+    handler = make_handler(profiler)
+
+    assert PROFILE_ID_HEADER not in handler(make_event(), {})["headers"]
+    expired = f"cpu.{int(time.time() - 1)}"
+    for header in (
+        profile_header("other-secret"),
+        f"{expired}.{_sign(SECRET, expired)}",
+        "cpu.garbage",
+        "nonsense",
+    ):
+        response = handler(make_event(headers={"X-Kegstand-Profile": header}), {})
+        assert PROFILE_ID_HEADER not in response["headers"]
+    assert reports == []
+
+    header = profile_header(SECRET, modes="cpu,memory")
+    response = handler(make_event(headers={"x-kegstand-profile": header}), {})
+    assert PROFILE_ID_HEADER in response["headers"]
+    assert set(reports[0]) >= {"cpu", "memory"}
+
+
+def test_sampling(monkeypatch, make_event, make_handler):
+    profiler = Profiler(sample_rate=0.5)
+    reports = capture_reports(monkeypatch, profiler)
+    monkeypatch.setattr("kegstand.profiling.random.random", iter([0.9, 0.1]).__next__)
+    handler = make_handler(profiler)
+    handler(make_event(), {})
+    handler(make_event(), {})
+    assert len(reports) == 1
+    assert profiler.profiled == 1
+
+
+def test_file_output(tmp_path, make_event, make_handler):
+    output = tmp_path / "profiles"
+    make_handler({"output": str(output), "modes": "all"})(make_event(), {})
+    (report_path,) = output.glob("*.json")
+    report = json.loads(report_path.read_text())
+    assert set(report) >= {"cpu", "memory", "duration_ms"}
+    assert report_path.with_suffix(".prof").exists()
+
+
+def test_errors_are_not_swallowed(monkeypatch, make_event):
+    profiler = Profiler()
+    reports = capture_reports(monkeypatch, profiler)
+
+    def handler(_request, _context):
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        profiler.wrap(handler)(as_request(make_event()), {})
+    assert reports == []
+    # The lock is released for the next request
+    assert profiler._lock.acquire(blocking=False)
@@ -0,0 +1,195 @@
+import base64
+import json
+
+import pytest
+
+from kegstand.decorators import ApiResource, claim
+from kegstand.request import ALB, HTTP_API, REST_API, Request, as_request, detect_event_format
+
+
+def rest_event(**overrides):
+    event = {
+        "httpMethod": "POST",
+        "path": "/beers/1",
+        "headers": {"Content-Type": "application/json", "X-Request-Id": "abc"},
+        "queryStringParameters": {"style": "ipa"},
+        "body": '{"name": "Heady"}',
+        "isBase64Encoded": False,
+        "requestContext": {
+            "requestId": "req-1",
+            "authorizer": {"claims": {"sub": "user123", "role": "admin"}},
+        },
+    }
+    event.update(overrides)
+    return event
+
+
+def http_event(**overrides):
+    event = {
+        "version": "2.0",
+        "routeKey": "$default",
+        "rawPath": "/beers/1",
+        "rawQueryString": "style=ipa",
+        "headers": {"content-type": "application/json", "x-request-id": "abc"},
+        "queryStringParameters": {"style": "ipa"},
+        "body": base64.b64encode(b'{"name": "Heady"}').decode(),
+        "isBase64Encoded": True,
+        "requestContext": {
+            "requestId": "req-1",
+            "stage": "$default",
+            "http": {"method": "POST", "path": "/beers/1"},
+            "authorizer": {"jwt": {"claims": {"sub": "user123", "role": "admin"}, "scopes": []}},
+        },
+    }
+    event.update(overrides)
+    return event
+
+
+def alb_event(**overrides):
+    event = {
+        "httpMethod": "POST",
+        "path": "/beers/1",
+        "headers": {"content-type": "application/json", "x-amzn-trace-id": "Root=1-abc"},
+        "queryStringParameters": {"style": "india%20pale+ale"},
+        "body": '{"name": "Heady"}',
+        "isBase64Encoded": False,
+        "requestContext": {"elb": {"targetGroupArn": "arn:aws:elasticloadbalancing:..."}},
+    }
+    event.update(overrides)
+    return event
+
+
+@pytest.mark.parametrize(
+    ("event", "event_format"),
+    [(rest_event(), REST_API), (http_event(), HTTP_API), (alb_event(), ALB)],
+)
+def test_detect_event_format(event, event_format):
+    assert detect_event_format(event) == event_format
+
+
+@pytest.mark.parametrize("make_event", [rest_event, http_event, alb_event])
+def test_request_view(make_event):
+    request = Request(make_event())
+    assert request.method == "POST"
+    assert request.path == "/beers/1"
+    assert request.headers["content-type"] == "application/json"
+    assert json.loads(request.body) == {"name": "Heady"}
+
+
+def test_rest_api_request():
+    request = Request(rest_event())
+    assert request.query == {"style": "ipa"}
+    assert request.claims == {"sub": "user123", "role": "admin"}
+    assert request.request_id == "req-1"
+    assert request.is_authenticated
+    # The view reads through to the event, without copying it
+    assert request["httpMethod"] == "POST"
+    assert dict(request) == request.event
+
+
+def test_http_api_request():
+    request = Request(http_event())
+    assert request.claims == {"sub": "user123", "role": "admin"}
+    assert request.request_id == "req-1"
+
+    lambda_authorizer = {"lambda": {"tenant": "acme"}}
+    request = Request(http_event(requestContext={**http_event()["requestContext"]}))
+    request.event["requestContext"]["authorizer"] = lambda_authorizer
+    assert request.claims == {"tenant": "acme"}
+
+
+def test_http_api_request_on_named_stage():
+    event = http_event(rawPath="/prod/beers/1")
+    event["requestContext"]["stage"] = "prod"
+    assert Request(event).path == "/beers/1"
+
+
+def test_alb_request():
+    request = Request(alb_event())
+    assert request.query == {"style": "india pale ale"}
+    assert request.claims is None
+    assert not request.is_authenticated
+    assert request.request_id == "Root=1-abc"
+
+
+def test_alb_multi_value_request():
+    event = alb_event(
+        headers=None,
+        multiValueHeaders={"Accept": ["text/html", "application/json"]},
+        queryStringParameters=None,
+        multiValueQueryStringParameters={"style": ["ipa", "stout"]},
+    )
+    request = Request(event)
+    assert request.headers == {"accept": "text/html, application/json"}
+    assert request.query == {"style": "stout"}
+
+
+def test_as_request():
+    request = Request(rest_event())
+    assert as_request(request) is request
+    assert as_request(rest_event()).format == REST_API
+
+
+def test_with_claims():
+    request = Request(alb_event())
+    authenticated = request.with_claims({"sub": "user123"})
+    assert authenticated.event is request.event
+    assert authenticated.claims == {"sub": "user123"}
+    assert authenticated.is_authenticated
+
+
+def test_format_response():
+    response = {"statusCode": 201, "headers": {"Content-Type": "application/json"}, "body": "{}"}
+    assert Request(rest_event()).format_response(response) is response
+    assert Request(http_event()).format_response(response) is response
+
+    alb_response = Request(alb_event()).format_response(response)
+    assert alb_response["statusDescription"] == "201 Created"
+    assert alb_response["isBase64Encoded"] is False
+    assert alb_response["headers"] == response["headers"]
+
+    multi_value_event = alb_event(multiValueHeaders={}, headers=None)
+    alb_response = Request(multi_value_event).format_response(response)
+    assert alb_response["multiValueHeaders"] == {"Content-Type": ["application/json"]}
+    assert "headers" not in alb_response
+
+
+@pytest.fixture
+def handler(make_api):
+    resource = ApiResource("/beers")
+
+    @resource.post("/:id", auth=claim("role").eq("admin"))
+    def update_beer(params, query, data, claims):
+        return {"id": params["id"], "style": query["style"], "data": data, "user": claims["sub"]}
+
+    public_resource = ApiResource("/public")
+
+    @public_resource.post("/:id")
+    def update_public_beer(params, query, data):
+        return {"id": params["id"], "style": query["style"], "data": data}
+
+    api = make_api(resource)
+    api.add_resource(public_resource, is_public=True)
+    return api.export()
+
+
+@pytest.mark.parametrize("event_format", [rest_event, http_event])
+def test_rest_api_handles_api_gateway_formats(event_format, handler):
+    response = handler(event_format(), {})
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"]) == {
+        "id": "1",
+        "style": "ipa",
+        "data": {"name": "Heady"},
+        "user": "user123",
+    }
+
+
+def test_rest_api_handles_alb_events(handler):
+    # Without an authorizer, only public resources are reachable
+    assert handler(alb_event(), {})["statusCode"] == 401
+
+    response = handler(alb_event(path="/public/1"), {})
+    assert response["statusCode"] == 200
+    assert response["statusDescription"] == "200 OK"
+    assert json.loads(response["body"])["style"] == "india pale ale"
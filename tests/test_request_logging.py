@@ -0,0 +1,129 @@
+import logging
+
+import pytest
+
+from kegstand import request_logging
+from kegstand.decorators import ApiResource
+from kegstand.errors import ApiError
+from kegstand.request_logging import REDACTED, RequestLogger, truncate
+
+
+@pytest.fixture
+def keg_event(make_event):
+    # A request with credentials in its headers and claims, which should never be logged
+    def build(path="/kegs/1", body=None):
+        return make_event(
+            path,
+            body=body,
+            headers={"Authorization": "Bearer secret", "Accept": "application/json"},
+            claims={"sub": "user123", "email": "jens@example.com"},
+            request_id="req-123",
+        )
+
+    return build
+
+
+@pytest.fixture
+def log(monkeypatch, caplog):
+    # Log through a plain stdlib logger, so that caplog can capture the records
+    monkeypatch.setattr(request_logging, "logger", logging.getLogger("kegstand.test"))
+    caplog.set_level(logging.WARNING, logger="kegstand.test")
+    return caplog
+
+
+@pytest.fixture
+def make_handler(make_api):
+    def build(request_logger):
+        resource = ApiResource("/kegs")
+
+        @resource.get("/:id")
+        def get_keg(params):
+            if params["id"] == "missing":
+                raise ApiError("Keg not found", 404)
+            return {"id": params["id"]}
+
+        return make_api(resource, request_logging=request_logger).export()
+
+    return build
+
+
+def test_truncate():
+    assert truncate(None, 5) is None
+    assert truncate("short", 5) == "short"
+    assert truncate("a" * 10, 4) == "aaaa...[truncated 6 chars]"
+
+
+def test_sanitize_event(keg_event):
+    request_logger = RequestLogger(max_body_length=4, redact_claims=["email"])
+    event = keg_event(body="0123456789")
+
+    sanitized = request_logger.sanitize_event(event)
+    assert sanitized["body"] == "0123...[truncated 6 chars]"
+    assert sanitized["headers"] == {"Authorization": REDACTED, "Accept": "application/json"}
+    assert sanitized["requestContext"]["authorizer"]["claims"] == {
+        "sub": "user123",
+        "email": REDACTED,
+    }
+    # The event itself is left untouched
+    assert event["headers"]["Authorization"] == "Bearer secret"
+    assert event["requestContext"]["authorizer"]["claims"]["email"] == "jens@example.com"
+
+    # All claims are redacted by default
+    claims = RequestLogger().sanitize_event(event)["requestContext"]["authorizer"]["claims"]
+    assert set(claims.values()) == {REDACTED}
+
+
+def test_access_log_line_per_request(log, keg_event, make_handler):
+    log.set_level(logging.INFO, logger="kegstand.test")
+    handler = make_handler(RequestLogger())
+
+    handler(keg_event(), {})
+    handler(keg_event("/kegs/missing"), {})
+    handler(keg_event("/nowhere"), {})
+
+    records = log.records
+    assert [(record.message, record.status_code) for record in records] == [
+        ("Request", 200),
+        ("Request", 404),
+        ("Request", 404),
+    ]
+    assert records[0].http_method == "GET"
+    assert records[0].path == "/kegs/1"
+    assert records[0].request_id == "req-123"
+    assert records[0].duration_ms >= 0
+
+
+def test_event_logging_is_debug_only_and_sampled(log, keg_event, make_handler):
+    log.set_level(logging.DEBUG, logger="kegstand.test")
+    handler = make_handler(RequestLogger(access_log=False))
+    handler(keg_event(body="x" * 2000), {})
+
+    (record,) = log.records
+    assert record.message == "Request event"
+    assert record.event["headers"]["Authorization"] == REDACTED
+    assert len(record.event["body"]) < 1100
+
+    log.clear()
+    handler = make_handler(RequestLogger(access_log=False, event_sample_rate=0))
+    handler(keg_event(), {})
+    assert log.records == []
+
+
+def test_nothing_is_formatted_when_disabled(log, monkeypatch, keg_event, make_handler):
+    request_logger = RequestLogger()
+
+    def fail(_event):
+        raise AssertionError("The event should not be formatted")
+
+    monkeypatch.setattr(request_logger, "sanitize_event", fail)
+    handler = make_handler(request_logger)
+    assert handler(keg_event(), {})["statusCode"] == 200
+    assert handler(keg_event("/kegs/missing"), {})["statusCode"] == 404
+    assert log.records == []
+
+
+def test_request_logging_disabled(log, keg_event, make_handler):
+    log.set_level(logging.DEBUG, logger="kegstand.test")
+    handler = make_handler(False)
+    handler(keg_event(), {})
+    assert log.records == []
@@ -0,0 +1,140 @@
+import base64
+import gzip
+import json
+
+import pytest
+
+from kegstand.decorators import ApiResource
+from kegstand.response_compression import (
+    ResponseCompression,
+    make_response_compression,
+    parse_accept_encoding,
+)
+from kegstand.utils import api_response
+
+GZIP = {"Accept-Encoding": "gzip, deflate"}
+LARGE_BODY = {"beers": [{"name": f"Beer {n}", "style": "ipa"} for n in range(200)]}
+
+
+def decompress(response):
+    assert response["isBase64Encoded"] is True
+    return json.loads(gzip.decompress(base64.b64decode(response["body"])))
+
+
+def test_parse_accept_encoding():
+    assert parse_accept_encoding("gzip;q=0.8, br, identity;q=0, x;q=bad") == {
+        "gzip": 0.8,
+        "br": 1.0,
+        "identity": 0.0,
+        "x": 0.0,
+    }
+
+
+@pytest.mark.parametrize(
+    ("accept_encoding", "encoding"),
+    [
+        ("gzip", "gzip"),
+        ("gzip;q=0", None),
+        ("deflate", None),
+        ("*", "gzip"),
+        ("*, gzip;q=0", None),
+        (None, None),
+    ],
+)
+def test_negotiate(accept_encoding, encoding):
+    compression = ResponseCompression(encodings=("gzip",))
+    assert compression.negotiate(accept_encoding) == encoding
+
+
+def test_brotli_is_preferred_if_installed():
+    try:
+        import brotli  # type: ignore[import-not-found]  # noqa: F401
+    except ImportError:
+        assert ResponseCompression().encodings == ("gzip",)
+    else:
+        assert ResponseCompression().negotiate("gzip, br") == "br"
+
+
+def test_compress_large_response(make_event):
+    response = api_response(LARGE_BODY)
+    compressed = ResponseCompression(encodings=("gzip",)).compress(
+        response, make_event("/beers/", headers=GZIP)
+    )
+    assert compressed["headers"]["Content-Encoding"] == "gzip"
+    assert compressed["headers"]["Vary"] == "Accept-Encoding"
+    assert decompress(compressed) == LARGE_BODY
+    assert len(compressed["body"]) < len(response["body"])
+    # The original response is not modified
+    assert "Content-Encoding" not in response["headers"]
+
+
+def test_small_responses_are_not_compressed(make_event):
+    response = api_response({"name": "Heady"})
+    assert ResponseCompression().compress(response, make_event("/beers/", headers=GZIP)) is response
+
+
+def test_response_without_accepted_encoding_varies(make_event):
+    response = api_response(LARGE_BODY)
+    uncompressed = ResponseCompression().compress(
+        response, make_event("/beers/", headers={"Accept-Encoding": "br;q=0"})
+    )
+    assert uncompressed["body"] == response["body"]
+    assert uncompressed["headers"]["Vary"] == "Accept-Encoding"
+    assert "isBase64Encoded" not in uncompressed
+
+
+def test_make_response_compression():
+    assert make_response_compression(None) is None
+    assert make_response_compression(False) is None
+    assert make_response_compression(True).min_size == 1024
+    assert make_response_compression(256).min_size == 256
+    compression = ResponseCompression()
+    assert make_response_compression(compression) is compression
+
+
+@pytest.fixture
+def make_handler(make_api):
+    def build(compression=None, **route_options):
+        resource = ApiResource("/beers")
+
+        @resource.get("/", **route_options)
+        def list_beers():
+            return LARGE_BODY
+
+        @resource.get("/small", **route_options)
+        def get_beer():
+            return {"name": "Heady"}
+
+        return make_api(resource, compression=compression).export()
+
+    return build
+
+
+def test_compression_is_disabled_by_default(make_event, make_handler):
+    response = make_handler()(make_event("/beers/", headers=GZIP), {})
+    assert "Content-Encoding" not in response["headers"]
+    assert json.loads(response["body"]) == LARGE_BODY
+
+
+def test_rest_api_compression(make_event, make_handler):
+    handler = make_handler(compression=True)
+    assert decompress(handler(make_event("/beers/", headers=GZIP), {})) == LARGE_BODY
+    assert "isBase64Encoded" not in handler(make_event("/beers/small", headers=GZIP), {})
+    assert "isBase64Encoded" not in handler(make_event("/beers/"), {})
+
+
+def test_route_compression_overrides_rest_api(make_event, make_handler):
+    assert "isBase64Encoded" not in make_handler(compression=True, compress=False)(
+        make_event("/beers/", headers=GZIP), {}
+    )
+    assert "isBase64Encoded" not in make_handler(compression=100_000)(
+        make_event("/beers/", headers=GZIP), {}
+    )
+    handler = make_handler(compression=100_000, compress=10)
+    assert decompress(handler(make_event("/beers/", headers=GZIP), {})) == LARGE_BODY
+
+
+def test_cached_responses_are_compressed_per_request(make_event, make_handler):
+    handler = make_handler(compression=True, cache=60)
+    assert "isBase64Encoded" not in handler(make_event("/beers/"), {})
+    assert decompress(handler(make_event("/beers/", headers=GZIP), {})) == LARGE_BODY
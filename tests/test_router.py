@@ -0,0 +1,69 @@
+from kegstand.router import Router, split_route
+
+
+def test_split_route():
+    assert split_route("/hello/world") == ["", "hello", "world"]
+    assert split_route("/hello/world/") == ["", "hello", "world"]
+    assert split_route("/") == [""]
+
+
+def test_static_route_matching():
+    router = Router()
+    router.add("GET", "/users", "list_users")
+    router.add("POST", "/users", "create_user")
+
+    assert router.match("GET", "/users") == ("list_users", {})
+    assert router.match("GET", "/users/") == ("list_users", {})
+    assert router.match("POST", "/users") == ("create_user", {})
+    assert router.match("DELETE", "/users") == (None, None)
+    assert router.match("GET", "/posts") == (None, None)
+
+
+def test_dynamic_route_matching():
+    router = Router()
+    router.add("GET", "/users/:user_id/posts/:post_id", "get_post")
+
+    target, params = router.match("GET", "/users/123/posts/456")
+    assert target == "get_post"
+    assert params == {"user_id": "123", "post_id": "456"}
+
+    # Segment count must match exactly
+    assert router.match("GET", "/users/123/posts") == (None, None)
+    assert router.match("GET", "/users/123/posts/456/comments") == (None, None)
+
+
+def test_dynamic_route_params_are_decoded():
+    router = Router()
+    router.add("GET", "/users/:name", "get_user")
+
+    assert router.match("GET", "/users/John%20Doe") == ("get_user", {"name": "John Doe"})
+
+
+def test_param_names_are_bound_per_route():
+    router = Router()
+    router.add("GET", "/users/:id", "get_user")
+    router.add("GET", "/users/:user_id/posts", "list_posts")
+
+    assert router.match("GET", "/users/1") == ("get_user", {"id": "1"})
+    assert router.match("GET", "/users/1/posts") == ("list_posts", {"user_id": "1"})
+
+
+def test_static_segments_take_precedence_with_backtracking():
+    router = Router()
+    router.add("GET", "/users/:id", "get_user")
+    router.add("PUT", "/users/:id", "update_user")
+    router.add("GET", "/users/me", "get_me")
+
+    assert router.match("GET", "/users/me") == ("get_me", {})
+    # No PUT on the static segment, so the dynamic route matches instead
+    assert router.match("PUT", "/users/me") == ("update_user", {"id": "me"})
+
+
+def test_first_registered_route_wins_unless_replaced():
+    router = Router()
+    router.add("GET", "/items/:id", "first")
+    router.add("GET", "/items/:key", "second")
+    assert router.match("GET", "/items/1") == ("first", {"id": "1"})
+
+    router.add("GET", "/items/:key", "third", replace=True)
+    assert router.match("GET", "/items/1") == ("third", {"key": "1"})
@@ -0,0 +1,181 @@
+import json
+
+import pytest
+
+from kegstand.api import RestApi
+from kegstand.decorators import ApiResource
+from kegstand.errors import ApiError
+from kegstand.json_codec import StdlibJsonCodec
+from kegstand.streaming import (
+    HTTP_INTEGRATION_CONTENT_TYPE,
+    LocalResponseStream,
+    iter_encoded_chunks,
+)
+
+
+@pytest.fixture
+def api(make_api):
+    api = make_api(codec=StdlibJsonCodec(), request_logging=True)
+    resource = ApiResource("/rows")
+
+    @resource.get("/")
+    def list_rows(query):
+        for index in range(int(query.get("count", "1000"))):
+            yield {"id": index, "name": f"row {index}"}
+
+    @resource.get("/summary")
+    def summary():
+        return {"rows": 1000}
+
+    @resource.get("/:id")
+    def get_row(params):
+        raise ApiError(f"Row {params['id']} not found", 404)
+        yield  # pragma: no cover
+
+    @resource.get("/broken/:id")
+    def broken_rows(params):
+        yield {"id": params["id"]}
+        raise RuntimeError("Database went away")
+
+    api.add_resource(resource, is_public=True)
+    return api
+
+
+def test_iter_encoded_chunks_json_array():
+    codec = StdlibJsonCodec()
+    body = b"".join(iter_encoded_chunks(range(5), codec, "json", chunk_size=4))
+    assert json.loads(body) == [0, 1, 2, 3, 4]
+
+    assert b"".join(iter_encoded_chunks([], codec, "json")) == b"[]"
+
+
+def test_iter_encoded_chunks_ndjson():
+    codec = StdlibJsonCodec()
+    body = b"".join(iter_encoded_chunks([{"a": 1}, {"a": 2}], codec, "ndjson"))
+    assert body == b'{"a": 1}\n{"a": 2}\n'
+
+    assert b"".join(iter_encoded_chunks([], codec, "ndjson")) == b""
+
+
+def test_iter_encoded_chunks_bounded_by_chunk_size():
+    codec = StdlibJsonCodec()
+    items = ({"id": index, "padding": "x" * 100} for index in range(1000))
+    chunks = list(iter_encoded_chunks(items, codec, "json", chunk_size=1024))
+
+    assert len(chunks) > 100
+    # A chunk never exceeds the chunk size by more than one item
+    assert max(len(chunk) for chunk in chunks) < 1024 + 150
+    assert len(json.loads(b"".join(chunks))) == 1000
+
+
+def test_iter_encoded_chunks_unknown_format():
+    with pytest.raises(ValueError):
+        list(iter_encoded_chunks([1], StdlibJsonCodec(), "xml"))
+
+
+def test_streaming_handler_streams_generator(api, make_event):
+    handler = api.export(stream=True, chunk_size=1024)
+    stream = LocalResponseStream()
+
+    handler(make_event("/rows", claims=None), stream, {})
+
+    assert stream.content_type == HTTP_INTEGRATION_CONTENT_TYPE
+    assert stream.status_code == 200
+    assert stream.headers == {"Content-Type": "application/json"}
+    assert stream.closed
+    assert len(stream.chunks) > 1
+    assert stream.max_chunk_size < 1024 + 100
+    rows = json.loads(stream.body)
+    assert len(rows) == 1000
+    assert rows[999] == {"id": 999, "name": "row 999"}
+
+
+def test_streaming_handler_ndjson(api, make_event):
+    handler = api.export(stream=True, stream_format="ndjson")
+    stream = LocalResponseStream()
+
+    event = make_event("/rows", query={"count": "3"}, claims=None)
+    handler(event, stream, {})
+
+    assert stream.headers == {"Content-Type": "application/x-ndjson"}
+    lines = stream.body.decode().splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [0, 1, 2]
+
+
+def test_streaming_handler_empty_generator(api, make_event):
+    stream = LocalResponseStream()
+    event = make_event("/rows", query={"count": "0"}, claims=None)
+    api.export(stream=True)(event, stream, {})
+
+    assert stream.status_code == 200
+    assert stream.body == b"[]"
+
+
+def test_streaming_handler_non_iterable_result(api, make_event):
+    stream = LocalResponseStream()
+    api.export(stream=True)(make_event("/rows/summary", claims=None), stream, {})
+
+    assert stream.status_code == 200
+    assert json.loads(stream.body) == {"rows": 1000}
+
+
+def test_streaming_handler_errors(api, make_event):
+    handler = api.export(stream=True)
+
+    # Errors raised before the first item keep their status code
+    stream = LocalResponseStream()
+    handler(make_event("/rows/42", claims=None), stream, {})
+    assert stream.status_code == 404
+    assert json.loads(stream.body) == {"error": "Row 42 not found"}
+
+    # Routing errors
+    stream = LocalResponseStream()
+    handler(make_event("/nope", claims=None), stream, {})
+    assert stream.status_code == 404
+
+    # Errors raised mid-stream truncate the response
+    stream = LocalResponseStream()
+    handler(make_event("/rows/broken/1", claims=None), stream, {})
+    assert stream.status_code == 200
+    assert stream.closed
+    assert not stream.body.endswith(b"]")
+
+
+def test_streaming_export_rejects_unknown_format(api):
+    with pytest.raises(ValueError):
+        api.export(stream=True, stream_format="xml")
+
+
+def test_buffered_handler_materializes_generators(api, make_event):
+    response = api.export()(make_event("/rows", query={"count": "2"}, claims=None), {})
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"]) == [{"id": 0, "name": "row 0"}, {"id": 1, "name": "row 1"}]
+
+
+def test_async_generator_handlers(make_event):
+    api = RestApi(codec=StdlibJsonCodec(), request_logging=False)
+    resource = ApiResource("/rows")
+
+    @resource.get("/")
+    async def list_rows():
+        for index in range(3):
+            yield {"id": index}
+
+    @resource.get("/missing")
+    async def missing_rows():
+        raise ApiError("No rows", 404)
+        yield  # pragma: no cover
+
+    api.add_resource(resource, is_public=True)
+
+    stream = LocalResponseStream()
+    api.export(stream=True)(make_event("/rows/", claims=None), stream, {})
+    assert stream.status_code == 200
+    assert json.loads(stream.body) == [{"id": 0}, {"id": 1}, {"id": 2}]
+
+    stream = LocalResponseStream()
+    api.export(stream=True)(make_event("/rows/missing", claims=None), stream, {})
+    assert stream.status_code == 404
+
+    response = api.export()(make_event("/rows/", claims=None), {})
+    assert json.loads(response["body"]) == [{"id": 0}, {"id": 1}, {"id": 2}]
@@ -0,0 +1,169 @@
+import json
+import time
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from jwt.algorithms import RSAAlgorithm
+
+from kegstand.decorators import ApiResource, claim
+from kegstand.token_auth import JwksCache, TokenVerifier, bearer_token
+
+AUDIENCE = "kegstand-tests"
+ISSUER = "https://issuer.example.com"
+
+
+def generate_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+@pytest.fixture(scope="module")
+def signing_keys():
+    return {"key-1": generate_key(), "key-2": generate_key()}
+
+
+def write_jwks(path, keys):
+    jwks = {
+        "keys": [
+            {**json.loads(RSAAlgorithm.to_jwk(key.public_key())), "kid": kid, "alg": "RS256"}
+            for kid, key in keys.items()
+        ]
+    }
+    path.write_text(json.dumps(jwks))
+
+
+def make_token(key, kid="key-1", **claims):
+    payload = {"sub": "user123", "aud": AUDIENCE, "iss": ISSUER, "exp": time.time() + 300}
+    payload.update(claims)
+    return jwt.encode(payload, key, algorithm="RS256", headers={"kid": kid})
+
+
+@pytest.fixture
+def jwks_path(tmp_path, signing_keys):
+    path = tmp_path / "jwks.json"
+    write_jwks(path, {"key-1": signing_keys["key-1"]})
+    return path
+
+
+@pytest.fixture
+def verifier(jwks_path):
+    return TokenVerifier(JwksCache(path=str(jwks_path)), audience=AUDIENCE, issuer=ISSUER)
+
+
+def bearer(token):
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_verify_token(verifier, signing_keys):
+    token = make_token(signing_keys["key-1"], role="admin")
+    assert verifier.verify(token)["role"] == "admin"
+
+
+@pytest.mark.parametrize(
+    "claims",
+    [
+        {"aud": "someone-else"},
+        {"iss": "https://evil.example.com"},
+        {"exp": time.time() - 10},
+    ],
+)
+def test_verify_rejects_invalid_claims(verifier, signing_keys, claims):
+    with pytest.raises(jwt.InvalidTokenError):
+        verifier.verify(make_token(signing_keys["key-1"], **claims))
+
+
+def test_verify_rejects_wrong_signature(verifier):
+    with pytest.raises(jwt.InvalidSignatureError):
+        verifier.verify(make_token(generate_key()))
+
+
+def test_verified_tokens_are_cached(verifier, signing_keys):
+    token = make_token(signing_keys["key-1"])
+    verifier.verify(token)
+    claims = verifier.verify(token)
+    claims["sub"] = "modified"
+    assert verifier.verify(token)["sub"] == "user123"
+    assert verifier.stats() == {"hits": 2, "misses": 1, "size": 1}
+
+
+def test_verified_token_cache_expiry_and_size(jwks_path, signing_keys):
+    now = [time.time()]
+    verifier = TokenVerifier(
+        JwksCache(path=str(jwks_path)), audience=AUDIENCE, cache_size=2, clock=lambda: now[0]
+    )
+    tokens = [make_token(signing_keys["key-1"], n=n) for n in range(3)]
+    for token in tokens:
+        verifier.verify(token)
+    assert verifier.stats()["size"] == 2
+
+    verifier.verify(tokens[2])
+    assert verifier.stats()["hits"] == 1
+
+    # Cached tokens are not handed out past their expiry
+    now[0] += 600
+    verifier.verify(tokens[2])
+    assert verifier.stats() == {"hits": 1, "misses": 4, "size": 2}
+
+
+def test_jwks_refreshes_on_unknown_key_id(jwks_path, signing_keys):
+    now = [0.0]
+    jwks = JwksCache(path=str(jwks_path), min_refresh_interval=60, clock=lambda: now[0])
+    verifier = TokenVerifier(jwks, audience=AUDIENCE)
+    verifier.verify(make_token(signing_keys["key-1"]))
+    assert jwks.refreshes == 1
+
+    # Key rotation: key-2 is published, but refreshes are rate limited
+    write_jwks(jwks_path, signing_keys)
+    with pytest.raises(jwt.InvalidTokenError, match="Unknown signing key"):
+        verifier.verify(make_token(signing_keys["key-2"], kid="key-2"))
+    assert jwks.refreshes == 1
+
+    now[0] += 60
+    assert verifier.verify(make_token(signing_keys["key-2"], kid="key-2"))["sub"] == "user123"
+    assert jwks.refreshes == 2
+    # Known keys never trigger a refresh
+    verifier.verify(make_token(signing_keys["key-1"], n=1))
+    assert jwks.refreshes == 2
+
+
+def test_jwks_cache_requires_one_source():
+    with pytest.raises(ValueError):
+        JwksCache()
+
+
+def test_bearer_token():
+    assert bearer_token({"headers": {"authorization": "Bearer abc"}}) == "abc"
+    assert bearer_token({"headers": {"AUTHORIZATION": "bearer abc"}}) == "abc"
+    assert bearer_token({"headers": {"Authorization": "Basic abc"}}) is None
+    assert bearer_token({"headers": None}) is None
+
+
+def test_authenticate_keeps_authorizer_claims(verifier, signing_keys, make_event):
+    event = make_event("/beers/", headers=bearer(make_token(signing_keys["key-1"])), claims=None)
+    event["requestContext"] = {"authorizer": {"claims": {"sub": "from-authorizer"}}}
+    request = verifier.authenticate(event)
+    assert request.event is event
+    assert request.claims == {"sub": "from-authorizer"}
+
+
+def test_rest_api_with_token_verifier(verifier, signing_keys, make_event, make_api):
+    resource = ApiResource("/beers")
+
+    @resource.get("/", auth=claim("role").eq("admin"))
+    def list_beers(claims):
+        return {"user": claims["sub"]}
+
+    handler = make_api(resource, token_verifier=verifier).export()
+
+    admin_token = make_token(signing_keys["key-1"], role="admin")
+    response = handler(make_event("/beers/", headers=bearer(admin_token), claims=None), {})
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"]) == {"user": "user123"}
+
+    # Invalid, missing or insufficient tokens are all unauthenticated/unauthorized
+    for headers in (
+        bearer(make_token(generate_key(), role="admin")),
+        None,
+        bearer(make_token(signing_keys["key-1"], role="user")),
+    ):
+        assert handler(make_event("/beers/", headers=headers, claims=None), {})["statusCode"] == 401
@@ -95,3 +95,30 @@ def test_find_resource_modules_no_api_directory():
         # Create an empty directory without api folder
         resources = find_resource_modules(temp_dir)
         assert resources == []
+
+
+def test_find_resource_modules_recursive():
+    with tempfile.TemporaryDirectory() as temp_dir:
+        os.makedirs(os.path.join(temp_dir, "api", "public", "status"))
+        os.makedirs(os.path.join(temp_dir, "api", "admin", "__pycache__"))
+        for file_name in [
+            "api/users.py",
+            "api/admin/reports.py",
+            "api/admin/__pycache__/reports.cpython-311.pyc",
+            "api/public/status/health.py",
+            "api/README.md",
+        ]:
+            with open(os.path.join(temp_dir, file_name), "w") as f:
+                f.write("")
+
+        # Nested subfolders are ignored unless scanning recursively
+        resources = find_resource_modules(temp_dir)
+        assert [r["module_path"] for r in resources] == ["api.users"]
+
+        resources = find_resource_modules(temp_dir, recursive=True)
+        modules = {r["module_path"]: r["is_public"] for r in resources}
+        assert modules == {
+            "api.users": False,
+            "api.admin.reports": False,
+            "api.public.status.health": True,
+        }
@@ -0,0 +1,195 @@
+import json
+from dataclasses import dataclass, field
+from typing import Literal, Optional, TypedDict
+
+import pytest
+
+from kegstand.decorators import ApiResource
+from kegstand.errors import ValidationError
+from kegstand.validation import compile_schema
+
+
+@dataclass
+class LineItem:
+    sku: str
+    qty: int = 1
+
+
+@dataclass
+class Order:
+    customer: str
+    items: list[LineItem]
+    total: float
+    note: Optional[str] = None
+    tags: list[str] = field(default_factory=list)
+
+
+class RequiredBeerFields(TypedDict):
+    name: str
+    style: Literal["ipa", "stout"]
+
+
+class Beer(RequiredBeerFields, total=False):
+    abv: float
+
+
+@dataclass
+class Comment:
+    text: str
+    replies: list["Comment"] = field(default_factory=list)
+
+
+def field_errors(validate, value):
+    with pytest.raises(ValidationError) as excinfo:
+        validate(value)
+    return excinfo.value.field_errors
+
+
+def test_dataclass_schema():
+    validate = compile_schema(Order)
+    order = validate({"customer": "jens", "items": [{"sku": "ipa-6"}], "total": 12, "extra": True})
+    assert order == Order(customer="jens", items=[LineItem(sku="ipa-6")], total=12.0)
+    assert isinstance(order.total, float)
+
+
+def test_dataclass_schema_reports_all_field_errors():
+    errors = field_errors(
+        compile_schema(Order),
+        {"items": [{"sku": "ipa-6", "qty": "two"}, {}], "total": True, "note": 5},
+    )
+    assert errors == [
+        {"field": "customer", "message": "Missing required field"},
+        {"field": "items[0].qty", "message": "Expected integer"},
+        {"field": "items[1].sku", "message": "Missing required field"},
+        {"field": "total", "message": "Expected number"},
+        {"field": "note", "message": "Expected string"},
+    ]
+
+
+def test_non_object_body():
+    assert field_errors(compile_schema(Order), [1, 2]) == [
+        {"field": "$", "message": "Expected object"}
+    ]
+
+
+def test_typeddict_schema():
+    validate = compile_schema(Beer)
+    assert validate({"name": "Heady", "style": "ipa", "brewery": "Alchemist"}) == {
+        "name": "Heady",
+        "style": "ipa",
+    }
+    assert field_errors(validate, {"name": "Heady", "style": "lager", "abv": "8%"}) == [
+        {"field": "style", "message": "Must be one of ['ipa', 'stout']"},
+        {"field": "abv", "message": "Expected number"},
+    ]
+
+
+def test_recursive_schema():
+    validate = compile_schema(Comment)
+    comment = validate({"text": "a", "replies": [{"text": "b", "replies": [{"text": "c"}]}]})
+    assert comment.replies[0].replies[0].text == "c"
+    assert field_errors(validate, {"text": "a", "replies": [{"replies": []}]}) == [
+        {"field": "replies[0].text", "message": "Missing required field"}
+    ]
+
+
+def test_unsupported_type():
+    with pytest.raises(TypeError):
+        compile_schema(bytes)
+
+
+def test_json_schema():
+    validate = compile_schema(
+        {
+            "type": "object",
+            "properties": {
+                "name": {"type": "string", "minLength": 1, "pattern": "^[a-z]+$"},
+                "abv": {"type": "number", "minimum": 0, "exclusiveMaximum": 100},
+                "tags": {"type": "array", "items": {"type": "string"}, "maxItems": 2},
+                "style": {"enum": ["ipa", "stout"]},
+            },
+            "required": ["name"],
+            "additionalProperties": False,
+        }
+    )
+    assert validate({"name": "heady", "abv": 8}) == {"name": "heady", "abv": 8}
+    assert field_errors(
+        validate, {"name": "Heady", "abv": 100, "tags": ["a", 1], "style": "lager", "x": 1}
+    ) == [
+        {"field": "name", "message": "Must match pattern '^[a-z]+$'"},
+        {"field": "abv", "message": "Must be less than 100"},
+        {"field": "tags[1]", "message": "Expected string"},
+        {"field": "style", "message": "Must be one of ['ipa', 'stout']"},
+        {"field": "x", "message": "Unexpected field"},
+    ]
+    assert field_errors(validate, {}) == [{"field": "name", "message": "Missing required field"}]
+
+
+def test_json_schema_unsupported_keyword():
+    with pytest.raises(ValueError, match="oneOf"):
+        compile_schema({"oneOf": [{"type": "string"}]})
+
+
+@pytest.fixture
+def post_order(make_event):
+    # Calls the resource's POST /orders/ route handler directly, with the given body
+    def post(resource, body):
+        method, params = resource.get_matching_route("POST", "/orders/")
+        return method["handler"](params, make_event("/orders/", method="POST", body=body), {})
+
+    return post
+
+
+def test_route_schema(post_order):
+    resource = ApiResource("/orders")
+    calls = []
+
+    @resource.post("/", schema=Order)
+    def create_order(data):
+        calls.append(data)
+        return {"customer": data.customer, "items": len(data.items)}
+
+    response = post_order(resource, '{"customer": "jens", "items": [], "total": 0}')
+    assert response["statusCode"] == 200
+    assert json.loads(response["body"]) == {"customer": "jens", "items": 0}
+    assert isinstance(calls[0], Order)
+
+    response = post_order(resource, '{"customer": 1}')
+    assert response["statusCode"] == 400
+    assert json.loads(response["body"]) == {
+        "error": "Invalid request data",
+        "fields": [
+            {"field": "customer", "message": "Expected string"},
+            {"field": "items", "message": "Missing required field"},
+            {"field": "total", "message": "Missing required field"},
+        ],
+    }
+    assert len(calls) == 1
+
+
+def test_schema_is_ignored_for_get_routes(make_event):
+    resource = ApiResource("/orders", method_defaults={"schema": Order})
+
+    @resource.get("/")
+    def list_orders(data):
+        return data
+
+    method, params = resource.get_matching_route("GET", "/orders/")
+    assert method["handler"](params, make_event("/orders/"), {})["statusCode"] == 200
+
+
+def test_route_schema_applies_without_data_argument(post_order):
+    resource = ApiResource("/orders")
+    calls = []
+
+    @resource.post("/", schema=Order)
+    def create_order():
+        calls.append("handler")
+        return {}
+
+    assert post_order(resource, '{"customer": 1}')["statusCode"] == 400
+    assert post_order(resource, "not json")["statusCode"] == 400
+    assert calls == []
+    valid = '{"customer": "jens", "items": [], "total": 0}'
+    assert post_order(resource, valid)["statusCode"] == 200
+    assert calls == ["handler"]
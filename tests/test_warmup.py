@@ -0,0 +1,184 @@
+import json
+import random
+import sys
+import types
+
+import pytest
+
+from kegstand.api import RestApi
+from kegstand.decorators import ApiResource
+from kegstand.streaming import LocalResponseStream
+from kegstand.warmup import is_pre_warmed_init, is_warmer_event
+
+SCHEDULED_EVENT = {
+    "version": "0",
+    "id": "53dc4d37-cffa-4f76-80c9-8b7d4a4d2eaa",
+    "detail-type": "Scheduled Event",
+    "source": "aws.events",
+    "resources": ["arn:aws:events:us-east-1:123456789012:rule/keep-warm"],
+    "detail": {},
+}
+
+
+@pytest.mark.parametrize(
+    ("event", "expected"),
+    [
+        (SCHEDULED_EVENT, True),
+        ({"source": "serverless-plugin-warmup"}, True),
+        ({"warmer": True, "concurrency": 3}, True),
+        ({"source": "aws.s3"}, False),
+        ({"httpMethod": "GET", "path": "/beers/1", "requestContext": {}}, False),
+        ({"httpMethod": "GET", "path": "/beers/1", "source": "aws.events"}, False),
+    ],
+)
+def test_is_warmer_event(event, expected):
+    assert is_warmer_event(event) is expected
+
+
+@pytest.mark.parametrize(
+    ("initialization_type", "expected"),
+    [("on-demand", False), ("provisioned-concurrency", True), ("snap-start", True)],
+)
+def test_is_pre_warmed_init(monkeypatch, initialization_type, expected):
+    monkeypatch.setenv("AWS_LAMBDA_INITIALIZATION_TYPE", initialization_type)
+    assert is_pre_warmed_init() is expected
+
+
+@pytest.fixture
+def make_beer_api(make_api):
+    def build(calls):
+        api = make_api()
+
+        @api.dependency()
+        def client():
+            calls.append("client")
+            return object()
+
+        resource = ApiResource("/beers")
+
+        @resource.get("/:id", cache=60)
+        def get_beer(params, client):
+            calls.append("handler")
+            return {"id": params["id"], "client": id(client)}
+
+        api.add_resource(resource)
+
+        @api.on_warm
+        def prime():
+            calls.append("warm hook")
+
+        return api
+
+    return build
+
+
+def test_warm_creates_dependencies_and_runs_hooks(make_event, make_beer_api):
+    calls = []
+    api = make_beer_api(calls)
+    api.warm()
+    api.warm()
+    assert calls == ["client", "warm hook"]
+
+    api.export()(make_event(), {})
+    assert calls == ["client", "warm hook", "handler"]
+
+
+def test_warm_imports_lazy_modules(tmp_path, monkeypatch, make_event):
+    package = tmp_path / "warm_lazy_api"
+    package.mkdir()
+    (package / "__init__.py").write_text("")
+    (package / "beers.py").write_text(
+        "from kegstand.decorators import ApiResource\n"
+        "api = ApiResource('/beers')\n"
+        "@api.get('/:id')\n"
+        "def get_beer(params):\n"
+        "    return {'id': params['id']}\n"
+    )
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+    api = RestApi(request_logging=False)
+    route = {"method": "GET", "route": "/beers/:id", "module": "warm_lazy_api.beers"}
+    api.add_lazy_routes([{**route, "is_public": False}])
+    assert "warm_lazy_api.beers" not in sys.modules
+    api.warm()
+    assert "warm_lazy_api.beers" in sys.modules
+    assert api.export()(make_event(), {})["statusCode"] == 200
+
+
+def test_export_warms_under_provisioned_concurrency(monkeypatch, make_beer_api):
+    calls = []
+    make_beer_api(calls).export()
+    assert calls == []
+
+    monkeypatch.setenv("AWS_LAMBDA_INITIALIZATION_TYPE", "provisioned-concurrency")
+    make_beer_api(calls).export()
+    assert calls == ["client", "warm hook"]
+    assert make_beer_api([]).export(warm=False) is not None
+
+
+def test_warmer_events_short_circuit(make_event):
+    calls = []
+    logged = []
+    api = RestApi()
+    api.dependency("client")(lambda: calls.append("client"))
+    api.request_logger.log_access = lambda event, *_args: logged.append(event)  # type: ignore[method-assign,union-attr]
+    handler = api.export(warm=False)
+
+    assert handler(SCHEDULED_EVENT, {}) == {"warmed": True}
+    assert handler({"warmer": True}, {}) == {"warmed": True}
+    # The first warmer event warms the container up; nothing is routed or logged
+    assert calls == ["client"]
+    assert logged == []
+    assert handler(make_event(), {})["statusCode"] == 404
+    assert len(logged) == 1
+
+
+def test_warmer_events_short_circuit_streaming_exports(make_event, make_beer_api):
+    calls = []
+    api = make_beer_api(calls)
+    handler = api.export(stream=True, warm=False)
+
+    stream = LocalResponseStream()
+    handler(SCHEDULED_EVENT, stream, {})
+    assert (stream.status_code, json.loads(stream.body)) == (200, {"warmed": True})
+    assert calls == ["client", "warm hook"]
+
+    stream = LocalResponseStream()
+    handler(make_event(), stream, {})
+    assert stream.status_code == 200
+
+
+def test_snapshot_hooks(monkeypatch, make_event, make_beer_api):
+    registered = {}
+    runtime_hooks = types.ModuleType("snapshot_restore_py")
+    runtime_hooks.register_before_snapshot = lambda hook: registered.setdefault("before", hook)  # type: ignore[attr-defined]
+    runtime_hooks.register_after_restore = lambda hook: registered.setdefault("after", hook)  # type: ignore[attr-defined]
+    monkeypatch.setitem(sys.modules, "snapshot_restore_py", runtime_hooks)
+    monkeypatch.setenv("AWS_LAMBDA_INITIALIZATION_TYPE", "snap-start")
+
+    calls = []
+    api = make_beer_api(calls)
+    api.before_snapshot(lambda: calls.append("before snapshot"))
+    api.after_restore(lambda: calls.append("after restore"))
+    handler = api.export()
+    assert calls == ["client", "warm hook"]
+
+    registered["before"]()
+    assert calls == ["client", "warm hook", "before snapshot"]
+    handler(make_event(), {})
+
+    random.seed(0)
+    seeded = random.random()  # noqa: S311
+    random.seed(0)
+    registered["after"]()
+    # Randomness is re-seeded, dependencies are re-created and caches are cleared
+    assert random.random() != seeded  # noqa: S311
+    assert calls[-1] == "after restore"
+    handler(make_event(), {})
+    assert calls.count("client") == 2
+    assert calls.count("handler") == 2
+
+
+def test_register_snapshot_hooks_without_runtime_support(monkeypatch):
+    monkeypatch.setitem(sys.modules, "snapshot_restore_py", None)
+    assert RestApi(request_logging=False).register_snapshot_hooks() is False